@@ -6,8 +6,9 @@ from .auth import router as auth_router
 from .user import router as user_router
 from .alarm.alarm import router as alarm_router
 from .notification.notification import router as notification_router
+from .websocket.websocket import router as websocket_router
 
-__all__ = ['system', 'network', 'io', 'docker', 'auth', 'user', 'alarm', 'notification']
+__all__ = ['system', 'network', 'io', 'docker', 'auth', 'user', 'alarm', 'notification', 'websocket']
 
 system = system_router
 network = network_router
@@ -17,3 +18,4 @@ auth = auth_router
 user = user_router
 alarm = alarm_router
 notification = notification_router
+websocket = websocket_router
@@ -1,7 +1,7 @@
 import logging
 logger = logging.getLogger("nas-monitor.alarm_api")
-from fastapi import APIRouter, HTTPException, Depends, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Response
+from typing import Dict, List, Optional
 from app.models.alarm.alarm_models import (
     AlarmConfig, AlarmRecord, AccessIP, AlarmStats,
     AlarmCreateRequest, AlarmUpdateRequest, AlarmStatusUpdateRequest,
@@ -9,8 +9,9 @@ from app.models.alarm.alarm_models import (
 )
 from app.services.alarm.alarm_storage import storage
 from app.services.alarm.alarm_detector import alarm_detector
+from app.services.alarm.alarm_statistics import GRANULARITIES
 from app.api.auth import get_current_active_user
-from datetime import datetime, timedelta
+from datetime import datetime
 
 router = APIRouter()
 
@@ -51,14 +52,73 @@ async def delete_alarm_config(config_id: str, current_user: dict = Depends(get_c
     return {"message": "告警配置删除成功"}
 
 # 告警记录相关API
-@router.get("/records", response_model=List[AlarmRecord])
+def _split_param(value: Optional[str]) -> List[str]:
+    """解析逗号分隔的查询参数"""
+    return [item.strip() for item in value.split(",") if item.strip()] if value else []
+
+def _project_record(record: AlarmRecord, fields: List[str], exclude: List[str]) -> Dict:
+    """按 fields / exclude 裁剪告警记录，exclude 支持 details.xxx 形式的嵌套字段"""
+    include = set(fields) | {"id"} if fields else None
+    exclude_spec: Dict = {}
+    for name in exclude:
+        field, _, sub_field = name.partition(".")
+        if sub_field:
+            if exclude_spec.get(field) is not True:
+                exclude_spec.setdefault(field, set()).add(sub_field)
+        else:
+            exclude_spec[field] = True
+    return record.dict(include=include, exclude=exclude_spec or None)
+
+@router.get("/records")
 async def get_alarm_records(
+    response: Response,
     limit: int = Query(100, ge=1, le=1000),
     offset: int = Query(0, ge=0),
+    cursor: Optional[str] = Query(None, description="上一页响应头 X-Next-Cursor 中的游标"),
+    start: Optional[datetime] = Query(None, description="开始时间"),
+    end: Optional[datetime] = Query(None, description="结束时间"),
+    severity: Optional[str] = Query(None, description="告警级别，多个用逗号分隔"),
+    alarm_type: Optional[str] = None,
+    sub_type: Optional[str] = None,
+    status: Optional[str] = None,
+    q: Optional[str] = Query(None, description="消息文本搜索"),
+    fields: Optional[str] = Query(None, description="只返回这些字段，逗号分隔"),
+    exclude: Optional[str] = Query(None, description="不返回这些字段，逗号分隔，如 details 或 details.original_alerts"),
     current_user: dict = Depends(get_current_active_user)
 ):
-    """获取告警记录"""
-    return storage.get_alarm_records(limit=limit, offset=offset)
+    """获取告警记录
+
+    支持时间范围、级别、类型、状态和文本过滤。游标分页时下一页游标通过
+    X-Next-Cursor 响应头返回；不带游标时仍支持 offset 分页。
+    """
+    filtered = any([cursor, start, end, severity, alarm_type, sub_type, status, q])
+    if filtered:
+        try:
+            records, next_cursor = storage.query_alarm_records(
+                limit=limit,
+                cursor=cursor,
+                since=start,
+                until=end,
+                severities=_split_param(severity),
+                alarm_type=alarm_type,
+                sub_type=sub_type,
+                status=status,
+                text=q,
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        records = storage.get_alarm_records(limit=limit + 1, offset=offset)
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            last = records[-1]
+            next_cursor = storage.encode_cursor((last.timestamp.timestamp(), last.id))
+    
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    field_list, exclude_list = _split_param(fields), _split_param(exclude)
+    return [_project_record(record, field_list, exclude_list) for record in records]
 
 @router.get("/records/{record_id}", response_model=AlarmRecord)
 async def get_alarm_record(record_id: str, current_user: dict = Depends(get_current_active_user)):
@@ -83,6 +143,14 @@ async def update_alarm_record(record_id: str, updates: AlarmStatusUpdateRequest,
         raise HTTPException(status_code=404, detail="告警记录不存在")
     return record
 
+@router.get("/retention")
+async def get_alarm_retention(current_user: dict = Depends(get_current_active_user)):
+    """获取告警记录各层（hot / warm / cold）的记录数和保留策略"""
+    try:
+        return storage.retention_stats()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 # 访问IP相关API
 @router.get("/access-ips", response_model=List[AccessIP])
 async def get_access_ips(current_user: dict = Depends(get_current_active_user)):
@@ -108,32 +176,49 @@ async def update_access_ip(ip_address: str, updates: IPStatusUpdateRequest, curr
 # 告警统计API
 @router.get("/statistics", response_model=AlarmStats)
 async def get_alarm_statistics(current_user: dict = Depends(get_current_active_user)):
-    """获取告警统计信息"""
-    records = storage.get_alarm_records(limit=1000)
-    
-    # 计算总告警数
-    total = len(records)
-    
-    # 按严重程度统计
-    by_severity = {"info": 0, "warning": 0, "critical": 0}
-    for record in records:
-        by_severity[record.severity] += 1
-    
-    # 按类型统计
-    by_type = {}
-    for record in records:
-        type_key = f"{record.alarm_type}_{record.sub_type}"
-        by_type[type_key] = by_type.get(type_key, 0) + 1
-    
-    # 计算最近24小时的告警数
-    recent = len([r for r in records if r.timestamp >= datetime.now() - timedelta(days=1)])
-    
-    return AlarmStats(
-        total=total,
-        by_severity=by_severity,
-        by_type=by_type,
-        recent=recent
-    )
+    """获取告警统计信息（增量维护，不扫描告警记录）"""
+    storage.refresh()
+    return AlarmStats(**storage.statistics.summary())
+
+@router.get("/statistics/range")
+async def get_alarm_statistics_range(
+    start: Optional[datetime] = Query(None, description="开始时间，默认 days 天前"),
+    end: Optional[datetime] = Query(None, description="结束时间，默认当前时间"),
+    days: float = Query(1, gt=0, description="未指定开始时间时统计最近多少天"),
+    group_by: Optional[str] = Query(None, pattern="^(type|severity)$"),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """统计任意时间范围内的告警数，如最近7天按类型统计：?days=7&group_by=type"""
+    end_ts = end.timestamp() if end else datetime.now().timestamp()
+    start_ts = start.timestamp() if start else end_ts - days * 86400
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="开始时间必须早于结束时间")
+    storage.refresh()
+    return {
+        "start": start_ts,
+        "end": end_ts,
+        "group_by": group_by,
+        "result": storage.statistics.count_range(start_ts, end_ts, group_by),
+    }
+
+@router.get("/statistics/series")
+async def get_alarm_statistics_series(
+    granularity: str = Query("hour", pattern="^(minute|hour|day)$"),
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    group_by: Optional[str] = Query(None, pattern="^(type|severity)$"),
+    current_user: dict = Depends(get_current_active_user)
+):
+    """按分钟 / 小时 / 天返回告警数时间序列（最多 1440 个点）"""
+    size = GRANULARITIES[granularity]
+    end_ts = end.timestamp() if end else datetime.now().timestamp()
+    start_ts = start.timestamp() if start else end_ts - size * 60
+    if start_ts >= end_ts:
+        raise HTTPException(status_code=400, detail="开始时间必须早于结束时间")
+    if (end_ts - start_ts) / size > 1440:
+        raise HTTPException(status_code=400, detail="时间范围过大，请使用更粗的粒度")
+    storage.refresh()
+    return storage.statistics.series(granularity, start_ts, end_ts, group_by)
 
 # 手动触发告警检测
 @router.post("/detect")
@@ -142,7 +227,7 @@ async def manual_detect_alerts(
     current_user: dict = Depends(get_current_active_user)
 ):
     """手动触发告警检测"""
-    await alarm_detector.run_detection(client_ip)
+    await alarm_detector.request_detection(client_ip)
     return {"message": "告警检测已触发"}
 
 # 获取默认告警配置
@@ -193,6 +278,28 @@ def get_default_alarm_configs():
             created_at=datetime.now(),
             updated_at=datetime.now()
         ),
+        AlarmConfig(
+            alarm_type="docker",
+            sub_type="container_oom",
+            enabled=True,
+            threshold=0.0,
+            duration=0,
+            severity="critical",
+            push_methods=[],
+            created_at=datetime.now(),
+            updated_at=datetime.now()
+        ),
+        AlarmConfig(
+            alarm_type="docker",
+            sub_type="container_unhealthy",
+            enabled=True,
+            threshold=0.0,
+            duration=0,
+            severity="warning",
+            push_methods=[],
+            created_at=datetime.now(),
+            updated_at=datetime.now()
+        ),
         AlarmConfig(
             alarm_type="network",
             sub_type="external_ip",
@@ -215,5 +322,6 @@ def init_default_alarm_configs():
             storage.create_alarm_config(default_config)
         logger.info("Default alarm configs initialized")
 
-# 调用初始化函数
-init_default_alarm_configs()
+# 调用初始化函数（多 worker 部署时由 collector 进程写入）
+if storage.writer:
+    init_default_alarm_configs()
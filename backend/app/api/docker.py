@@ -1,21 +1,31 @@
-from fastapi import APIRouter, HTTPException, Body
+from fastapi import APIRouter, HTTPException, Response, Body
 from app.services import docker_service
+from app.services.metrics_cache import metrics_cache
+from app.services.executor import blocking_executor, CollectorTimeoutError
 
 router = APIRouter()
 
 @router.get("/containers")
-async def get_containers():
+async def get_containers(response: Response):
     """获取所有容器信息"""
     try:
-        return docker_service.get_containers()
+        entry = await metrics_cache.aget_entry("containers")
+        response.headers.update(entry.headers())
+        return entry.data
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/stats")
-async def get_docker_stats():
+async def get_docker_stats(response: Response):
     """获取 Docker 容器统计信息"""
     try:
-        return docker_service.get_docker_stats()
+        entry = await metrics_cache.aget_entry("docker_stats")
+        response.headers.update(entry.headers())
+        return entry.data
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -23,7 +33,9 @@ async def get_docker_stats():
 async def get_images():
     """获取 Docker 镜像信息"""
     try:
-        return docker_service.get_images()
+        return await blocking_executor.run("docker", docker_service.get_images)
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -31,7 +43,9 @@ async def get_images():
 async def pull_docker_image(image_name: str = Body(..., embed=True)):
     """拉取最新的 Docker 镜像"""
     try:
-        return docker_service.pull_image(image_name)
+        return await blocking_executor.run("docker_pull", docker_service.pull_image, image_name)
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -39,7 +53,9 @@ async def pull_docker_image(image_name: str = Body(..., embed=True)):
 async def delete_docker_image(image_id: str):
     """删除 Docker 镜像"""
     try:
-        return docker_service.delete_image(image_id)
+        return await blocking_executor.run("docker", docker_service.delete_image, image_id)
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -47,7 +63,11 @@ async def delete_docker_image(image_id: str):
 async def start_container(container_id: str):
     """启动容器"""
     try:
-        return docker_service.start_container(container_id)
+        result = await blocking_executor.run("docker", docker_service.start_container, container_id)
+        metrics_cache.invalidate("containers")
+        return result
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -55,7 +75,11 @@ async def start_container(container_id: str):
 async def stop_container(container_id: str):
     """停止容器"""
     try:
-        return docker_service.stop_container(container_id)
+        result = await blocking_executor.run("docker", docker_service.stop_container, container_id)
+        metrics_cache.invalidate("containers")
+        return result
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -63,7 +87,11 @@ async def stop_container(container_id: str):
 async def restart_container(container_id: str):
     """重启容器"""
     try:
-        return docker_service.restart_container(container_id)
+        result = await blocking_executor.run("docker", docker_service.restart_container, container_id)
+        metrics_cache.invalidate("containers")
+        return result
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -71,6 +99,13 @@ async def restart_container(container_id: str):
 async def get_container_logs(container_id: str, tail: int = 100):
     """获取容器日志"""
     try:
-        return docker_service.get_container_logs(container_id, tail)
+        return await blocking_executor.run("docker", docker_service.get_container_logs, container_id, tail)
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/client/stats")
+async def get_docker_client_stats():
+    """获取 Docker 客户端连接和调用统计"""
+    return docker_service.get_client_stats()
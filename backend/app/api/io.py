@@ -1,20 +1,29 @@
-from fastapi import APIRouter, HTTPException
-from app.services import io_service
+from fastapi import APIRouter, HTTPException, Response
+from app.services.metrics_cache import metrics_cache
+from app.services.executor import CollectorTimeoutError
 
 router = APIRouter()
 
 @router.get("/disk")
-async def get_disk_io():
+async def get_disk_io(response: Response):
     """获取磁盘 IO 信息"""
     try:
-        return io_service.get_disk_io()
+        entry = await metrics_cache.aget_entry("disk_io")
+        response.headers.update(entry.headers())
+        return entry.data
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/system")
-async def get_system_io():
+async def get_system_io(response: Response):
     """获取系统 IO 统计信息"""
     try:
-        return io_service.get_system_io()
+        entry = await metrics_cache.aget_entry("system_io")
+        response.headers.update(entry.headers())
+        return entry.data
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,21 +1,31 @@
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from app.services import network_service
+from app.services.metrics_cache import metrics_cache
+from app.services.executor import CollectorTimeoutError
 
 router = APIRouter()
 
 @router.get("/traffic")
-async def get_network_traffic():
+async def get_network_traffic(response: Response):
     """获取网络流量信息"""
     try:
-        return network_service.get_network_traffic()
+        entry = await metrics_cache.aget_entry("network")
+        response.headers.update(entry.headers())
+        return entry.data
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/interfaces")
-async def get_network_interfaces():
+async def get_network_interfaces(response: Response):
     """获取网络接口信息"""
     try:
-        return network_service.get_network_interfaces()
+        entry = await metrics_cache.aget_entry("network_interfaces")
+        response.headers.update(entry.headers())
+        return entry.data
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
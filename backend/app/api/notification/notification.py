@@ -6,6 +6,7 @@ from app.models.notification.notification_models import (
 )
 from app.services.notification.notification_storage import storage
 from app.services.notification.notification_service import notification_service
+from app.services.http_client import http_client
 from app.api.auth import get_current_active_user
 
 router = APIRouter()
@@ -49,8 +50,10 @@ async def delete_notification_channel(channel_id: str, current_user: dict = Depe
     """删除通知渠道"""
     if not storage.delete_channel(channel_id):
         raise HTTPException(status_code=404, detail="通知渠道不存在")
-    # 移除通知提供者
-    notification_service.remove_provider(channel_id)
+    # 移除通知提供者，等待其发送协程退出
+    task = notification_service.remove_provider(channel_id)
+    if task is not None:
+        await task
     return {"message": "通知渠道删除成功"}
 
 # 通知偏好设置相关API
@@ -80,3 +83,25 @@ async def update_notification_preference(user_id: str, updates: NotificationPref
     if not preference:
         raise HTTPException(status_code=404, detail="通知偏好设置不存在")
     return preference
+
+# 通知分发队列相关API
+@router.get("/dispatcher/stats")
+async def get_dispatcher_stats(current_user: dict = Depends(get_current_active_user)):
+    """获取各渠道发送队列状态"""
+    return notification_service.dispatcher.stats()
+
+@router.get("/http/stats")
+async def get_http_client_stats(current_user: dict = Depends(get_current_active_user)):
+    """获取共享HTTP连接池状态"""
+    return http_client.stats()
+
+@router.get("/dead-letters")
+async def get_dead_letters(current_user: dict = Depends(get_current_active_user)):
+    """获取发送失败的通知"""
+    return notification_service.dispatcher.dead_letters.list()
+
+@router.post("/dead-letters/retry")
+async def retry_dead_letters(current_user: dict = Depends(get_current_active_user)):
+    """重新投递全部发送失败的通知"""
+    count = notification_service.dispatcher.retry_dead_letters()
+    return {"message": f"已重新投递 {count} 条通知", "count": count}
@@ -1,44 +1,95 @@
-from fastapi import APIRouter, HTTPException
-from app.services import system_service
+from fastapi import APIRouter, HTTPException, Response, Query
+from typing import Optional
+from app.services.metrics_cache import metrics_cache
+from app.services.executor import blocking_executor, CollectorTimeoutError
+from app.services.websocket.websocket_service import manager as websocket_manager
+from app.services.websocket.realtime_data_service import realtime_stats
 
 router = APIRouter()
 
 @router.get("/status")
-async def get_system_status():
+async def get_system_status(response: Response):
     """获取系统基本状态"""
     try:
-        return system_service.get_system_status()
+        entry = await metrics_cache.aget_entry("system_status")
+        response.headers.update(entry.headers())
+        return entry.data
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/cpu")
-async def get_cpu_usage():
+async def get_cpu_usage(response: Response):
     """获取 CPU 使用情况"""
     try:
-        return system_service.get_cpu_usage()
+        entry = await metrics_cache.aget_entry("cpu")
+        response.headers.update(entry.headers())
+        return entry.data
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/memory")
-async def get_memory_usage():
+async def get_memory_usage(response: Response):
     """获取内存使用情况"""
     try:
-        return system_service.get_memory_usage()
+        entry = await metrics_cache.aget_entry("memory")
+        response.headers.update(entry.headers())
+        return entry.data
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/disk")
-async def get_disk_usage():
+async def get_disk_usage(response: Response):
     """获取磁盘使用情况"""
     try:
-        return system_service.get_disk_usage()
+        entry = await metrics_cache.aget_entry("disk")
+        response.headers.update(entry.headers())
+        return entry.data
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/disk/smart")
-async def get_disk_smart_info():
+async def get_disk_smart_info(response: Response):
     """获取磁盘S.M.A.R.T信息"""
     try:
-        return system_service.get_disk_smart_info()
+        entry = await metrics_cache.aget_entry("smart")
+        response.headers.update(entry.headers())
+        return entry.data
+    except CollectorTimeoutError as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/snapshot")
+async def get_metrics_snapshot(families: Optional[str] = Query(None, description="逗号分隔的指标族名称")):
+    """获取指标快照及各指标数据年龄"""
+    try:
+        names = [name.strip() for name in families.split(",") if name.strip()] if families else None
+        return await metrics_cache.snapshot(names)
+    except KeyError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/snapshot/stats")
+async def get_metrics_cache_stats():
+    """获取指标缓存和采集器执行状态"""
+    return {
+        "cache": metrics_cache.stats(),
+        "executor": blocking_executor.stats()
+    }
+
+@router.get("/realtime/stats")
+async def get_realtime_stats():
+    """获取实时推送各主题的采集状态和WebSocket连接统计"""
+    return {
+        **realtime_stats(),
+        "websocket": websocket_manager.stats()
+    }
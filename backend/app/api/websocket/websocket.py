@@ -3,6 +3,8 @@ logger = logging.getLogger("nas-monitor.websocket")
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
 import uuid
 from app.services.websocket.websocket_service import manager
+from app.services.websocket.frame_codec import available_encodings
+from app.services.websocket.realtime_data_service import request_collection, snapshot_max_age
 import json
 
 router = APIRouter()
@@ -10,15 +12,25 @@ router = APIRouter()
 @router.websocket("/ws")
 async def websocket_endpoint(
     websocket: WebSocket,
-    client_id: str = Query(None)
+    client_id: str = Query(None),
+    mode: str = Query("full"),
+    encoding: str = Query("json"),
+    interval: float = Query(0)
 ):
-    """WebSocket端点"""
+    """WebSocket端点
+    
+    mode=delta 时订阅后先推送完整快照，之后只推送变化的字段；encoding=msgpack / cbor
+    时数据帧为二进制帧；interval 为请求的推送间隔（秒）。控制消息（subscribed、pong 等）
+    始终为 JSON 文本帧。
+    """
     # 如果没有提供client_id，生成一个
     if not client_id:
         client_id = str(uuid.uuid4())
     
     # 接受连接
-    await manager.connect(websocket, client_id)
+    client = await manager.connect(websocket, client_id, mode, encoding)
+    if interval:
+        manager.configure(client_id, interval=interval)
     
     try:
         while True:
@@ -36,11 +48,23 @@ async def websocket_endpoint(
                     manager.subscribe(client_id, topics)
                     
                     # 发送确认消息
-                    await websocket.send_json({
+                    manager.send_control(client_id, {
                         "type": "subscribed",
                         "topics": topics,
                         "client_id": client_id
                     })
+                    
+                    # 立即推送各主题最后一次发布的数据，没有缓存的主题马上采集
+                    missing = manager.send_snapshot(client_id, topics, snapshot_max_age())
+                    request_collection(missing)
+                    
+                    # 可选：回放最近的告警，如 {"type": "subscribe", "topics": ["alerts"], "replay": 20}
+                    try:
+                        replay = int(message.get("replay") or 0)
+                    except (TypeError, ValueError):
+                        replay = 0
+                    if replay > 0:
+                        manager.replay(client_id, "alerts", replay)
                 
                 elif message_type == "unsubscribe":
                     # 取消订阅主题
@@ -48,37 +72,53 @@ async def websocket_endpoint(
                     manager.unsubscribe(client_id, topics)
                     
                     # 发送确认消息
-                    await websocket.send_json({
+                    manager.send_control(client_id, {
                         "type": "unsubscribed",
                         "topics": topics,
                         "client_id": client_id
                     })
                 
+                elif message_type == "configure":
+                    # 切换推送模式 / 帧编码 / 推送间隔
+                    options = manager.configure(
+                        client_id,
+                        message.get("mode"),
+                        message.get("encoding"),
+                        message.get("interval"),
+                        message.get("intervals")
+                    )
+                    manager.send_control(client_id, {
+                        "type": "configured",
+                        "options": options,
+                        "encodings": available_encodings(),
+                        "client_id": client_id
+                    })
+                
                 elif message_type == "ping":
                     # 心跳消息
-                    await websocket.send_json({
+                    manager.send_control(client_id, {
                         "type": "pong",
                         "client_id": client_id
                     })
                 
                 else:
                     # 未知消息类型
-                    await websocket.send_json({
+                    manager.send_control(client_id, {
                         "type": "error",
                         "message": "未知消息类型",
                         "client_id": client_id
                     })
             except json.JSONDecodeError:
                 # 无效的JSON
-                await websocket.send_json({
+                manager.send_control(client_id, {
                     "type": "error",
                     "message": "无效的JSON格式",
                     "client_id": client_id
                 })
     except WebSocketDisconnect:
         # 断开连接
-        manager.disconnect(client_id)
+        manager.disconnect(client_id, client)
     except Exception as e:
         # 其他错误
         logger.error(f"WebSocket error: {str(e)}")
-        manager.disconnect(client_id)
+        manager.disconnect(client_id, client)
@@ -0,0 +1,13 @@
+import os
+import logging
+
+logger = logging.getLogger("nas-monitor.config")
+
+
+def env_number(key: str, default, cast=float):
+    """读取数值型环境变量，未设置或无法解析时使用默认值"""
+    try:
+        return cast(os.getenv(key, default))
+    except (TypeError, ValueError):
+        logger.warning(f"Invalid value for {key}, using {default}")
+        return default
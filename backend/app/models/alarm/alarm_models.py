@@ -1,44 +1,46 @@
 from datetime import datetime
 from typing import List, Dict, Optional
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 import uuid
 
 class AlarmConfig(BaseModel):
     """告警配置模型"""
-    id: str = str(uuid.uuid4())
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     alarm_type: str  # 告警类型：system, network, docker
     sub_type: str    # 子类型：cpu_high, memory_low, disk_low, etc.
     enabled: bool = True    # 是否启用
     threshold: float = 0.0  # 阈值
+    clear_threshold: Optional[float] = None  # 恢复阈值，None 表示与阈值相同
     duration: int = 30      # 持续时间（秒）
     severity: str = "warning"  # 告警级别：info, warning, critical
     push_methods: List[str] = []  # 推送方式
-    created_at: datetime = datetime.now()
-    updated_at: datetime = datetime.now()
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
 
 class AlarmRecord(BaseModel):
     """告警记录模型"""
-    id: str = str(uuid.uuid4())
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     alarm_type: str
     sub_type: str
     severity: str
     message: str
     details: Dict = {}
-    timestamp: datetime = datetime.now()
+    timestamp: datetime = Field(default_factory=datetime.now)
     status: str = "unprocessed"  # 状态：unprocessed, processed, ignored
     processed_at: Optional[datetime] = None
     processed_by: Optional[str] = None
+    resolved_at: Optional[datetime] = None  # 指标恢复时间
 
 class AccessIP(BaseModel):
     """访问IP模型"""
-    id: str = str(uuid.uuid4())
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     ip_address: str
     country: str = ""
     region: str = ""
     city: str = ""
     is_blacklisted: bool = False
-    first_seen: datetime = datetime.now()
-    last_seen: datetime = datetime.now()
+    first_seen: datetime = Field(default_factory=datetime.now)
+    last_seen: datetime = Field(default_factory=datetime.now)
     total_requests: int = 1
 
 class AlarmStats(BaseModel):
@@ -46,6 +48,7 @@ class AlarmStats(BaseModel):
     total: int
     by_severity: Dict[str, int]
     by_type: Dict[str, int]
+    by_status: Dict[str, int] = {}
     recent: int  # 最近24小时的告警数
 
 class AlarmCreateRequest(BaseModel):
@@ -54,6 +57,7 @@ class AlarmCreateRequest(BaseModel):
     sub_type: str
     enabled: bool = True
     threshold: float = 0.0
+    clear_threshold: Optional[float] = None
     duration: int = 30
     severity: str = "warning"
     push_methods: List[str] = []
@@ -62,6 +66,7 @@ class AlarmUpdateRequest(BaseModel):
     """更新告警配置请求模型"""
     enabled: Optional[bool] = None
     threshold: Optional[float] = None
+    clear_threshold: Optional[float] = None
     duration: Optional[int] = None
     severity: Optional[str] = None
     push_methods: Optional[List[str]] = None
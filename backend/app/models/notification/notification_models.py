@@ -9,6 +9,9 @@ class NotificationChannel(BaseModel):
     type: str = Field(..., description="渠道类型: telegram, feishu, feishu_openclaw")
     enabled: bool = Field(default=True, description="是否启用")
     config: Dict[str, str] = Field(..., description="渠道配置")
+    batch_enabled: bool = Field(default=False, description="是否启用汇总发送（告警风暴时合并为一条消息）")
+    batch_window: int = Field(default=60, description="汇总窗口（秒）")
+    batch_max_items: int = Field(default=20, description="单条汇总最多包含的通知数")
     created_at: datetime = Field(default_factory=datetime.now, description="创建时间")
     updated_at: datetime = Field(default_factory=datetime.now, description="更新时间")
 
@@ -18,12 +21,18 @@ class NotificationChannelCreate(BaseModel):
     type: str = Field(..., description="渠道类型: telegram, feishu, feishu_openclaw")
     enabled: bool = Field(default=True, description="是否启用")
     config: Dict[str, str] = Field(..., description="渠道配置")
+    batch_enabled: bool = Field(default=False, description="是否启用汇总发送")
+    batch_window: int = Field(default=60, ge=1, description="汇总窗口（秒）")
+    batch_max_items: int = Field(default=20, ge=1, description="单条汇总最多包含的通知数")
 
 class NotificationChannelUpdate(BaseModel):
     """更新通知渠道"""
     name: Optional[str] = Field(None, description="渠道名称")
     enabled: Optional[bool] = Field(None, description="是否启用")
     config: Optional[Dict[str, str]] = Field(None, description="渠道配置")
+    batch_enabled: Optional[bool] = Field(None, description="是否启用汇总发送")
+    batch_window: Optional[int] = Field(None, ge=1, description="汇总窗口（秒）")
+    batch_max_items: Optional[int] = Field(None, ge=1, description="单条汇总最多包含的通知数")
 
 class NotificationPreference(BaseModel):
     """通知偏好设置"""
@@ -63,15 +63,11 @@ class AlarmAggregator:
         if self.should_suppress(alarm.alarm_type, alarm.sub_type, alarm.severity):
             return None
         
-        # 添加到最近告警列表
-        if key not in self.recent_alerts:
-            self.recent_alerts[key] = []
-        
         # 清理过期的告警记录
         self._cleanup_old_alerts()
         
-        # 添加新告警
-        self.recent_alerts[key].append(alarm)
+        # 添加到最近告警列表
+        self.recent_alerts.setdefault(key, []).append(alarm)
         
         # 检查是否需要聚合
         if len(self.recent_alerts[key]) >= self.aggregation_threshold:
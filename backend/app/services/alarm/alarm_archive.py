@@ -0,0 +1,346 @@
+import os
+import gzip
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.config import env_number
+from app.models.alarm.alarm_models import AlarmRecord
+from app.services.alarm.alarm_journal import atomic_write_json
+from app.services.alarm.record_index import IndexKey, RecordFilter
+
+logger = logging.getLogger("nas-monitor.alarm_archive")
+
+
+def record_from_dict(item: Dict) -> AlarmRecord:
+    """转换日期字符串为datetime对象并构造告警记录"""
+    item["timestamp"] = datetime.fromisoformat(item["timestamp"])
+    if item.get("processed_at"):
+        item["processed_at"] = datetime.fromisoformat(item["processed_at"])
+    if item.get("resolved_at"):
+        item["resolved_at"] = datetime.fromisoformat(item["resolved_at"])
+    return AlarmRecord(**item)
+
+
+def record_key(record: AlarmRecord) -> IndexKey:
+    """告警记录的索引键"""
+    return record.timestamp.timestamp(), record.id
+
+
+class RetentionPolicy:
+    """告警记录分层保留策略
+
+    hot: 内存，按条数和天数淘汰到 warm
+    warm: SQLite，超过天数后按天归档到 cold
+    cold: gzip 压缩的按天分区 JSONL，超过天数后删除（0 表示永久保留）
+    """
+
+    def __init__(
+        self,
+        hot_max_records: Optional[int] = None,
+        hot_max_age_days: Optional[float] = None,
+        warm_max_age_days: Optional[float] = None,
+        cold_max_age_days: Optional[float] = None,
+    ):
+        self.hot_max_records = hot_max_records if hot_max_records is not None else env_number("ALARM_HOT_MAX_RECORDS", 1000, int)
+        self.hot_max_age_days = hot_max_age_days if hot_max_age_days is not None else env_number("ALARM_HOT_MAX_AGE_DAYS", 7.0, float)
+        self.warm_max_age_days = warm_max_age_days if warm_max_age_days is not None else env_number("ALARM_WARM_MAX_AGE_DAYS", 90.0, float)
+        self.cold_max_age_days = cold_max_age_days if cold_max_age_days is not None else env_number("ALARM_COLD_MAX_AGE_DAYS", 0.0, float)
+
+    @property
+    def evict_batch(self) -> int:
+        """超出条数上限多少条后触发一次淘汰，避免每条新记录都写一次 SQLite"""
+        return max(self.hot_max_records // 10, 1)
+
+    def to_dict(self) -> Dict:
+        return {
+            "hot_max_records": self.hot_max_records,
+            "hot_max_age_days": self.hot_max_age_days,
+            "warm_max_age_days": self.warm_max_age_days,
+            "cold_max_age_days": self.cold_max_age_days,
+        }
+
+
+class WarmStore:
+    """温数据层：SQLite 存储，按时间和 (类型, 子类型, 状态) 建索引"""
+
+    _COLUMNS = "id, ts, alarm_type, sub_type, severity, status, resolved, message, data"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS alarm_records (
+                id TEXT PRIMARY KEY,
+                ts REAL NOT NULL,
+                alarm_type TEXT NOT NULL,
+                sub_type TEXT NOT NULL,
+                severity TEXT NOT NULL,
+                status TEXT NOT NULL,
+                resolved INTEGER NOT NULL DEFAULT 0,
+                message TEXT NOT NULL,
+                data TEXT NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_alarm_records_ts ON alarm_records (ts, id);
+            CREATE INDEX IF NOT EXISTS idx_alarm_records_group
+                ON alarm_records (alarm_type, sub_type, status, ts, id);
+            """
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def _row(record: AlarmRecord) -> Tuple:
+        return (
+            record.id,
+            record.timestamp.timestamp(),
+            record.alarm_type,
+            record.sub_type,
+            record.severity,
+            record.status,
+            1 if record.resolved_at else 0,
+            record.message,
+            json.dumps(record.dict(), default=str),
+        )
+
+    def put_many(self, records: List[AlarmRecord]):
+        """写入或覆盖记录"""
+        if not records:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO alarm_records ({self._COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [self._row(record) for record in records],
+            )
+
+    def get(self, record_id: str) -> Optional[AlarmRecord]:
+        """根据ID获取记录"""
+        with self._lock:
+            row = self._conn.execute("SELECT data FROM alarm_records WHERE id = ?", (record_id,)).fetchone()
+        return record_from_dict(json.loads(row[0])) if row else None
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM alarm_records").fetchone()[0]
+
+    def newest_key(self) -> Optional[IndexKey]:
+        with self._lock:
+            row = self._conn.execute("SELECT ts, id FROM alarm_records ORDER BY ts DESC, id DESC LIMIT 1").fetchone()
+        return (row[0], row[1]) if row else None
+
+    def oldest_key(self) -> Optional[IndexKey]:
+        with self._lock:
+            row = self._conn.execute("SELECT ts, id FROM alarm_records ORDER BY ts, id LIMIT 1").fetchone()
+        return (row[0], row[1]) if row else None
+
+    def has_open(self, alarm_type: str, sub_type: str, instance: str = "") -> bool:
+        """是否存在同一实例未处理且未恢复的同类告警"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT 1 FROM alarm_records WHERE alarm_type = ? AND sub_type = ? AND status = 'unprocessed' "
+                "AND resolved = 0 AND COALESCE(json_extract(data, '$.details.instance'), '') = ? LIMIT 1",
+                (alarm_type, sub_type, instance),
+            ).fetchone()
+        return row is not None
+
+    def query(self, flt: RecordFilter, before: Optional[IndexKey], limit: int,
+              offset: int = 0) -> List[AlarmRecord]:
+        """按条件从新到旧查询"""
+        clauses, params = [], []
+        if before is not None:
+            clauses.append("(ts < ? OR (ts = ? AND id < ?))")
+            params.extend([before[0], before[0], before[1]])
+        if flt.since is not None:
+            clauses.append("ts >= ?")
+            params.append(flt.since)
+        if flt.until is not None:
+            clauses.append("ts <= ?")
+            params.append(flt.until)
+        if flt.severities:
+            clauses.append(f"severity IN ({', '.join('?' * len(flt.severities))})")
+            params.extend(flt.severities)
+        for column in ("alarm_type", "sub_type", "status"):
+            value = getattr(flt, column)
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        if flt.text:
+            clauses.append("instr(lower(message), ?) > 0")
+            params.append(flt.text)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT data FROM alarm_records {where} ORDER BY ts DESC, id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [record_from_dict(json.loads(row[0])) for row in rows]
+
+    def aggregate(self, minute_since: float) -> List[Tuple[str, str, str, str, float, int, int]]:
+        """聚合计数：minute_since 之后按分钟、之前按小时，返回 (类型, 子类型, 级别, 状态, 桶时间戳, 数量, 桶大小)"""
+        rows = []
+        with self._lock:
+            for size, clause in ((60, "ts >= ?"), (3600, "ts < ?")):
+                for row in self._conn.execute(
+                    f"SELECT alarm_type, sub_type, severity, status, CAST(ts / {size} AS INTEGER) * {size}, COUNT(*) "
+                    f"FROM alarm_records WHERE {clause} GROUP BY 1, 2, 3, 4, 5",
+                    (minute_since,),
+                ):
+                    rows.append(tuple(row) + (size,))
+        return rows
+
+    def older_than(self, cutoff: float, limit: int = 5000) -> List[AlarmRecord]:
+        """获取早于 cutoff 的最旧一批记录"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT data FROM alarm_records WHERE ts < ? ORDER BY ts, id LIMIT ?", (cutoff, limit)
+            ).fetchall()
+        return [record_from_dict(json.loads(row[0])) for row in rows]
+
+    def delete_many(self, record_ids: List[str]):
+        """删除记录"""
+        if not record_ids:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany("DELETE FROM alarm_records WHERE id = ?", [(record_id,) for record_id in record_ids])
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ColdStore:
+    """冷数据层：按天分区的 gzip JSONL 文件 + manifest
+
+    manifest 记录每个分区的条数和时间范围，查询时跳过范围外的分区。
+    追加使用新的 gzip member，读取时自动拼接。
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.manifest_file = os.path.join(self.directory, "manifest.json")
+        self._lock = threading.Lock()
+        self.manifest: Dict[str, Dict] = {}
+        if os.path.exists(self.manifest_file):
+            try:
+                with open(self.manifest_file, "r") as f:
+                    self.manifest = json.load(f)
+            except Exception as e:
+                logger.error(f"Error loading cold archive manifest: {e}")
+
+    def _partition_path(self, day: str) -> str:
+        return os.path.join(self.directory, f"alarm_records-{day}.jsonl.gz")
+
+    def append(self, records: List[AlarmRecord]):
+        """按记录日期追加到对应分区"""
+        if not records:
+            return
+        by_day: Dict[str, List[AlarmRecord]] = {}
+        for record in records:
+            by_day.setdefault(record.timestamp.strftime("%Y-%m-%d"), []).append(record)
+        with self._lock:
+            for day, day_records in by_day.items():
+                with gzip.open(self._partition_path(day), "at") as f:
+                    for record in day_records:
+                        f.write(json.dumps(record.dict(), default=str) + "\n")
+                timestamps = [record.timestamp.timestamp() for record in day_records]
+                meta = self.manifest.setdefault(day, {"count": 0, "min_ts": min(timestamps), "max_ts": max(timestamps)})
+                meta["count"] += len(day_records)
+                # 按小时聚合的计数，启动时重建统计不需要解压分区
+                stats = meta.setdefault("stats", {})
+                for record in day_records:
+                    key = self._stats_key(record)
+                    stats[key] = stats.get(key, 0) + 1
+                meta["min_ts"] = min(meta["min_ts"], min(timestamps))
+                meta["max_ts"] = max(meta["max_ts"], max(timestamps))
+            atomic_write_json(self.manifest_file, self.manifest)
+
+    @staticmethod
+    def _stats_key(record: AlarmRecord) -> str:
+        hour = int(record.timestamp.timestamp() // 3600 * 3600)
+        return "\t".join([record.alarm_type, record.sub_type, record.severity, record.status, str(hour)])
+
+    def partition_stats(self, day: str) -> List[Tuple[str, str, str, str, float, int]]:
+        """分区按小时聚合的计数：(alarm_type, sub_type, severity, status, 小时时间戳, 数量)"""
+        meta = self.manifest.get(day, {})
+        stats = meta.get("stats")
+        if stats is None:
+            stats = {}
+            for record in self._read_partition(day):
+                key = self._stats_key(record)
+                stats[key] = stats.get(key, 0) + 1
+        rows = []
+        for key, count in stats.items():
+            alarm_type, sub_type, severity, status, hour = key.split("\t")
+            rows.append((alarm_type, sub_type, severity, status, float(hour), count))
+        return rows
+
+    def _read_partition(self, day: str) -> List[AlarmRecord]:
+        """读取一个分区，按时间倒序返回（同一记录重复归档时只保留一份）"""
+        records: Dict[str, AlarmRecord] = {}
+        try:
+            with gzip.open(self._partition_path(day), "rt") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        record = record_from_dict(json.loads(line))
+                        records[record.id] = record
+        except EOFError:
+            # 写入中断导致的截断 member，保留已读出的部分
+            logger.warning(f"Cold archive partition {day} is truncated")
+        except FileNotFoundError:
+            return []
+        return sorted(records.values(), key=record_key, reverse=True)
+
+    def count(self) -> int:
+        return sum(meta["count"] for meta in self.manifest.values())
+
+    def newest_key_ts(self) -> Optional[float]:
+        return max((meta["max_ts"] for meta in self.manifest.values()), default=None)
+
+    def iter_newest(self, flt: RecordFilter, before: Optional[IndexKey]) -> Iterator[AlarmRecord]:
+        """按条件从新到旧遍历"""
+        for day in sorted(self.manifest.keys(), reverse=True):
+            meta = self.manifest[day]
+            if before is not None and meta["min_ts"] > before[0]:
+                continue
+            if flt.until is not None and meta["min_ts"] > flt.until:
+                continue
+            if flt.since is not None and meta["max_ts"] < flt.since:
+                break
+            for record in self._read_partition(day):
+                key = record_key(record)
+                if before is not None and key >= before:
+                    continue
+                if flt.in_range(key[0]) and flt.matches(record):
+                    yield record
+
+    def get(self, record_id: str) -> Optional[AlarmRecord]:
+        """根据ID查找记录（逐个分区扫描，只用于单条查询）"""
+        for day in sorted(self.manifest.keys(), reverse=True):
+            for record in self._read_partition(day):
+                if record.id == record_id:
+                    return record
+        return None
+
+    def drop_before(self, day: str) -> List[Tuple[str, str, str, str, float, int]]:
+        """删除早于 day（YYYY-MM-DD）的分区，返回被删除记录的聚合计数（格式同 partition_stats）"""
+        dropped = []
+        with self._lock:
+            old_days = [d for d in self.manifest if d < day]
+            for old_day in old_days:
+                dropped.extend(self.partition_stats(old_day))
+                try:
+                    os.remove(self._partition_path(old_day))
+                except FileNotFoundError:
+                    pass
+                del self.manifest[old_day]
+            if old_days:
+                atomic_write_json(self.manifest_file, self.manifest)
+        return dropped
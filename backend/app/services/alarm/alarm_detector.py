@@ -1,14 +1,16 @@
 import time
+import asyncio
 import logging
 from datetime import datetime
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple
 from app.models.alarm.alarm_models import AlarmConfig, AlarmRecord
-from app.services.system_service import get_cpu_usage, get_memory_usage, get_disk_usage
-from app.services.docker_service import get_containers
+from app.services import docker_service
+from app.services.metrics_cache import metrics_cache
 from app.services.alarm.alarm_storage import storage
 from app.services.alarm.alarm_aggregator import alarm_aggregator
+from app.services.alarm.threshold_rule import ThresholdRule
 from app.services.notification.notification_service import notification_service
-from app.services.websocket.websocket_service import send_alert_notification
+from app.services.websocket.websocket_service import bus, send_alert_notification
 
 logger = logging.getLogger("nas-monitor.alarm")
 
@@ -16,106 +18,190 @@ class AlarmDetector:
     """告警检测服务"""
     
     def __init__(self):
-        self.metric_history: Dict[str, List[Dict]] = {
-            "cpu_usage": [],
-            "memory_usage": [],
-            "disk_usage": []
-        }
-        self.max_history = 100  # 最大历史记录数
-        
-    def _update_metric_history(self, metric_type: str, value: float):
-        """更新指标历史记录"""
-        timestamp = time.time()
-        self.metric_history[metric_type].append({"timestamp": timestamp, "value": value})
-        
-        # 保持历史记录数量在限制内
-        if len(self.metric_history[metric_type]) > self.max_history:
-            self.metric_history[metric_type] = self.metric_history[metric_type][-self.max_history:]
-    
-    def _check_threshold(self, metric_type: str, current_value: float, threshold: float, duration: int) -> bool:
-        """检查指标是否在指定持续时间内超过阈值"""
-        if current_value <= threshold:
-            return False
-        
-        # 获取指定时间范围内的历史记录
-        now = time.time()
-        recent_metrics = [
-            m for m in self.metric_history[metric_type] 
-            if now - m["timestamp"] <= duration
-        ]
-        
-        # 如果没有足够的历史记录，暂时不触发告警
-        if len(recent_metrics) < 2:
-            return False
+        # Docker 事件模式：订阅容器 die/oom/health_status 事件实时告警
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._event_mode = False
+        # 最近收到 kill 事件的容器，用于区分主动停止和异常退出
+        self._recent_kills: Dict[str, float] = {}
+        self.kill_grace_period = 15
+        # 阈值规则状态，键为 (告警配置ID, 实例)，实例为磁盘挂载点或空字符串
+        self._rule_states: Dict[Tuple[str, str], ThresholdRule] = {}
         
-        # 检查最近的指标是否都超过阈值
-        return all(m["value"] > threshold for m in recent_metrics[-3:])  # 检查最近3个记录
-    
+    def _get_rule(self, config: AlarmConfig, instance: str = "") -> ThresholdRule:
+        """获取告警配置对应的规则状态，配置变更时保留当前状态"""
+        key = (config.id, instance)
+        rule = self._rule_states.get(key)
+        if rule is None:
+            rule = ThresholdRule(config.threshold, config.duration, config.clear_threshold)
+            self._rule_states[key] = rule
+        else:
+            rule.configure(config.threshold, config.duration, config.clear_threshold)
+        return rule
+
+    def _prune_rules(self, configs: List[AlarmConfig]):
+        """清理已删除或禁用的告警配置的规则状态"""
+        active_ids = {config.id for config in configs}
+        for key in [key for key in self._rule_states if key[0] not in active_ids]:
+            del self._rule_states[key]
+
+    async def _evaluate_rule(self, config: AlarmConfig, instance: str, value: float, message: str,
+                             resolved_message: str, details: Dict):
+        """将样本送入规则状态机，状态变化时创建或恢复告警"""
+        rule = self._get_rule(config, instance)
+        transition = rule.update(value, time.time())
+        if transition == "firing":
+            # 附带持续超限期间的样本，便于查看告警前的变化趋势
+            details = dict(details, samples=rule.pending_samples())
+            if instance:
+                details["instance"] = instance
+            record = await self._create_alarm_record(
+                alarm_type=config.alarm_type,
+                sub_type=config.sub_type,
+                severity=config.severity,
+                message=message,
+                details=details
+            )
+            rule.record_id = record.id if record else None
+        elif transition == "resolved":
+            record_id, rule.record_id = rule.record_id, None
+            # 触发时已有同类未处理告警、没有创建记录的，恢复时也不通知
+            if record_id is not None:
+                await self._resolve_alarm(record_id, config, resolved_message, details)
+
     async def detect_system_alerts(self):
         """检测系统告警"""
         # 获取系统指标
-        cpu_usage = get_cpu_usage()
-        memory_usage = get_memory_usage()
-        disk_usage = get_disk_usage()
-        
-        # 更新指标历史
-        self._update_metric_history("cpu_usage", cpu_usage["total_usage"])
-        self._update_metric_history("memory_usage", memory_usage["memory"]["percent"])
+        cpu_usage = await metrics_cache.aget("cpu")
+        memory_usage = await metrics_cache.aget("memory")
+        disk_usage = await metrics_cache.aget("disk")
         
         # 获取系统告警配置
         system_configs = [
             config for config in storage.get_alarm_configs() 
             if config.alarm_type == "system" and config.enabled
         ]
+        self._prune_rules(system_configs)
         
         # 检查CPU高负载
         for config in [c for c in system_configs if c.sub_type == "cpu_high"]:
-            if self._check_threshold(
-                "cpu_usage", 
-                cpu_usage["total_usage"], 
-                config.threshold, 
-                config.duration
-            ):
-                await self._create_alarm_record(
-                    alarm_type="system",
-                    sub_type="cpu_high",
-                    severity=config.severity,
-                    message=f"CPU使用率过高: {cpu_usage['total_usage']:.1f}%",
-                    details={"cpu_usage": cpu_usage}
-                )
+            await self._evaluate_rule(
+                config, "", cpu_usage["total_usage"],
+                message=f"CPU使用率过高: {cpu_usage['total_usage']:.1f}%",
+                resolved_message=f"CPU使用率已恢复: {cpu_usage['total_usage']:.1f}%",
+                details={"cpu_usage": cpu_usage}
+            )
         
         # 检查内存不足
         for config in [c for c in system_configs if c.sub_type == "memory_low"]:
-            if self._check_threshold(
-                "memory_usage", 
-                memory_usage["memory"]["percent"], 
-                config.threshold, 
-                config.duration
-            ):
-                await self._create_alarm_record(
-                    alarm_type="system",
-                    sub_type="memory_low",
-                    severity=config.severity,
-                    message=f"内存使用率过高: {memory_usage['memory']['percent']:.1f}%",
-                    details={"memory_usage": memory_usage}
-                )
+            await self._evaluate_rule(
+                config, "", memory_usage["memory"]["percent"],
+                message=f"内存使用率过高: {memory_usage['memory']['percent']:.1f}%",
+                resolved_message=f"内存使用率已恢复: {memory_usage['memory']['percent']:.1f}%",
+                details={"memory_usage": memory_usage}
+            )
         
-        # 检查磁盘空间不足
+        # 检查磁盘空间不足（每个挂载点独立计算持续时间）
         for config in [c for c in system_configs if c.sub_type == "disk_low"]:
             for disk in disk_usage:
-                if disk["percent"] > config.threshold:
-                    await self._create_alarm_record(
-                        alarm_type="system",
-                        sub_type="disk_low",
-                        severity=config.severity,
-                        message=f"磁盘空间不足: {disk['device']} {disk['percent']:.1f}%",
-                        details={"disk": disk}
-                    )
+                await self._evaluate_rule(
+                    config, disk["mountpoint"], disk["percent"],
+                    message=f"磁盘空间不足: {disk['device']} {disk['percent']:.1f}%",
+                    resolved_message=f"磁盘空间已恢复: {disk['device']} {disk['percent']:.1f}%",
+                    details={"disk": disk}
+                )
     
+    def start_event_mode(self, loop: asyncio.AbstractEventLoop):
+        """启用Docker事件模式，告警协程在 loop 中执行"""
+        if self._event_mode:
+            return
+        self._loop = loop
+        self._event_mode = True
+        docker_service.add_event_listener(self._on_docker_event)
+        docker_service.start_event_stream()
+        logger.info("Docker event alarm mode enabled")
+
+    def _get_docker_config(self, sub_type: str) -> Optional[AlarmConfig]:
+        """获取Docker告警配置，container_oom/container_unhealthy 未配置时沿用 container_exited"""
+        docker_configs = {
+            config.sub_type: config for config in storage.get_alarm_configs()
+            if config.alarm_type == "docker" and config.enabled
+        }
+        if sub_type in docker_configs:
+            return docker_configs[sub_type]
+        if sub_type in ("container_oom", "container_unhealthy"):
+            return docker_configs.get("container_exited")
+        return None
+
+    def _on_docker_event(self, action: str, event: Dict, attrs: Optional[Dict]):
+        """处理容器事件（在Docker事件线程中调用）"""
+        container_id = event.get("Actor", {}).get("ID") or event.get("id")
+        now = time.time()
+        # 清理超过宽限期仍没有 die 事件的 kill 记录
+        for cid in [cid for cid, killed_at in self._recent_kills.items() if now - killed_at >= self.kill_grace_period]:
+            del self._recent_kills[cid]
+
+        if action == "kill":
+            self._recent_kills[container_id] = now
+            return
+        if attrs is None:
+            return
+
+        container = docker_service.format_container(attrs)
+        exit_code = attrs["State"].get("ExitCode")
+        restart_count = attrs.get("RestartCount", 0)
+
+        if action == "die":
+            # docker stop / 手动 kill 会先产生 kill 事件，不视为异常退出
+            killed_at = self._recent_kills.pop(container_id, None)
+            if killed_at is not None and now - killed_at < self.kill_grace_period:
+                return
+            sub_type = "container_exited"
+            message = f"容器异常退出: {container['name']} (exit code {exit_code}, 重启 {restart_count} 次)"
+        elif action == "oom":
+            sub_type = "container_oom"
+            message = f"容器内存溢出: {container['name']} (重启 {restart_count} 次)"
+        elif action == "health_status" and event.get("Action", "").endswith("unhealthy"):
+            sub_type = "container_unhealthy"
+            message = f"容器健康检查失败: {container['name']}"
+        else:
+            return
+
+        if self._loop is None:
+            return
+
+        # 告警配置在事件循环中读取，不在事件线程中访问存储
+        asyncio.run_coroutine_threadsafe(
+            self._create_docker_alarm(sub_type, message, {
+                "container": container,
+                "exit_code": exit_code,
+                "restart_count": restart_count,
+                "oom_killed": attrs["State"].get("OOMKilled", False),
+                "event": event.get("Action"),
+            }),
+            self._loop
+        )
+
+    async def _create_docker_alarm(self, sub_type: str, message: str, details: Dict):
+        """按Docker告警配置创建事件告警，未启用对应配置时忽略"""
+        config = self._get_docker_config(sub_type)
+        if config is None:
+            return
+        await self._create_alarm_record(
+            alarm_type="docker",
+            sub_type=sub_type,
+            severity=config.severity,
+            message=message,
+            details=details
+        )
+
     async def detect_docker_alerts(self):
         """检测Docker告警"""
+        # 事件模式正常时由事件实时告警，只在事件流中断时回退到轮询
+        if self._event_mode and docker_service.is_event_stream_live():
+            return
+
         # 获取Docker容器
-        containers = get_containers()
+        containers = await metrics_cache.aget("containers")
         
         # 获取Docker告警配置
         docker_configs = [
@@ -156,16 +242,12 @@ class AlarmDetector:
                         details={"ip_address": client_ip, "ip_info": access_ip.dict()}
                     )
     
-    async def _create_alarm_record(self, alarm_type: str, sub_type: str, severity: str, message: str, details: Dict):
-        """创建告警记录并发送通知"""
-        # 检查是否已有相同类型的未处理告警
-        existing_records = storage.get_alarm_records(limit=10)
-        for record in existing_records:
-            if (record.alarm_type == alarm_type and 
-                record.sub_type == sub_type and 
-                record.status == "unprocessed"):
-                # 已有相同类型的未处理告警，不再创建新的
-                return
+    async def _create_alarm_record(self, alarm_type: str, sub_type: str, severity: str, message: str,
+                                   details: Dict) -> Optional[AlarmRecord]:
+        """创建告警记录并发送通知，同一实例已有相同类型的未处理告警时返回 None"""
+        # 已有相同类型的未处理告警，不再创建新的（按 details.instance 区分磁盘挂载点等实例）
+        if storage.has_open_alarm(alarm_type, sub_type, details.get("instance", "")):
+            return None
         
         # 创建新的告警记录
         record = AlarmRecord(
@@ -187,8 +269,10 @@ class AlarmDetector:
         storage.create_alarm_record(record)
         logger.info(f"Created alarm: {record.message}")
         
-        # 发送通知
-        await notification_service.send_notification(record.message, record.severity)
+        # 发送通知（入队后立即返回，不等待第三方接口）
+        notification_service.enqueue_notification(
+            record.message, record.severity, category=f"{record.alarm_type}/{record.sub_type}"
+        )
         
         # 通过WebSocket发送告警通知
         await send_alert_notification({
@@ -198,9 +282,29 @@ class AlarmDetector:
             "severity": record.severity,
             "message": record.message,
             "details": record.details,
-            "timestamp": record.timestamp.isoformat()
+            "timestamp": record.timestamp.isoformat(),
+            "event": "firing"
         })
+        return record
+
+    async def _resolve_alarm(self, record_id: str, config: AlarmConfig, message: str, details: Dict):
+        """指标恢复到恢复阈值以下，记录恢复时间并发送恢复通知"""
+        resolved_at = datetime.now()
+        storage.update_alarm_record(record_id, {"resolved_at": resolved_at})
+        logger.info(f"Resolved alarm: {message}")
+
+        notification_service.enqueue_notification(message, "info", category=f"{config.alarm_type}/{config.sub_type}")
 
+        await send_alert_notification({
+            "id": record_id,
+            "alarm_type": config.alarm_type,
+            "sub_type": config.sub_type,
+            "severity": config.severity,
+            "message": message,
+            "details": details,
+            "timestamp": resolved_at.isoformat(),
+            "event": "resolved"
+        })
     
     async def run_detection(self, client_ip: str = None):
         """运行所有告警检测"""
@@ -209,5 +313,18 @@ class AlarmDetector:
         if client_ip:
             await self.detect_network_alerts(client_ip)
 
+    async def request_detection(self, client_ip: str = None):
+        """手动触发告警检测，本进程不运行告警检测（worker）时请求 collector 进程检测"""
+        if bus.collects:
+            await self.run_detection(client_ip)
+        else:
+            await bus.publish("detect", {"client_ip": client_ip})
+
 # 创建全局告警检测器实例
 alarm_detector = AlarmDetector()
+
+async def _on_detect(channel: str, payload: Dict):
+    if bus.collects:
+        await alarm_detector.run_detection(payload.get("client_ip"))
+
+bus.on("detect", _on_detect)
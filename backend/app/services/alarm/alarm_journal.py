@@ -0,0 +1,127 @@
+import os
+import json
+import logging
+import threading
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("nas-monitor.alarm_journal")
+
+
+def atomic_write_json(path: str, data: Any, indent: Optional[int] = 2):
+    """原子写入 JSON 文件：先写临时文件并 fsync，再用 os.replace 替换"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f, default=str, indent=indent)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class AppendOnlyJournal:
+    """追加写日志
+
+    每次变更追加一行 JSON（{"op": "put"|"delete", "key": ..., "data": ...}），
+    写入开销与已有数据量无关。启动时在快照基础上按顺序重放，"put" 写入完整对象，
+    重放是幂等的，因此压缩时先原子替换快照再清空日志，中途崩溃也不会丢数据。
+    进程崩溃导致的半行会在重放时被跳过。
+
+    只读进程（多 worker 部署的 worker）记录已读取的位置，用 tail() 读取写入进程之后追加的变更。
+    """
+
+    def __init__(self, path: str, fsync: bool = False):
+        """fsync 为 False 时只保证写入内核缓冲区"""
+        self.path = path
+        self.fsync = fsync
+        self.entries = 0
+        # 已读取到的位置和日志文件的 inode，reset() 会替换文件，读取方据此发现日志被清空
+        self.offset = 0
+        self._inode: Optional[int] = None
+        self._lock = threading.Lock()
+        self._file = None
+
+    def _open(self):
+        if self._file is None:
+            self._file = open(self.path, "a")
+        return self._file
+
+    def append(self, op: str, key: str, data: Optional[Dict] = None):
+        """追加一条变更"""
+        line = json.dumps({"op": op, "key": key, "data": data}, default=str, separators=(",", ":"))
+        with self._lock:
+            f = self._open()
+            f.write(line + "\n")
+            f.flush()
+            if self.fsync:
+                os.fsync(f.fileno())
+            self.entries += 1
+
+    def replay(self) -> Iterator[Dict]:
+        """按写入顺序读取日志中的变更"""
+        self.offset = 0
+        self._inode = None
+        if not os.path.exists(self.path):
+            return
+        count = 0
+        with open(self.path, "rb") as f:
+            self._inode = os.fstat(f.fileno()).st_ino
+            for line_no, raw in enumerate(f, 1):
+                if raw.endswith(b"\n"):
+                    self.offset += len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Skipping corrupt journal line {line_no} in {self.path}")
+                    continue
+                count += 1
+                yield entry
+        self.entries = count
+
+    def tail(self) -> Optional[List[Dict]]:
+        """读取其他进程在上次读取之后追加的完整行；日志已被清空或替换时返回 None，需要重新加载快照"""
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return [] if self._inode is None else None
+        if st.st_ino != self._inode or st.st_size < self.offset:
+            return None
+        entries = []
+        if st.st_size == self.offset:
+            return entries
+        with open(self.path, "rb") as f:
+            f.seek(self.offset)
+            for raw in f:
+                # 写入方还没写完的行留到下次读取
+                if not raw.endswith(b"\n"):
+                    break
+                self.offset += len(raw)
+                line = raw.strip()
+                if not line:
+                    continue
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    logger.warning(f"Skipping corrupt journal line in {self.path}")
+        return entries
+
+    def reset(self):
+        """清空日志（快照已包含全部变更后调用），用新文件替换，读取方能发现日志已被清空"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+            self.entries = 0
+
+    def close(self):
+        """关闭日志文件"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
@@ -0,0 +1,172 @@
+import time
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.models.alarm.alarm_models import AlarmRecord
+
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+# 各粒度的桶保留时间（秒），更早的时间段退化为更粗的粒度
+BUCKET_RETENTION = {
+    MINUTE: 2 * DAY,
+    HOUR: 90 * DAY,
+    DAY: None,
+}
+
+GRANULARITIES = {"minute": MINUTE, "hour": HOUR, "day": DAY}
+
+# 桶内计数键：(类型键, 告警级别)
+BucketKey = Tuple[str, str]
+
+
+def type_key(alarm_type: str, sub_type: str) -> str:
+    """统计中使用的类型键"""
+    return f"{alarm_type}_{sub_type}"
+
+
+class AlarmStatistics:
+    """增量维护的告警统计
+
+    总数、按级别、按类型、按状态的计数在记录创建 / 更新 / 删除时更新；
+    同时按分钟、小时、天分桶计数，任意时间范围的统计只需合并覆盖该范围的
+    少量桶（整天用天桶，整小时用小时桶，边缘用分钟桶），与记录总数无关。
+    分钟桶保留 2 天、小时桶保留 90 天，更早的范围按小时 / 天的精度统计。
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        with self._lock:
+            self.total = 0
+            self.by_severity: Dict[str, int] = {"info": 0, "warning": 0, "critical": 0}
+            self.by_type: Dict[str, int] = {}
+            self.by_status: Dict[str, int] = {}
+            self._buckets: Dict[int, Dict[int, Dict[BucketKey, int]]] = {size: {} for size in BUCKET_RETENTION}
+            self._last_prune = 0.0
+
+    @staticmethod
+    def _inc(counter: Dict, key, delta: int):
+        value = counter.get(key, 0) + delta
+        if value:
+            counter[key] = value
+        else:
+            counter.pop(key, None)
+
+    def add_counts(self, alarm_type: str, sub_type: str, severity: str, status: str, timestamp: float,
+                   count: int = 1, precision: int = MINUTE):
+        """累加一组计数（删除时 count 为负数）；按小时精度聚合的数据不写入分钟桶"""
+        tkey = type_key(alarm_type, sub_type)
+        with self._lock:
+            self.total += count
+            self.by_severity[severity] = self.by_severity.get(severity, 0) + count
+            self._inc(self.by_type, tkey, count)
+            self._inc(self.by_status, status, count)
+            now = time.time()
+            for size, retention in BUCKET_RETENTION.items():
+                if size < precision or (retention is not None and timestamp < now - retention):
+                    continue
+                bucket = self._buckets[size].setdefault(int(timestamp // size), {})
+                self._inc(bucket, (tkey, severity), count)
+            if now - self._last_prune > MINUTE:
+                self._prune(now)
+
+    def add(self, record: AlarmRecord):
+        """记录创建"""
+        self.add_counts(record.alarm_type, record.sub_type, record.severity, record.status,
+                        record.timestamp.timestamp())
+
+    def remove(self, record: AlarmRecord):
+        """记录删除"""
+        self.add_counts(record.alarm_type, record.sub_type, record.severity, record.status,
+                        record.timestamp.timestamp(), count=-1)
+
+    def change_status(self, old_status: str, new_status: str):
+        """记录状态变化（时间和类型不变，只影响状态计数）"""
+        if old_status == new_status:
+            return
+        with self._lock:
+            self._inc(self.by_status, old_status, -1)
+            self._inc(self.by_status, new_status, 1)
+
+    def _prune(self, now: float):
+        """删除超出保留时间的桶（调用方需持有锁）"""
+        self._last_prune = now
+        for size, retention in BUCKET_RETENTION.items():
+            if retention is None:
+                continue
+            oldest = int((now - retention) // size)
+            buckets = self._buckets[size]
+            for index in [index for index in buckets if index < oldest]:
+                del buckets[index]
+
+    def _cover(self, since: float, until: float) -> Iterable[Tuple[int, int]]:
+        """将 [since, until) 拆分为尽量少的 (粒度, 桶序号)，超出保留时间的边缘按更粗粒度对齐"""
+        now = time.time()
+        t = int(since // MINUTE * MINUTE)
+        until = int(-(-until // MINUTE) * MINUTE)
+        while t < until:
+            for size in (DAY, HOUR, MINUTE):
+                retention = BUCKET_RETENTION[size]
+                if t % size == 0 and t + size <= until and (retention is None or t >= now - retention):
+                    yield size, t // size
+                    t += size
+                    break
+            else:
+                # 分钟 / 小时桶已过期，退化为包含 t 的更粗的桶
+                for size in (HOUR, DAY):
+                    retention = BUCKET_RETENTION[size]
+                    if retention is None or t >= now - retention:
+                        yield size, t // size
+                        t = (t // size + 1) * size
+                        break
+
+    def count_range(self, since: float, until: Optional[float] = None, group_by: Optional[str] = None):
+        """统计 [since, until) 内的告警数：group_by 为 None 时返回总数，"type" / "severity" 时返回分组计数"""
+        until = time.time() if until is None else until
+        result: Dict[str, int] = {}
+        total = 0
+        with self._lock:
+            for size, index in self._cover(since, until):
+                for (tkey, severity), count in self._buckets[size].get(index, {}).items():
+                    total += count
+                    if group_by == "type":
+                        result[tkey] = result.get(tkey, 0) + count
+                    elif group_by == "severity":
+                        result[severity] = result.get(severity, 0) + count
+        return total if group_by is None else result
+
+    def series(self, granularity: str, since: float, until: Optional[float] = None,
+               group_by: Optional[str] = None) -> List[Dict]:
+        """按粒度返回时间序列，每个桶一项 {"timestamp", "count"}，指定 group_by 时附带分组计数 groups"""
+        size = GRANULARITIES[granularity]
+        until = time.time() if until is None else until
+        points = []
+        with self._lock:
+            buckets = self._buckets[size]
+            for index in range(int(since // size), int(-(-until // size))):
+                bucket = buckets.get(index, {})
+                point = {"timestamp": index * size, "count": sum(bucket.values())}
+                if group_by:
+                    groups: Dict[str, int] = {}
+                    for (tkey, severity), count in bucket.items():
+                        name = tkey if group_by == "type" else severity
+                        groups[name] = groups.get(name, 0) + count
+                    point["groups"] = groups
+                points.append(point)
+        return points
+
+    def summary(self) -> Dict:
+        """当前累计统计"""
+        recent = self.count_range(time.time() - DAY)
+        with self._lock:
+            return {
+                "total": self.total,
+                "by_severity": dict(self.by_severity),
+                "by_type": dict(self.by_type),
+                "by_status": dict(self.by_status),
+                "recent": recent,
+            }
@@ -1,123 +1,418 @@
 import json
 import os
+import base64
 import logging
-from datetime import datetime
-from typing import List, Dict, Optional
+import threading
+from datetime import datetime, timedelta
+from typing import List, Dict, Optional, Tuple
+from app.config import env_number
 from app.models.alarm.alarm_models import AlarmConfig, AlarmRecord, AccessIP
+from app.services.alarm.alarm_journal import AppendOnlyJournal, atomic_write_json
+from app.services.alarm.record_index import AlarmRecordIndex, RecordFilter
+from app.services.alarm.alarm_archive import ColdStore, RetentionPolicy, WarmStore, record_from_dict, record_key
+from app.services.alarm.alarm_statistics import AlarmStatistics, BUCKET_RETENTION, HOUR, MINUTE
+from app.services.websocket.backplane import runs_background_jobs
+from app.services.websocket.websocket_service import bus
 
 logger = logging.getLogger("nas-monitor.alarm_storage")
 
+
+def _file_stat(path: str) -> Optional[tuple]:
+    try:
+        st = os.stat(path)
+        return st.st_ino, st.st_mtime_ns, st.st_size
+    except FileNotFoundError:
+        return None
+
+
+def _jsonable(data: Dict) -> Dict:
+    """datetime 转为 ISO 字符串，便于通过广播总线转发"""
+    return {key: value.isoformat() if isinstance(value, datetime) else value for key, value in data.items()}
+
+
 class AlarmStorage:
-    """告警存储服务"""
+    """告警存储服务
+
+    告警配置数据量小，变更时整体重写；告警记录和访问IP写入追加日志，
+    日志条目数达到阈值时压缩为快照文件。
+
+    告警记录分三层保存：hot（内存 + 追加日志）、warm（SQLite）、cold（按天 gzip 分区），
+    按 RetentionPolicy 逐层下沉，查询会依次跨越三层。每层的记录都比上一层更旧。
+
+    多 worker 部署时只有 collector 进程（writer）写入文件：worker 在内存中应用变更后通过
+    广播总线转发给 collector 执行，读取时发现快照或配置文件变化则重新加载，追加日志只读取新增部分。
+    """
     
-    def __init__(self, storage_dir: str = "./data"):
+    def __init__(self, storage_dir: str = "./data", compact_entries: Optional[int] = None,
+                 retention: Optional[RetentionPolicy] = None, writer: Optional[bool] = None):
         self.storage_dir = storage_dir
+        self.writer = runs_background_jobs() if writer is None else writer
         self.alarm_configs: Dict[str, AlarmConfig] = {}
         self.alarm_records: Dict[str, AlarmRecord] = {}
         self.access_ips: Dict[str, AccessIP] = {}
+        # 告警记录按时间排序的索引，避免每次查询都排序
+        self.record_index = AlarmRecordIndex()
+        if compact_entries is None:
+            compact_entries = env_number("ALARM_JOURNAL_COMPACT_ENTRIES", 1000, int)
+        self.compact_entries = compact_entries
+        self._lock = threading.RLock()
         
         # 确保存储目录存在
         os.makedirs(self.storage_dir, exist_ok=True)
         
+        self.config_file = os.path.join(self.storage_dir, "alarm_configs.json")
+        self.records_file = os.path.join(self.storage_dir, "alarm_records.json")
+        self.ips_file = os.path.join(self.storage_dir, "access_ips.json")
+        fsync = os.getenv("ALARM_JOURNAL_FSYNC", "false").lower() in ("1", "true", "yes")
+        self.records_journal = AppendOnlyJournal(os.path.join(self.storage_dir, "alarm_records.journal"), fsync)
+        self.ips_journal = AppendOnlyJournal(os.path.join(self.storage_dir, "access_ips.journal"), fsync)
+        self.retention = retention or RetentionPolicy()
+        self.warm = WarmStore(os.path.join(self.storage_dir, "alarm_warm.db"))
+        self.cold = ColdStore(os.path.join(self.storage_dir, "alarm_cold"))
+        # 增量维护的统计，启动时从三层数据重建
+        self.statistics = AlarmStatistics()
+        # worker 上次加载时各文件的状态
+        self._file_stats: Dict[str, Optional[tuple]] = {}
+        
         # 加载数据
         self._load_data()
     
+    @staticmethod
+    def _parse_record(item: Dict) -> AlarmRecord:
+        """转换日期字符串为datetime对象"""
+        return record_from_dict(item)
+    
+    @staticmethod
+    def _parse_ip(item: Dict) -> AccessIP:
+        """转换日期字符串为datetime对象"""
+        item["first_seen"] = datetime.fromisoformat(item["first_seen"])
+        item["last_seen"] = datetime.fromisoformat(item["last_seen"])
+        return AccessIP(**item)
+    
     def _load_data(self):
-        """从文件加载数据"""
-        # 加载告警配置
-        config_file = os.path.join(self.storage_dir, "alarm_configs.json")
-        if os.path.exists(config_file):
+        """从快照文件加载数据并重放追加日志"""
+        self._load_configs()
+        self._load_hot()
+        
+        # 启动时按保留策略下沉，并把重放过的日志合并进快照（只在写入进程中执行）
+        if self.writer:
+            self.enforce_retention()
+            if self.records_journal.entries or self.ips_journal.entries:
+                self.compact()
+        self.rebuild_statistics()
+    
+    def _load_configs(self):
+        """加载告警配置"""
+        self._file_stats[self.config_file] = _file_stat(self.config_file)
+        configs: Dict[str, AlarmConfig] = {}
+        if os.path.exists(self.config_file):
             try:
-                with open(config_file, "r") as f:
+                with open(self.config_file, "r") as f:
                     data = json.load(f)
                     for item in data:
                         # 转换日期字符串为datetime对象
                         item["created_at"] = datetime.fromisoformat(item["created_at"])
                         item["updated_at"] = datetime.fromisoformat(item["updated_at"])
                         config = AlarmConfig(**item)
-                        self.alarm_configs[config.id] = config
+                        configs[config.id] = config
             except Exception as e:
                 logger.error(f"Error loading alarm configs: {e}")
+        self.alarm_configs = configs
+    
+    def _load_hot(self):
+        """加载告警记录（热数据）和访问IP的快照并重放追加日志"""
+        for path in (self.records_file, self.ips_file, self.cold.manifest_file):
+            self._file_stats[path] = _file_stat(path)
+        self.alarm_records = {}
+        self.access_ips = {}
+        self.record_index = AlarmRecordIndex()
         
         # 加载告警记录
-        records_file = os.path.join(self.storage_dir, "alarm_records.json")
-        if os.path.exists(records_file):
+        if os.path.exists(self.records_file):
             try:
-                with open(records_file, "r") as f:
-                    data = json.load(f)
-                    for item in data:
-                        # 转换日期字符串为datetime对象
-                        item["timestamp"] = datetime.fromisoformat(item["timestamp"])
-                        if item["processed_at"]:
-                            item["processed_at"] = datetime.fromisoformat(item["processed_at"])
-                        record = AlarmRecord(**item)
+                with open(self.records_file, "r") as f:
+                    for item in json.load(f):
+                        record = self._parse_record(item)
                         self.alarm_records[record.id] = record
             except Exception as e:
                 logger.error(f"Error loading alarm records: {e}")
+        self._replay(self.records_journal, self.alarm_records, self._parse_record)
         
         # 加载访问IP
-        ips_file = os.path.join(self.storage_dir, "access_ips.json")
-        if os.path.exists(ips_file):
+        if os.path.exists(self.ips_file):
             try:
-                with open(ips_file, "r") as f:
-                    data = json.load(f)
-                    for item in data:
-                        # 转换日期字符串为datetime对象
-                        item["first_seen"] = datetime.fromisoformat(item["first_seen"])
-                        item["last_seen"] = datetime.fromisoformat(item["last_seen"])
-                        ip = AccessIP(**item)
+                with open(self.ips_file, "r") as f:
+                    for item in json.load(f):
+                        ip = self._parse_ip(item)
                         self.access_ips[ip.ip_address] = ip
             except Exception as e:
                 logger.error(f"Error loading access ips: {e}")
+        self._replay(self.ips_journal, self.access_ips, self._parse_ip)
+        
+        for record in self.alarm_records.values():
+            self.record_index.put(record)
     
-    def _save_data(self):
-        """保存数据到文件"""
-        # 保存告警配置
-        config_file = os.path.join(self.storage_dir, "alarm_configs.json")
+    def refresh(self):
+        """worker 进程读取前同步 collector 写入的变更：文件被替换时重新加载，否则只应用日志新增部分"""
+        if self.writer:
+            return
+        with self._lock:
+            if _file_stat(self.config_file) != self._file_stats.get(self.config_file):
+                self._load_configs()
+            snapshots_changed = any(
+                _file_stat(path) != self._file_stats.get(path)
+                for path in (self.records_file, self.ips_file, self.cold.manifest_file)
+            )
+            record_entries = None if snapshots_changed else self.records_journal.tail()
+            ip_entries = None if snapshots_changed else self.ips_journal.tail()
+            if record_entries is None or ip_entries is None:
+                self.cold = ColdStore(os.path.join(self.storage_dir, "alarm_cold"))
+                self._load_hot()
+                self.rebuild_statistics()
+                return
+            for entry in record_entries:
+                self._apply_record_entry(entry)
+            for entry in ip_entries:
+                try:
+                    if entry["op"] == "put":
+                        self.access_ips[entry["key"]] = self._parse_ip(entry["data"])
+                    elif entry["op"] == "delete":
+                        self.access_ips.pop(entry["key"], None)
+                except Exception as e:
+                    logger.warning(f"Skipping invalid journal entry in {self.ips_journal.path}: {e}")
+    
+    def _apply_record_entry(self, entry: Dict):
+        """应用 collector 追加的一条告警记录变更，同步索引和统计（调用方需持有锁）"""
         try:
-            with open(config_file, "w") as f:
-                data = [config.dict() for config in self.alarm_configs.values()]
-                json.dump(data, f, default=str, indent=2)
+            old = self.alarm_records.get(entry["key"])
+            if entry["op"] == "put":
+                record = self._parse_record(entry["data"])
+                self.alarm_records[record.id] = record
+                self.record_index.put(record)
+                if old is None:
+                    self.statistics.add(record)
+                else:
+                    self.statistics.change_status(old.status, record.status)
+            elif entry["op"] == "delete" and old is not None:
+                # 记录被下沉到 warm 层，统计不变
+                del self.alarm_records[entry["key"]]
+                self.record_index.remove(entry["key"])
+        except Exception as e:
+            logger.warning(f"Skipping invalid journal entry in {self.records_journal.path}: {e}")
+    
+    def _forward(self, op: str, data: Dict):
+        """worker 进程不写存储，把变更通过广播总线交给 collector 进程执行"""
+        try:
+            bus.publish_soon("alarm_storage", {"op": op, "data": data})
+        except RuntimeError:
+            logger.error(f"转发告警存储变更 {op} 失败：没有运行中的事件循环")
+    
+    def apply_change(self, op: str, data: Dict):
+        """执行 worker 进程转发的变更（只在写入进程中调用）"""
+        if op == "put_config":
+            config = AlarmConfig(**data)
+            self.alarm_configs[config.id] = config
+            self._save_configs()
+        elif op == "delete_config":
+            self.delete_alarm_config(data["id"])
+        elif op == "create_record":
+            self.create_alarm_record(AlarmRecord(**data))
+        elif op == "update_record":
+            updates = {
+                key: datetime.fromisoformat(value) if key.endswith("_at") and isinstance(value, str) else value
+                for key, value in data["updates"].items()
+            }
+            self.update_alarm_record(data["id"], updates)
+        elif op == "put_ip":
+            ip = AccessIP(**data)
+            with self._lock:
+                self.access_ips[ip.ip_address] = ip
+                self._append_ip(ip)
+        else:
+            logger.warning(f"未知的告警存储变更: {op}")
+    
+    @staticmethod
+    def _replay(journal: AppendOnlyJournal, target: Dict, parse):
+        """在快照基础上重放追加日志"""
+        try:
+            for entry in journal.replay():
+                try:
+                    if entry["op"] == "put":
+                        target[entry["key"]] = parse(entry["data"])
+                    elif entry["op"] == "delete":
+                        target.pop(entry["key"], None)
+                except Exception as e:
+                    logger.warning(f"Skipping invalid journal entry in {journal.path}: {e}")
+        except Exception as e:
+            logger.error(f"Error replaying journal {journal.path}: {e}")
+    
+    def _save_configs(self):
+        """保存告警配置（整体原子重写）"""
+        try:
+            atomic_write_json(self.config_file, [config.dict() for config in self.alarm_configs.values()])
         except Exception as e:
             logger.error(f"Error saving alarm configs: {e}")
-        
-        # 保存告警记录（只保留最近1000条）
-        records_file = os.path.join(self.storage_dir, "alarm_records.json")
+    
+    def _append_record(self, record: AlarmRecord):
+        """追加一条告警记录变更"""
         try:
-            # 按时间排序，保留最近1000条
-            sorted_records = sorted(
-                self.alarm_records.values(), 
-                key=lambda x: x.timestamp, 
-                reverse=True
-            )[:1000]
-            data = [record.dict() for record in sorted_records]
-            with open(records_file, "w") as f:
-                json.dump(data, f, default=str, indent=2)
+            self.records_journal.append("put", record.id, record.dict())
         except Exception as e:
-            logger.error(f"Error saving alarm records: {e}")
-        
-        # 保存访问IP
-        ips_file = os.path.join(self.storage_dir, "access_ips.json")
+            logger.error(f"Error appending alarm record: {e}")
+        self._maybe_compact()
+    
+    def _append_ip(self, ip: AccessIP):
+        """追加一条访问IP变更（worker 转发给 collector）"""
+        if not self.writer:
+            self._forward("put_ip", _jsonable(ip.dict()))
+            return
         try:
-            with open(ips_file, "w") as f:
-                data = [ip.dict() for ip in self.access_ips.values()]
-                json.dump(data, f, default=str, indent=2)
+            self.ips_journal.append("put", ip.ip_address, ip.dict())
         except Exception as e:
-            logger.error(f"Error saving access ips: {e}")
+            logger.error(f"Error appending access ip: {e}")
+        self._maybe_compact()
+    
+    def _maybe_compact(self):
+        """日志条目数达到阈值时压缩"""
+        if self.writer and max(self.records_journal.entries, self.ips_journal.entries) >= self.compact_entries:
+            self.compact()
+    
+    def compact(self):
+        """将内存中的数据写成快照并清空追加日志（worker 的内存数据可能落后于日志，不执行）"""
+        if not self.writer:
+            return
+        with self._lock:
+            # 保存告警记录（只包含热数据，更旧的记录已下沉到 warm / cold）
+            try:
+                sorted_records = [
+                    self.alarm_records[record_id] for record_id in self.record_index.latest(len(self.record_index))
+                ]
+                atomic_write_json(self.records_file, [record.dict() for record in sorted_records])
+                self.records_journal.reset()
+            except Exception as e:
+                logger.error(f"Error compacting alarm records: {e}")
+            
+            # 保存访问IP
+            try:
+                atomic_write_json(self.ips_file, [ip.dict() for ip in self.access_ips.values()])
+                self.ips_journal.reset()
+            except Exception as e:
+                logger.error(f"Error compacting access ips: {e}")
+    
+    def close(self):
+        """压缩并关闭追加日志"""
+        self.compact()
+        self.records_journal.close()
+        self.ips_journal.close()
+        self.warm.close()
+    
+    def _evict_hot(self, now: Optional[datetime] = None) -> int:
+        """将超出条数或天数上限的最旧热数据移到 warm 层（调用方需持有锁）"""
+        now = now or datetime.now()
+        cutoff = (now - timedelta(days=self.retention.hot_max_age_days)).timestamp()
+        excess = len(self.record_index) - self.retention.hot_max_records
+        evicted_ids = []
+        for record_id in reversed(self.record_index.latest(len(self.record_index))):
+            if len(evicted_ids) < excess:
+                evicted_ids.append(record_id)
+            elif self.alarm_records[record_id].timestamp.timestamp() < cutoff:
+                evicted_ids.append(record_id)
+            else:
+                break
+        if not evicted_ids:
+            return 0
+        # 先写入 warm 再从热数据删除，中途崩溃时记录最多在两层各有一份，查询时按层去重
+        self.warm.put_many([self.alarm_records[record_id] for record_id in evicted_ids])
+        for record_id in evicted_ids:
+            del self.alarm_records[record_id]
+            self.record_index.remove(record_id)
+            self.records_journal.append("delete", record_id)
+        return len(evicted_ids)
+    
+    def enforce_retention(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """按保留策略在各层之间移动和删除记录，返回移动到 warm、cold 以及删除的记录数"""
+        now = now or datetime.now()
+        result = {"to_warm": 0, "to_cold": 0, "dropped": 0}
+        if not self.writer:
+            return result
+        with self._lock:
+            try:
+                result["to_warm"] = self._evict_hot(now)
+            except Exception as e:
+                logger.error(f"Error evicting hot alarm records: {e}")
+            
+            try:
+                cutoff = (now - timedelta(days=self.retention.warm_max_age_days)).timestamp()
+                while True:
+                    records = self.warm.older_than(cutoff)
+                    if not records:
+                        break
+                    # 先追加到 cold 再从 warm 删除
+                    self.cold.append(records)
+                    self.warm.delete_many([record.id for record in records])
+                    result["to_cold"] += len(records)
+            except Exception as e:
+                logger.error(f"Error archiving warm alarm records: {e}")
+            
+            if self.retention.cold_max_age_days > 0:
+                try:
+                    oldest_day = (now - timedelta(days=self.retention.cold_max_age_days)).strftime("%Y-%m-%d")
+                    for alarm_type, sub_type, severity, status, hour, count in self.cold.drop_before(oldest_day):
+                        self.statistics.add_counts(alarm_type, sub_type, severity, status, hour, -count, HOUR)
+                        result["dropped"] += count
+                except Exception as e:
+                    logger.error(f"Error dropping cold alarm partitions: {e}")
+        
+        if any(result.values()):
+            logger.info(f"Alarm retention: {result}")
+            self._maybe_compact()
+        return result
+    
+    def rebuild_statistics(self):
+        """从 hot / warm / cold 三层重建统计（warm 用 SQL 聚合，cold 用 manifest 中的小时计数）"""
+        with self._lock:
+            self.statistics.clear()
+            for record in self.alarm_records.values():
+                self.statistics.add(record)
+            try:
+                minute_since = datetime.now().timestamp() - BUCKET_RETENTION[MINUTE]
+                for alarm_type, sub_type, severity, status, ts, count, size in self.warm.aggregate(minute_since):
+                    self.statistics.add_counts(alarm_type, sub_type, severity, status, ts, count, size)
+            except Exception as e:
+                logger.error(f"Error aggregating warm alarm records: {e}")
+            for day in list(self.cold.manifest.keys()):
+                try:
+                    for alarm_type, sub_type, severity, status, hour, count in self.cold.partition_stats(day):
+                        self.statistics.add_counts(alarm_type, sub_type, severity, status, hour, count, HOUR)
+                except Exception as e:
+                    logger.error(f"Error aggregating cold alarm partition {day}: {e}")
+    
+    def retention_stats(self) -> Dict:
+        """各层记录数和保留策略"""
+        self.refresh()
+        return {
+            "policy": self.retention.to_dict(),
+            "hot": len(self.record_index),
+            "warm": self.warm.count(),
+            "cold": self.cold.count(),
+            "cold_partitions": len(self.cold.manifest),
+        }
     
     # 告警配置管理
     def get_alarm_configs(self) -> List[AlarmConfig]:
         """获取所有告警配置"""
+        self.refresh()
         return list(self.alarm_configs.values())
     
     def get_alarm_config(self, config_id: str) -> Optional[AlarmConfig]:
         """根据ID获取告警配置"""
+        self.refresh()
         return self.alarm_configs.get(config_id)
     
     def create_alarm_config(self, config: AlarmConfig) -> AlarmConfig:
         """创建告警配置"""
         self.alarm_configs[config.id] = config
-        self._save_data()
+        self._persist_config(config)
         return config
     
     def update_alarm_config(self, config_id: str, updates: dict) -> Optional[AlarmConfig]:
@@ -132,58 +427,208 @@ class AlarmStorage:
         
         config.updated_at = datetime.now()
         self.alarm_configs[config_id] = config
-        self._save_data()
+        self._persist_config(config)
         return config
     
     def delete_alarm_config(self, config_id: str) -> bool:
         """删除告警配置"""
         if config_id in self.alarm_configs:
             del self.alarm_configs[config_id]
-            self._save_data()
+            if self.writer:
+                self._save_configs()
+            else:
+                self._forward("delete_config", {"id": config_id})
             return True
         return False
     
+    def _persist_config(self, config: AlarmConfig):
+        if self.writer:
+            self._save_configs()
+        else:
+            self._forward("put_config", _jsonable(config.dict()))
+    
     # 告警记录管理
+    def _tier_before(self, before: Optional[Tuple[float, str]], tier_oldest: Optional[Tuple[float, str]]):
+        """下一层的游标上界：下一层只返回比上一层最旧记录更旧的记录，避免重复"""
+        if tier_oldest is None:
+            return before
+        if before is None:
+            return tier_oldest
+        return min(before, tier_oldest)
+    
     def get_alarm_records(self, limit: int = 100, offset: int = 0) -> List[AlarmRecord]:
-        """获取告警记录"""
-        sorted_records = sorted(
-            self.alarm_records.values(), 
-            key=lambda x: x.timestamp, 
-            reverse=True
+        """获取告警记录（按时间倒序，跨越 hot / warm / cold 三层）"""
+        self.refresh()
+        with self._lock:
+            records = [self.alarm_records[record_id] for record_id in self.record_index.latest(limit, offset)]
+            if len(records) >= limit:
+                return records
+            hot_oldest = self.record_index.oldest_key()
+        
+        remaining = limit - len(records)
+        offset = max(offset - len(self.record_index), 0)
+        warm_before = self._tier_before(None, hot_oldest)
+        warm_records = self.warm.query(RecordFilter(), warm_before, remaining, offset)
+        records.extend(warm_records)
+        if len(warm_records) >= remaining:
+            return records
+        
+        remaining -= len(warm_records)
+        offset = max(offset - self.warm.count(), 0)
+        cold_before = self._tier_before(warm_before, self.warm.oldest_key())
+        for record in self.cold.iter_newest(RecordFilter(), cold_before):
+            if offset:
+                offset -= 1
+                continue
+            records.append(record)
+            remaining -= 1
+            if not remaining:
+                break
+        return records
+    
+    @staticmethod
+    def encode_cursor(key: Tuple[float, str]) -> str:
+        """将索引键编码为不透明游标"""
+        return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+    
+    @staticmethod
+    def decode_cursor(cursor: str) -> Tuple[float, str]:
+        """解析游标，格式错误时抛出 ValueError"""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            timestamp, record_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            return float(timestamp), str(record_id)
+        except Exception:
+            raise ValueError(f"Invalid cursor: {cursor}")
+    
+    def query_alarm_records(
+        self,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        severities: Optional[List[str]] = None,
+        alarm_type: Optional[str] = None,
+        sub_type: Optional[str] = None,
+        status: Optional[str] = None,
+        text: Optional[str] = None,
+    ) -> Tuple[List[AlarmRecord], Optional[str]]:
+        """按条件查询告警记录（按时间倒序，跨越 hot / warm / cold 三层），返回本页记录和下一页游标（没有更多时为 None）"""
+        before = self.decode_cursor(cursor) if cursor else None
+        flt = RecordFilter(
+            since=since.timestamp() if since else None,
+            until=until.timestamp() if until else None,
+            severities=severities,
+            alarm_type=alarm_type,
+            sub_type=sub_type,
+            status=status,
+            text=text,
         )
-        return sorted_records[offset:offset+limit]
+        # 多取一条用于判断是否还有下一页
+        wanted = limit + 1
+        self.refresh()
+        
+        records: List[AlarmRecord] = []
+        with self._lock:
+            for key in self.record_index.iter_newest(before=before, since=flt.since, until=flt.until, group=flt.group):
+                record = self.alarm_records[key[1]]
+                if flt.matches(record):
+                    records.append(record)
+                    if len(records) == wanted:
+                        break
+            hot_oldest = self.record_index.oldest_key()
+        
+        if len(records) < wanted:
+            warm_before = self._tier_before(before, hot_oldest)
+            records.extend(self.warm.query(flt, warm_before, wanted - len(records)))
+            if len(records) < wanted:
+                cold_before = self._tier_before(warm_before, self.warm.oldest_key())
+                for record in self.cold.iter_newest(flt, cold_before):
+                    records.append(record)
+                    if len(records) == wanted:
+                        break
+        
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            next_cursor = self.encode_cursor(record_key(records[-1]))
+        return records, next_cursor
+    
+    def has_open_alarm(self, alarm_type: str, sub_type: str, instance: str = "") -> bool:
+        """是否存在同一实例（details.instance）未处理且未恢复的同类告警"""
+        with self._lock:
+            # 未处理的同类告警通常很少，从最新的开始检查
+            for record_id in self.record_index.latest_in_group(
+                alarm_type, sub_type, "unprocessed", limit=len(self.record_index)
+            ):
+                record = self.alarm_records[record_id]
+                if record.resolved_at is None and (record.details or {}).get("instance", "") == instance:
+                    return True
+        # 告警风暴时未处理的告警可能已被淘汰到 warm 层
+        return self.warm.has_open(alarm_type, sub_type, instance)
     
     def get_alarm_record(self, record_id: str) -> Optional[AlarmRecord]:
-        """根据ID获取告警记录"""
-        return self.alarm_records.get(record_id)
+        """根据ID获取告警记录（依次查找 hot / warm / cold）"""
+        self.refresh()
+        record = self.alarm_records.get(record_id)
+        if record is None:
+            record = self.warm.get(record_id)
+        if record is None:
+            record = self.cold.get(record_id)
+        return record
     
     def create_alarm_record(self, record: AlarmRecord) -> AlarmRecord:
         """创建告警记录"""
-        self.alarm_records[record.id] = record
-        self._save_data()
+        with self._lock:
+            self.alarm_records[record.id] = record
+            self.record_index.put(record)
+            self.statistics.add(record)
+            if not self.writer:
+                self._forward("create_record", _jsonable(record.dict()))
+                return record
+            self._append_record(record)
+            if len(self.record_index) > self.retention.hot_max_records + self.retention.evict_batch:
+                self._evict_hot()
         return record
     
     def update_alarm_record(self, record_id: str, updates: dict) -> Optional[AlarmRecord]:
-        """更新告警记录"""
-        if record_id not in self.alarm_records:
-            return None
-        
-        record = self.alarm_records[record_id]
-        for key, value in updates.items():
-            if hasattr(record, key):
-                setattr(record, key, value)
-        
-        self.alarm_records[record_id] = record
-        self._save_data()
+        """更新告警记录（hot / warm 层，cold 层归档记录只读）"""
+        self.refresh()
+        with self._lock:
+            record = self.alarm_records.get(record_id)
+            in_hot = record is not None
+            if record is None:
+                record = self.warm.get(record_id)
+            if record is None:
+                return None
+            
+            old_status = record.status
+            for key, value in updates.items():
+                if hasattr(record, key):
+                    setattr(record, key, value)
+            
+            if in_hot:
+                self.alarm_records[record_id] = record
+                self.record_index.put(record)
+            self.statistics.change_status(old_status, record.status)
+            if not self.writer:
+                # 只转发本次修改的字段，collector 中的记录可能已有更新（如 resolved_at）
+                self._forward("update_record", {"id": record_id, "updates": _jsonable(updates)})
+            elif in_hot:
+                self._append_record(record)
+            else:
+                self.warm.put_many([record])
         return record
     
     # 访问IP管理
     def get_access_ips(self) -> List[AccessIP]:
         """获取所有访问IP"""
+        self.refresh()
         return list(self.access_ips.values())
     
     def get_access_ip(self, ip_address: str) -> Optional[AccessIP]:
         """根据IP地址获取访问记录"""
+        self.refresh()
         return self.access_ips.get(ip_address)
     
     def create_or_update_access_ip(self, ip_address: str, country: str = "", region: str = "", city: str = "") -> AccessIP:
@@ -208,8 +653,9 @@ class AlarmStorage:
                 city=city
             )
         
-        self.access_ips[ip_address] = ip
-        self._save_data()
+        with self._lock:
+            self.access_ips[ip_address] = ip
+            self._append_ip(ip)
         return ip
     
     def update_access_ip_status(self, ip_address: str, is_blacklisted: bool) -> Optional[AccessIP]:
@@ -217,10 +663,17 @@ class AlarmStorage:
         if ip_address in self.access_ips:
             ip = self.access_ips[ip_address]
             ip.is_blacklisted = is_blacklisted
-            self.access_ips[ip_address] = ip
-            self._save_data()
+            with self._lock:
+                self.access_ips[ip_address] = ip
+                self._append_ip(ip)
             return ip
         return None
 
 # 创建全局存储实例
 storage = AlarmStorage()
+
+async def _on_storage_change(channel: str, payload: Dict):
+    if storage.writer:
+        storage.apply_change(payload.get("op"), payload.get("data") or {})
+
+bus.on("alarm_storage", _on_storage_change)
@@ -0,0 +1,68 @@
+import time
+from array import array
+from typing import List, Optional, Tuple
+
+
+class MetricRingBuffer:
+    """指标历史环形缓冲区
+
+    用两个定长 array 保存 (timestamp, value)，追加为 O(1)，按时间查找窗口起点为
+    O(log n)。时间戳需单调不减，回拨的时间戳会被修正为上一条的时间戳。
+    """
+
+    def __init__(self, capacity: int = 100):
+        """最多保存 capacity 个样本，超过后覆盖最旧的样本"""
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self._timestamps = array("d", bytes(8 * capacity))
+        self._values = array("d", bytes(8 * capacity))
+        self._start = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _index(self, i: int) -> int:
+        """逻辑下标（0 为最旧样本）转换为数组下标"""
+        return (self._start + i) % self.capacity
+
+    def append(self, timestamp: float, value: float):
+        """追加样本"""
+        if self._size and timestamp < self._timestamps[self._index(self._size - 1)]:
+            timestamp = self._timestamps[self._index(self._size - 1)]
+        if self._size < self.capacity:
+            idx = self._index(self._size)
+            self._size += 1
+        else:
+            idx = self._start
+            self._start = (self._start + 1) % self.capacity
+        self._timestamps[idx] = timestamp
+        self._values[idx] = value
+
+    def latest(self) -> Optional[Tuple[float, float]]:
+        """获取最新样本"""
+        if not self._size:
+            return None
+        idx = self._index(self._size - 1)
+        return self._timestamps[idx], self._values[idx]
+
+    def _bisect_left(self, timestamp: float) -> int:
+        """返回第一个时间戳大于等于 timestamp 的逻辑下标"""
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._timestamps[self._index(mid)] < timestamp:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def window(self, duration: float, now: Optional[float] = None) -> List[Tuple[float, float]]:
+        """获取最近 duration 秒内的样本"""
+        now = time.time() if now is None else now
+        first = self._bisect_left(now - duration)
+        return [
+            (self._timestamps[self._index(i)], self._values[self._index(i)])
+            for i in range(first, self._size)
+        ]
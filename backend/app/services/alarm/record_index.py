@@ -0,0 +1,155 @@
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from app.models.alarm.alarm_models import AlarmRecord
+
+# 索引键：(时间戳, 记录ID)，时间戳相同时按ID排序保证顺序稳定
+IndexKey = Tuple[float, str]
+# 大于任何记录ID的字符串，用于按时间戳查找上界
+_MAX_ID = "\U0010ffff"
+# 二级索引键：(alarm_type, sub_type, status)
+GroupKey = Tuple[str, str, str]
+
+
+class AlarmRecordIndex:
+    """告警记录时间索引
+
+    主索引是按 (时间戳, ID) 排序的列表，二级索引按 (alarm_type, sub_type, status)
+    分组，每组同样按时间排序。分页、最新 N 条和"是否有未处理的同类告警"都通过
+    二分查找和切片完成，不再对全部记录排序。
+    """
+
+    def __init__(self):
+        self._keys: List[IndexKey] = []
+        self._groups: Dict[GroupKey, List[IndexKey]] = {}
+        # 记录ID -> 当前所在的索引位置信息，用于更新时删除旧条目
+        self._entries: Dict[str, Tuple[IndexKey, GroupKey]] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __contains__(self, record_id: str) -> bool:
+        return record_id in self._entries
+
+    @staticmethod
+    def _remove_key(keys: List[IndexKey], key: IndexKey):
+        pos = bisect_left(keys, key)
+        if pos < len(keys) and keys[pos] == key:
+            del keys[pos]
+
+    def put(self, record: AlarmRecord):
+        """添加或重新索引一条记录（时间戳或状态变化后调用）"""
+        key = (record.timestamp.timestamp(), record.id)
+        group = (record.alarm_type, record.sub_type, record.status)
+        old = self._entries.get(record.id)
+        if old == (key, group):
+            return
+        if old is not None:
+            self.remove(record.id)
+        insort(self._keys, key)
+        insort(self._groups.setdefault(group, []), key)
+        self._entries[record.id] = (key, group)
+
+    def remove(self, record_id: str):
+        """删除一条记录的索引"""
+        old = self._entries.pop(record_id, None)
+        if old is None:
+            return
+        key, group = old
+        self._remove_key(self._keys, key)
+        group_keys = self._groups.get(group)
+        if group_keys is not None:
+            self._remove_key(group_keys, key)
+            if not group_keys:
+                del self._groups[group]
+
+    def latest(self, limit: int = 100, offset: int = 0) -> List[str]:
+        """按时间倒序返回记录ID"""
+        return self._slice_newest(self._keys, limit, offset)
+
+    def latest_in_group(self, alarm_type: str, sub_type: str, status: str,
+                        limit: int = 100, offset: int = 0) -> List[str]:
+        """按时间倒序返回某一分组的记录ID"""
+        return self._slice_newest(self._groups.get((alarm_type, sub_type, status), []), limit, offset)
+
+    def count_group(self, alarm_type: str, sub_type: str, status: str) -> int:
+        """某一分组的记录数"""
+        return len(self._groups.get((alarm_type, sub_type, status), []))
+
+    def iter_newest(self, before: Optional[IndexKey] = None, since: Optional[float] = None,
+                    until: Optional[float] = None, group: Optional[GroupKey] = None) -> Iterator[IndexKey]:
+        """从新到旧遍历 [since, until] 内、严格早于 before 的索引键（调用方需保证遍历期间索引不被修改）"""
+        keys = self._keys if group is None else self._groups.get(group, [])
+        end = len(keys)
+        if until is not None:
+            end = bisect_right(keys, (until, _MAX_ID))
+        if before is not None:
+            end = min(end, bisect_left(keys, before))
+        for i in range(end - 1, -1, -1):
+            key = keys[i]
+            if since is not None and key[0] < since:
+                break
+            yield key
+
+    def oldest_key(self) -> Optional[IndexKey]:
+        """最旧记录的索引键"""
+        return self._keys[0] if self._keys else None
+
+    @staticmethod
+    def _slice_newest(keys: List[IndexKey], limit: int, offset: int) -> List[str]:
+        end = len(keys) - max(offset, 0)
+        if end <= 0 or limit <= 0:
+            return []
+        start = max(end - limit, 0)
+        return [record_id for _, record_id in reversed(keys[start:end])]
+
+
+class RecordFilter:
+    """告警记录查询条件，热/温/冷三层共用"""
+
+    def __init__(
+        self,
+        since: Optional[float] = None,
+        until: Optional[float] = None,
+        severities: Optional[List[str]] = None,
+        alarm_type: Optional[str] = None,
+        sub_type: Optional[str] = None,
+        status: Optional[str] = None,
+        text: Optional[str] = None,
+    ):
+        self.since = since
+        self.until = until
+        self.severities = severities or None
+        self.alarm_type = alarm_type
+        self.sub_type = sub_type
+        self.status = status
+        self.text = text.lower() if text else None
+
+    @property
+    def group(self) -> Optional[GroupKey]:
+        """类型、子类型、状态都指定时可以直接使用二级索引"""
+        if self.alarm_type and self.sub_type and self.status:
+            return self.alarm_type, self.sub_type, self.status
+        return None
+
+    def matches(self, record: AlarmRecord) -> bool:
+        """记录是否满足除时间范围以外的条件"""
+        if self.severities and record.severity not in self.severities:
+            return False
+        if self.alarm_type and record.alarm_type != self.alarm_type:
+            return False
+        if self.sub_type and record.sub_type != self.sub_type:
+            return False
+        if self.status and record.status != self.status:
+            return False
+        if self.text and self.text not in record.message.lower():
+            return False
+        return True
+
+    def in_range(self, timestamp: float) -> bool:
+        """时间戳是否在查询范围内"""
+        if self.since is not None and timestamp < self.since:
+            return False
+        if self.until is not None and timestamp > self.until:
+            return False
+        return True
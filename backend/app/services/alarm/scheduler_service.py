@@ -2,6 +2,8 @@ import logging
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 from app.services.alarm.alarm_detector import alarm_detector
+from app.services.alarm.alarm_storage import storage
+from app.services.websocket.backplane import runs_background_jobs
 
 logger = logging.getLogger("nas-monitor.scheduler")
 
@@ -10,6 +12,10 @@ class AlarmScheduler:
     
     def __init__(self):
         self.scheduler = BackgroundScheduler()
+        # 多 worker 部署时只在 collector 进程中运行，避免重复告警和并发写入存储
+        if not runs_background_jobs():
+            logger.info("Alarm scheduler disabled in worker process")
+            return
         self.scheduler.start()
         self._setup_jobs()
         logger.info("Alarm scheduler started")
@@ -24,10 +30,19 @@ class AlarmScheduler:
             name='Run alarm detection every 10 seconds',
             replace_existing=True
         )
+        # 每小时按保留策略将告警记录下沉到 warm / cold 层
+        self.scheduler.add_job(
+            func=storage.enforce_retention,
+            trigger=IntervalTrigger(hours=1),
+            id='alarm_retention_job',
+            name='Enforce alarm record retention every hour',
+            replace_existing=True
+        )
     
     def shutdown(self):
         """关闭调度器"""
-        self.scheduler.shutdown()
+        if self.scheduler.running:
+            self.scheduler.shutdown()
 
 # 创建全局定时任务实例
 alarm_scheduler = AlarmScheduler()
@@ -0,0 +1,69 @@
+from typing import List, Optional, Tuple
+from app.services.alarm.metric_buffer import MetricRingBuffer
+
+
+class ThresholdRule:
+    """持续阈值规则状态机
+
+    状态流转：ok → pending（超过阈值）→ firing（持续超过 duration 秒）→ ok（回落到
+    恢复阈值以下，产生 resolved 事件）。恢复阈值低于触发阈值时形成滞回区间，
+    数值在区间内时保持当前状态，避免在阈值附近反复触发。每个样本的处理为 O(1)，
+    样本同时写入环形缓冲区，触发时可取出持续超限期间的样本。
+    """
+
+    OK = "ok"
+    PENDING = "pending"
+    FIRING = "firing"
+
+    def __init__(self, threshold: float, duration: float, clear_threshold: Optional[float] = None,
+                 history_size: int = 100):
+        """大于 threshold 持续 duration 秒后触发，小于等于 clear_threshold（默认同 threshold）时恢复"""
+        self.history = MetricRingBuffer(history_size)
+        self.state = self.OK
+        self.pending_since: Optional[float] = None
+        self.firing_since: Optional[float] = None
+        self.last_value: Optional[float] = None
+        self.record_id: Optional[str] = None
+        self.configure(threshold, duration, clear_threshold)
+
+    def configure(self, threshold: float, duration: float, clear_threshold: Optional[float] = None):
+        """更新规则参数，保留当前状态"""
+        self.threshold = threshold
+        self.duration = duration
+        self.clear_threshold = threshold if clear_threshold is None else min(clear_threshold, threshold)
+
+    def update(self, value: float, timestamp: float) -> Optional[str]:
+        """处理一个样本：状态变为 firing 时返回 "firing"，恢复时返回 "resolved"，否则返回 None"""
+        self.last_value = value
+        self.history.append(timestamp, value)
+
+        if self.state == self.OK:
+            if value > self.threshold:
+                self.state = self.PENDING
+                self.pending_since = timestamp
+            else:
+                return None
+
+        if self.state == self.PENDING:
+            if value <= self.clear_threshold:
+                self.state = self.OK
+                self.pending_since = None
+            elif timestamp - self.pending_since >= self.duration:
+                self.state = self.FIRING
+                self.firing_since = timestamp
+                return "firing"
+            return None
+
+        if value <= self.clear_threshold:
+            self.state = self.OK
+            self.pending_since = None
+            self.firing_since = None
+            return "resolved"
+        return None
+
+    def pending_samples(self) -> List[Tuple[float, float]]:
+        """触发前持续超限期间的样本 [(timestamp, value), ...]"""
+        if self.pending_since is None:
+            return []
+        latest = self.history.latest()
+        return self.history.window(latest[0] - self.pending_since, latest[0])
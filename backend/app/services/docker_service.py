@@ -1,212 +1,756 @@
+import time
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+from app.config import env_number
 
 logger = logging.getLogger("nas-monitor.docker")
 
 try:
     import docker
-    from docker.errors import DockerException
+    from docker.errors import DockerException, APIError
 except ImportError:
     logger.warning("Docker library not installed. Docker features will be disabled.")
     docker = None
     DockerException = Exception
+    APIError = Exception
+
+
+class DockerClientManager:
+    """长连接 Docker 客户端管理
+
+    复用同一个 Docker 客户端，定期 ping 做健康检查；连接失败或守护进程重启后
+    按指数退避自动重连，并记录重连次数和每类调用的耗时。
+    """
+
+    def __init__(self, health_check_interval: float = 30.0, backoff_base: float = 1.0,
+                 backoff_max: float = 60.0, max_pool_size: int = 10):
+        self.health_check_interval = health_check_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_pool_size = max_pool_size
+        self._client = None
+        self._lock = threading.Lock()
+        self._last_health_check = 0.0
+        self._backoff = backoff_base
+        self._next_retry = 0.0
+        self._ever_connected = False
+        self.connects = 0
+        self.reconnects = 0
+        self.connect_failures = 0
+        self.last_error = None
+        self.call_stats: Dict[str, Dict] = {}
+
+    def _connect(self):
+        """创建新客户端（调用方需持有锁）"""
+        now = time.monotonic()
+        if now < self._next_retry:
+            return None
+        try:
+            client = docker.from_env(max_pool_size=self.max_pool_size)
+            client.ping()
+        except Exception as e:
+            self.connect_failures += 1
+            self.last_error = str(e)
+            self._next_retry = now + self._backoff
+            logger.error(f"Docker API error: {e}, retry in {self._backoff:.0f}s")
+            self._backoff = min(self._backoff * 2, self.backoff_max)
+            return None
+
+        self.connects += 1
+        if self._ever_connected:
+            self.reconnects += 1
+            logger.info("Reconnected to Docker daemon")
+        self._ever_connected = True
+        self._backoff = self.backoff_base
+        self._next_retry = 0.0
+        self._last_health_check = now
+        return client
+
+    def _close(self):
+        """关闭当前客户端（调用方需持有锁）"""
+        if self._client is not None:
+            try:
+                self._client.close()
+            except Exception:
+                pass
+            self._client = None
+
+    def get_client(self):
+        """获取可用的 Docker 客户端，失败返回 None"""
+        if docker is None:
+            logger.warning("Docker library not available")
+            return None
+
+        with self._lock:
+            client = self._client
+            now = time.monotonic()
+            check = client is not None and now - self._last_health_check >= self.health_check_interval
+            if check:
+                # 先更新检查时间，检查期间其他线程不重复 ping
+                self._last_health_check = now
+
+        # 在锁外 ping，守护进程无响应时不阻塞其他线程获取客户端
+        if check:
+            try:
+                client.ping()
+            except Exception as e:
+                logger.warning(f"Docker health check failed: {e}")
+                with self._lock:
+                    self.last_error = str(e)
+                    if self._client is client:
+                        self._close()
+
+        with self._lock:
+            if self._client is None:
+                self._client = self._connect()
+            return self._client
+
+    def mark_unhealthy(self):
+        """标记客户端可能失效，下次获取时先做健康检查"""
+        self._last_health_check = 0.0
+
+    def report_error(self, error: Exception):
+        """记录调用错误，非 API 错误（如连接中断）时触发健康检查"""
+        if not isinstance(error, APIError):
+            self.mark_unhealthy()
+
+    def record_call(self, name: str, duration: float, error: bool = False):
+        """记录一次调用的耗时"""
+        with self._lock:
+            stats = self.call_stats.get(name)
+            if stats is None:
+                stats = {"calls": 0, "errors": 0, "total_latency": 0.0, "max_latency": 0.0, "last_latency": 0.0}
+                self.call_stats[name] = stats
+            stats["calls"] += 1
+            stats["total_latency"] += duration
+            stats["last_latency"] = duration
+            stats["max_latency"] = max(stats["max_latency"], duration)
+            if error:
+                stats["errors"] += 1
+
+    def stats(self) -> Dict:
+        """获取客户端连接和调用统计"""
+        with self._lock:
+            call_stats = {name: dict(stats) for name, stats in self.call_stats.items()}
+        return {
+            "connected": self._client is not None,
+            "connects": self.connects,
+            "reconnects": self.reconnects,
+            "connect_failures": self.connect_failures,
+            "last_error": self.last_error,
+            "calls": {
+                name: {
+                    "calls": stats["calls"],
+                    "errors": stats["errors"],
+                    "avg_latency": round(stats["total_latency"] / stats["calls"], 4) if stats["calls"] else 0.0,
+                    "max_latency": round(stats["max_latency"], 4),
+                    "last_latency": round(stats["last_latency"], 4),
+                }
+                for name, stats in call_stats.items()
+            },
+        }
+
+    def close(self):
+        """关闭客户端"""
+        with self._lock:
+            self._close()
+
+
+# 创建全局 Docker 客户端管理器实例
+_client_manager = DockerClientManager(
+    health_check_interval=env_number("DOCKER_HEALTH_CHECK_INTERVAL", 30.0, float),
+    backoff_max=env_number("DOCKER_RECONNECT_BACKOFF_MAX", 60.0, float),
+)
 
 
 def _get_client():
     """获取 Docker 客户端，失败返回 None"""
-    if docker is None:
-        logger.warning("Docker library not available")
-        return None
-    try:
-        return docker.from_env()
-    except DockerException as e:
-        logger.error(f"Docker API error: {e}")
-        return None
-    except Exception as e:
-        logger.error(f"Unexpected error connecting to Docker: {e}")
-        return None
+    return _client_manager.get_client()
 
 
-def get_containers():
-    """获取所有容器信息"""
+@contextmanager
+def _docker_call(name: str):
+    """获取客户端并记录本次调用耗时，客户端不可用时返回 None"""
     client = _get_client()
-    if client is None:
-        return []
-
-    result = []
+    start = time.monotonic()
+    state = {"error": False}
     try:
-        for container in client.containers.list(all=True):
+        yield client, state
+    finally:
+        if client is not None:
+            _client_manager.record_call(name, time.monotonic() - start, state["error"])
+
+
+def _report_error(state: Dict, error: Exception):
+    """记录调用失败"""
+    state["error"] = True
+    _client_manager.report_error(error)
+
+
+def get_client_stats():
+    """获取 Docker 客户端连接和调用统计"""
+    stats = _client_manager.stats()
+    stats["stats_streams"] = _stats_streamer.stats()
+    stats["inventory"] = _inventory.stats()
+    return stats
+
+
+# 会改变容器列表或状态、需要重新查询容器详情的事件
+_INVENTORY_ACTIONS = {
+    "create", "start", "restart", "die", "stop", "kill", "pause", "unpause",
+    "rename", "update", "oom", "health_status",
+}
+
+
+# 会改变镜像标签的事件
+_IMAGE_ACTIONS = {"pull", "delete", "tag", "untag", "import", "load"}
+
+
+def _format_container(attrs: Dict, image_tag: str) -> Dict:
+    """将容器详情整理为 get_containers() 的返回格式"""
+    return {
+        "id": attrs["Id"],
+        "name": attrs["Name"].lstrip("/"),
+        "status": attrs["State"]["Status"],
+        "image": image_tag,
+        "created": attrs["Created"],
+        "ports": attrs["NetworkSettings"]["Ports"],
+        "command": attrs["Config"]["Cmd"],
+    }
+
+
+class ContainerInventory:
+    """事件驱动的容器清单
+
+    启动时全量查询一次容器详情，之后订阅 Docker events 接口，只在容器
+    create/start/die/destroy/rename 等事件发生时更新对应容器，镜像 pull/tag/untag/delete
+    事件发生时清空镜像标签缓存。没有变化时
+    get_containers() 不会产生任何 Docker API 调用。事件流中断期间
+    is_live() 返回 False，调用方回退到轮询。
+    """
+
+    def __init__(self, backoff_max: float = 60.0):
+        self.backoff_max = backoff_max
+        self._lock = threading.Lock()
+        self._containers: Dict[str, Dict] = {}
+        self._attrs: Dict[str, Dict] = {}
+        self._image_tags: Dict[str, str] = {}
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._live = False
+        self._listeners: List[Callable[[str, Dict, Optional[Dict]], None]] = []
+        self.resyncs = 0
+        self.events_received = 0
+
+    def start(self):
+        """启动事件订阅线程（重复调用无副作用）"""
+        if docker is None:
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="docker-events", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """停止事件订阅线程"""
+        self._stop_event.set()
+
+    def is_live(self) -> bool:
+        """事件流是否正常，清单是否可信"""
+        return self._live
+
+    def add_listener(self, callback: Callable[[str, Dict, Optional[Dict]], None]):
+        """注册容器事件监听器，在事件线程中以 (action, event, attrs) 调用，容器已删除时 attrs 为 None"""
+        self._listeners.append(callback)
+
+    def image_tag(self, image_id: str, client=None) -> str:
+        """获取镜像标签，同一镜像只查询一次；未缓存且没有传入客户端时返回镜像ID"""
+        with self._lock:
+            tag = self._image_tags.get(image_id)
+        if tag is None:
+            if client is None:
+                return image_id
             try:
-                image_tag = container.image.tags[0] if container.image.tags else container.image.id
-                result.append({
-                    "id": container.id,
-                    "name": container.name,
-                    "status": container.status,
-                    "image": image_tag,
-                    "created": container.attrs["Created"],
-                    "ports": container.attrs["NetworkSettings"]["Ports"],
-                    "command": container.attrs["Config"]["Cmd"],
-                })
-            except Exception as e:
-                logger.error(f"Error processing container {container.id}: {e}")
+                tags = client.api.inspect_image(image_id).get("RepoTags") or []
+                tag = tags[0] if tags else image_id
+            except Exception:
+                tag = image_id
+            with self._lock:
+                self._image_tags[image_id] = tag
+        return tag
+
+    def invalidate_image_tags(self):
+        """镜像拉取、删除或重新打标签后清空标签缓存，下次使用时重新查询"""
+        with self._lock:
+            self._image_tags.clear()
+
+    def _run(self):
+        """事件订阅循环，断开后按指数退避重连"""
+        backoff = 1.0
+        while not self._stop_event.is_set():
+            client = _get_client()
+            if client is None:
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, self.backoff_max)
                 continue
-    except (DockerException, Exception) as e:
-        logger.error(f"Error listing containers: {e}")
-    finally:
-        client.close()
+
+            events = None
+            try:
+                # 先记录时间再全量同步，同步期间发生的事件会在订阅后重放
+                since = int(time.time())
+                self._resync(client)
+                events = client.events(decode=True, filters={"type": ["container", "image"]}, since=since)
+                self._live = True
+                backoff = 1.0
+                logger.info("Docker event stream connected")
+                for event in events:
+                    if self._stop_event.is_set():
+                        break
+                    self._handle_event(client, event)
+            except Exception as e:
+                logger.warning(f"Docker event stream interrupted: {e}")
+                _client_manager.report_error(e)
+            finally:
+                self._live = False
+                if events is not None:
+                    try:
+                        events.close()
+                    except Exception:
+                        pass
+
+            self._stop_event.wait(backoff)
+            backoff = min(backoff * 2, self.backoff_max)
+
+    def _resync(self, client):
+        """全量同步容器清单"""
+        containers = {}
+        attrs_map = {}
+        for summary in client.api.containers(all=True):
+            try:
+                attrs = client.api.inspect_container(summary["Id"])
+                containers[attrs["Id"]] = _format_container(attrs, self.image_tag(attrs["Image"], client))
+                attrs_map[attrs["Id"]] = attrs
+            except Exception as e:
+                logger.error(f"Error processing container {summary.get('Id')}: {e}")
+        with self._lock:
+            self._containers = containers
+            self._attrs = attrs_map
+        self.resyncs += 1
+
+    def _handle_event(self, client, event: Dict):
+        """根据事件更新单个容器"""
+        self.events_received += 1
+        if event.get("Type") == "image":
+            if event.get("Action") in _IMAGE_ACTIONS:
+                self.invalidate_image_tags()
+            return
+        container_id = event.get("Actor", {}).get("ID") or event.get("id")
+        action = (event.get("Action") or event.get("status") or "").split(":")[0]
+        if not container_id:
+            return
+
+        attrs = None
+        if action == "destroy":
+            with self._lock:
+                self._containers.pop(container_id, None)
+                self._attrs.pop(container_id, None)
+        elif action in _INVENTORY_ACTIONS:
+            try:
+                attrs = client.api.inspect_container(container_id)
+            except Exception as e:
+                # 容器可能在事件到达前已被删除
+                logger.debug(f"Error inspecting container {container_id}: {e}")
+                return
+            container = _format_container(attrs, self.image_tag(attrs["Image"], client))
+            with self._lock:
+                self._containers[container_id] = container
+                self._attrs[container_id] = attrs
+        else:
+            return
+
+        for listener in self._listeners:
+            try:
+                listener(action, event, attrs)
+            except Exception as e:
+                logger.error(f"Error in Docker event listener: {e}")
+
+    def list(self) -> List[Dict]:
+        """获取容器清单"""
+        with self._lock:
+            return [dict(container) for container in self._containers.values()]
+
+    def get_attrs(self, container_id: str):
+        """获取容器最近一次查询到的详情"""
+        with self._lock:
+            return self._attrs.get(container_id)
+
+    def stats(self) -> Dict:
+        """获取清单状态"""
+        return {
+            "live": self._live,
+            "containers": len(self._containers),
+            "resyncs": self.resyncs,
+            "events_received": self.events_received,
+        }
+
+
+# 创建全局容器清单实例
+_inventory = ContainerInventory(backoff_max=env_number("DOCKER_RECONNECT_BACKOFF_MAX", 60.0, float))
+
+
+def _poll_containers():
+    """直接查询 Docker 获取所有容器信息（事件流不可用时使用）"""
+    with _docker_call("get_containers") as (client, state):
+        if client is None:
+            return []
+
+        result = []
+        try:
+            for container in client.containers.list(all=True):
+                try:
+                    image_tag = _inventory.image_tag(container.attrs["Image"], client)
+                    result.append(_format_container(container.attrs, image_tag))
+                except Exception as e:
+                    logger.error(f"Error processing container {container.id}: {e}")
+                    continue
+        except (DockerException, Exception) as e:
+            logger.error(f"Error listing containers: {e}")
+            _report_error(state, e)
 
     return result
 
 
-def get_docker_stats():
-    """获取 Docker 容器统计信息"""
-    client = _get_client()
-    if client is None:
-        return []
+def start_event_stream():
+    """启动容器事件订阅"""
+    _inventory.start()
 
-    stats = []
-    try:
-        for container in client.containers.list():
+
+def is_event_stream_live() -> bool:
+    """容器事件流是否正常"""
+    return _inventory.is_live()
+
+
+def add_event_listener(callback: Callable[[str, Dict, Optional[Dict]], None]):
+    """注册容器事件监听器，参见 ContainerInventory.add_listener"""
+    _inventory.add_listener(callback)
+
+
+def format_container(attrs: Dict) -> Dict:
+    """将容器详情整理为 get_containers() 的返回格式（使用缓存的镜像标签）"""
+    return _format_container(attrs, _inventory.image_tag(attrs["Image"]))
+
+
+def get_containers():
+    """获取所有容器信息"""
+    _inventory.start()
+    if _inventory.is_live():
+        return _inventory.list()
+    return _poll_containers()
+
+
+def _running_containers(client) -> List[Dict]:
+    """获取运行中的容器（优先使用容器清单，否则一次列表查询，不逐个查询详情）"""
+    if _inventory.is_live():
+        return [{"id": c["id"], "name": c["name"]} for c in _inventory.list() if c["status"] == "running"]
+    return [
+        {"id": c["Id"], "name": c["Names"][0].lstrip("/") if c.get("Names") else c["Id"][:12]}
+        for c in client.api.containers()
+    ]
+
+
+class ContainerStatsStreamer:
+    """容器资源统计流式订阅
+
+    为每个运行中的容器维持一个 stats(stream=True) 订阅，后台线程持续保存最新样本，
+    get_docker_stats() 直接读取内存中的样本，耗时与容器数量无关。还没有样本的容器
+    通过有界线程池并发执行一次性查询。订阅使用独立的 DockerClientManager，与普通调用
+    一样做健康检查并在守护进程重启后按退避重连；容器退出事件到达时立即停止其订阅。
+    """
+
+    def __init__(self, max_streams: int = 64, max_fanout: int = 8, sample_max_age: float = 10.0):
+        """超出 max_streams 的容器使用一次性查询；样本超过 sample_max_age 秒视为没有样本"""
+        self.max_streams = max_streams
+        self.max_fanout = max_fanout
+        self.sample_max_age = sample_max_age
+        # 流式订阅使用独立客户端，连接池按订阅数配置，避免挤占普通调用的连接
+        self._client_manager = DockerClientManager(
+            health_check_interval=_client_manager.health_check_interval,
+            backoff_max=_client_manager.backoff_max,
+            max_pool_size=max_streams,
+        )
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Dict] = {}
+        self._streams: Dict[str, threading.Event] = {}
+        self._fanout_pool = None
+
+    def sync(self, containers: List[Dict]):
+        """根据当前运行中的容器（每项包含 id 和 name）启动/停止订阅"""
+        running = {c["id"]: c["name"] for c in containers}
+        with self._lock:
+            for container_id in list(self._streams):
+                if container_id not in running:
+                    self._streams.pop(container_id).set()
+            for container_id in list(self._samples):
+                if container_id not in running:
+                    del self._samples[container_id]
+
+            client = None
+            for container_id, name in running.items():
+                if container_id in self._streams or len(self._streams) >= self.max_streams:
+                    continue
+                if client is None:
+                    # 健康检查失败或正在退避重连时返回 None，不在失效的客户端上启动订阅
+                    client = self._client_manager.get_client()
+                    if client is None:
+                        return
+                stop_event = threading.Event()
+                self._streams[container_id] = stop_event
+                threading.Thread(
+                    target=self._stream,
+                    args=(client, container_id, name, stop_event),
+                    name=f"docker-stats-{name}",
+                    daemon=True,
+                ).start()
+
+    def _stream(self, client, container_id: str, name: str, stop_event: threading.Event):
+        """订阅线程：持续接收并保存最新样本"""
+        stream = None
+        try:
+            stream = client.api.stats(container_id, stream=True, decode=True)
+            for raw in stream:
+                if stop_event.is_set():
+                    break
+                sample = {"stats": _format_stats(name, raw), "received_at": time.monotonic()}
+                with self._lock:
+                    # 订阅已停止时不再写入，避免留下已退出容器的样本
+                    if self._streams.get(container_id) is not stop_event:
+                        break
+                    self._samples[container_id] = sample
+        except Exception as e:
+            if not stop_event.is_set():
+                logger.warning(f"Stats stream for container {name} ended: {e}")
+                # 连接中断（如守护进程重启）时下次启动订阅前先做健康检查
+                self._client_manager.report_error(e)
+        finally:
+            if stream is not None:
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+            with self._lock:
+                if self._streams.get(container_id) is stop_event:
+                    del self._streams[container_id]
+
+    def latest(self, container_id: str):
+        """获取容器最新样本，没有或已过期时返回 None"""
+        with self._lock:
+            sample = self._samples.get(container_id)
+        if sample is None or time.monotonic() - sample["received_at"] > self.sample_max_age:
+            return None
+        return sample["stats"]
+
+    def stop(self, container_id: str):
+        """停止容器的订阅并丢弃其样本"""
+        with self._lock:
+            stop_event = self._streams.pop(container_id, None)
+            self._samples.pop(container_id, None)
+        if stop_event is not None:
+            stop_event.set()
+
+    def on_container_event(self, action: str, event: Dict, attrs: Optional[Dict]):
+        """容器退出或删除时立即停止订阅，不等下一次 sync"""
+        if action in ("die", "destroy"):
+            self.stop(event.get("Actor", {}).get("ID") or event.get("id"))
+
+    def fetch(self, client, containers: List[Dict]) -> Dict[str, Dict]:
+        """并发执行一次性查询"""
+        if not containers:
+            return {}
+        if self._fanout_pool is None:
+            self._fanout_pool = ThreadPoolExecutor(max_workers=self.max_fanout, thread_name_prefix="docker-stats")
+
+        def fetch_one(container):
             try:
-                container_stats = container.stats(stream=False)
-                stats.append({
-                    "name": container.name,
-                    "cpu_usage": container_stats["cpu_stats"]["cpu_usage"]["total_usage"],
-                    "memory_usage": container_stats["memory_stats"]["usage"],
-                    "memory_limit": container_stats["memory_stats"]["limit"],
-                    "network": container_stats["networks"],
-                    "blkio": container_stats["blkio_stats"],
-                })
+                raw = client.api.stats(container["id"], stream=False)
+                return container["id"], _format_stats(container["name"], raw)
             except Exception as e:
-                logger.error(f"Error getting stats for container {container.name}: {e}")
-                continue
-    except (DockerException, Exception) as e:
-        logger.error(f"Error getting Docker stats: {e}")
-    finally:
-        client.close()
+                logger.error(f"Error getting stats for container {container['name']}: {e}")
+                return container["id"], None
 
-    return stats
+        return {container_id: stats for container_id, stats in self._fanout_pool.map(fetch_one, containers)}
+
+    def stats(self) -> Dict:
+        """获取订阅状态"""
+        with self._lock:
+            result = {"streams": len(self._streams), "samples": len(self._samples)}
+        result["client"] = {key: value for key, value in self._client_manager.stats().items() if key != "calls"}
+        return result
+
+
+def _format_stats(name: str, raw: Dict) -> Dict:
+    """整理容器统计数据"""
+    return {
+        "name": name,
+        "cpu_usage": raw["cpu_stats"]["cpu_usage"]["total_usage"],
+        "memory_usage": raw["memory_stats"].get("usage", 0),
+        "memory_limit": raw["memory_stats"].get("limit", 0),
+        "network": raw.get("networks", {}),
+        "blkio": raw.get("blkio_stats", {}),
+    }
+
+
+# 创建全局容器统计订阅实例
+_stats_streamer = ContainerStatsStreamer(
+    max_streams=env_number("DOCKER_STATS_MAX_STREAMS", 64, int),
+    max_fanout=env_number("DOCKER_STATS_FANOUT", 8, int),
+)
+_inventory.add_listener(_stats_streamer.on_container_event)
+
+
+def get_docker_stats():
+    """获取 Docker 容器统计信息"""
+    with _docker_call("get_docker_stats") as (client, state):
+        if client is None:
+            return []
+
+        stats = []
+        try:
+            running = _running_containers(client)
+            _stats_streamer.sync(running)
+
+            latest = {c["id"]: _stats_streamer.latest(c["id"]) for c in running}
+            missing = [c for c in running if latest[c["id"]] is None]
+            latest.update(_stats_streamer.fetch(client, missing))
+
+            stats = [latest[c["id"]] for c in running if latest[c["id"]] is not None]
+        except (DockerException, Exception) as e:
+            logger.error(f"Error getting Docker stats: {e}")
+            _report_error(state, e)
+
+        return stats
 
 
 def get_images():
     """获取 Docker 镜像信息"""
-    client = _get_client()
-    if client is None:
-        return []
-
-    result = []
-    try:
-        for image in client.images.list():
-            try:
-                result.append({
-                    "id": image.id,
-                    "tags": image.tags,
-                    "created": image.attrs["Created"],
-                    "size": image.attrs["Size"],
-                    "virtual_size": image.attrs["VirtualSize"],
-                })
-            except Exception as e:
-                logger.error(f"Error processing image {image.id}: {e}")
-                continue
-    except (DockerException, Exception) as e:
-        logger.error(f"Error listing images: {e}")
-    finally:
-        client.close()
+    with _docker_call("get_images") as (client, state):
+        if client is None:
+            return []
+
+        result = []
+        try:
+            for image in client.images.list():
+                try:
+                    result.append({
+                        "id": image.id,
+                        "tags": image.tags,
+                        "created": image.attrs["Created"],
+                        "size": image.attrs["Size"],
+                        "virtual_size": image.attrs["VirtualSize"],
+                    })
+                except Exception as e:
+                    logger.error(f"Error processing image {image.id}: {e}")
+                    continue
+        except (DockerException, Exception) as e:
+            logger.error(f"Error listing images: {e}")
+            _report_error(state, e)
 
     return result
 
 
 def pull_image(image_name):
     """拉取最新的 Docker 镜像"""
-    client = _get_client()
-    if client is None:
-        return {"success": False, "error": "Docker library not available"}
+    with _docker_call("pull_image") as (client, state):
+        if client is None:
+            return {"success": False, "error": "Docker library not available"}
 
-    try:
-        image = client.images.pull(image_name)
-        return {"success": True, "image_id": image.id, "tags": image.tags}
-    except (DockerException, Exception) as e:
-        logger.error(f"Error pulling image {image_name}: {e}")
-        return {"success": False, "error": str(e)}
-    finally:
-        client.close()
+        try:
+            image = client.images.pull(image_name)
+            # 事件流不可用时也不会留下旧标签
+            _inventory.invalidate_image_tags()
+            return {"success": True, "image_id": image.id, "tags": image.tags}
+        except (DockerException, Exception) as e:
+            logger.error(f"Error pulling image {image_name}: {e}")
+            _report_error(state, e)
+            return {"success": False, "error": str(e)}
 
 
 def delete_image(image_id):
     """删除 Docker 镜像"""
-    client = _get_client()
-    if client is None:
-        return {"success": False, "error": "Docker library not available"}
+    with _docker_call("delete_image") as (client, state):
+        if client is None:
+            return {"success": False, "error": "Docker library not available"}
 
-    try:
-        client.images.remove(image_id, force=True)
-        return {"success": True, "message": "镜像删除成功"}
-    except (DockerException, Exception) as e:
-        logger.error(f"Error deleting image {image_id}: {e}")
-        return {"success": False, "error": str(e)}
-    finally:
-        client.close()
+        try:
+            client.images.remove(image_id, force=True)
+            _inventory.invalidate_image_tags()
+            return {"success": True, "message": "镜像删除成功"}
+        except (DockerException, Exception) as e:
+            logger.error(f"Error deleting image {image_id}: {e}")
+            _report_error(state, e)
+            return {"success": False, "error": str(e)}
 
 
 def start_container(container_id):
     """启动容器"""
-    client = _get_client()
-    if client is None:
-        return {"success": False, "error": "Docker library not available"}
+    with _docker_call("start_container") as (client, state):
+        if client is None:
+            return {"success": False, "error": "Docker library not available"}
 
-    try:
-        client.containers.get(container_id).start()
-        return {"success": True, "message": "容器启动成功"}
-    except (DockerException, Exception) as e:
-        logger.error(f"Error starting container {container_id}: {e}")
-        return {"success": False, "error": str(e)}
-    finally:
-        client.close()
+        try:
+            client.containers.get(container_id).start()
+            return {"success": True, "message": "容器启动成功"}
+        except (DockerException, Exception) as e:
+            logger.error(f"Error starting container {container_id}: {e}")
+            _report_error(state, e)
+            return {"success": False, "error": str(e)}
 
 
 def stop_container(container_id):
     """停止容器"""
-    client = _get_client()
-    if client is None:
-        return {"success": False, "error": "Docker library not available"}
+    with _docker_call("stop_container") as (client, state):
+        if client is None:
+            return {"success": False, "error": "Docker library not available"}
 
-    try:
-        client.containers.get(container_id).stop()
-        return {"success": True, "message": "容器停止成功"}
-    except (DockerException, Exception) as e:
-        logger.error(f"Error stopping container {container_id}: {e}")
-        return {"success": False, "error": str(e)}
-    finally:
-        client.close()
+        try:
+            client.containers.get(container_id).stop()
+            return {"success": True, "message": "容器停止成功"}
+        except (DockerException, Exception) as e:
+            logger.error(f"Error stopping container {container_id}: {e}")
+            _report_error(state, e)
+            return {"success": False, "error": str(e)}
 
 
 def restart_container(container_id):
     """重启容器"""
-    client = _get_client()
-    if client is None:
-        return {"success": False, "error": "Docker library not available"}
+    with _docker_call("restart_container") as (client, state):
+        if client is None:
+            return {"success": False, "error": "Docker library not available"}
 
-    try:
-        client.containers.get(container_id).restart()
-        return {"success": True, "message": "容器重启成功"}
-    except (DockerException, Exception) as e:
-        logger.error(f"Error restarting container {container_id}: {e}")
-        return {"success": False, "error": str(e)}
-    finally:
-        client.close()
+        try:
+            client.containers.get(container_id).restart()
+            return {"success": True, "message": "容器重启成功"}
+        except (DockerException, Exception) as e:
+            logger.error(f"Error restarting container {container_id}: {e}")
+            _report_error(state, e)
+            return {"success": False, "error": str(e)}
 
 
 def get_container_logs(container_id, tail=100):
     """获取容器日志"""
-    client = _get_client()
-    if client is None:
-        return {"success": False, "error": "Docker library not available"}
-
-    try:
-        container = client.containers.get(container_id)
-        logs = container.logs(tail=tail).decode("utf-8")
-        return {"success": True, "logs": logs}
-    except (DockerException, Exception) as e:
-        logger.error(f"Error getting logs for container {container_id}: {e}")
-        return {"success": False, "error": str(e)}
-    finally:
-        client.close()
+    with _docker_call("get_container_logs") as (client, state):
+        if client is None:
+            return {"success": False, "error": "Docker library not available"}
+
+        try:
+            container = client.containers.get(container_id)
+            logs = container.logs(tail=tail).decode("utf-8")
+            return {"success": True, "logs": logs}
+        except (DockerException, Exception) as e:
+            logger.error(f"Error getting logs for container {container_id}: {e}")
+            _report_error(state, e)
+            return {"success": False, "error": str(e)}
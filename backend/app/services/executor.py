@@ -0,0 +1,172 @@
+import asyncio
+import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from app.config import env_number
+
+logger = logging.getLogger("nas-monitor.executor")
+
+# 各采集器默认超时时间（秒），可通过环境变量 COLLECTOR_TIMEOUT_<NAME> 覆盖
+DEFAULT_TIMEOUTS = {
+    "cpu": 2.0,
+    "memory": 2.0,
+    "disk": 5.0,
+    "smart": 30.0,
+    "containers": 5.0,
+    "docker_stats": 10.0,
+    "docker": 30.0,
+    "docker_pull": 600.0,
+}
+DEFAULT_TIMEOUT = 5.0
+
+# 各采集器默认并发上限，可通过环境变量 COLLECTOR_CONCURRENCY_<NAME> 覆盖
+DEFAULT_CONCURRENCY = {
+    "smart": 1,
+    "docker": 4,
+    "docker_pull": 2,
+}
+DEFAULT_LIMIT = 2
+
+# 可能长时间挂起的采集器（docker.sock / smartctl）使用独立线程池，线程数等于其并发上限，
+# 超时后仍在运行的调用不会占满共享线程池、拖慢 psutil 等其他采集器
+DEDICATED_POOLS = {"smart", "docker", "docker_pull", "containers", "docker_stats"}
+
+
+class CollectorTimeoutError(Exception):
+    """采集器在超时时间内没有返回"""
+
+    def __init__(self, name: str, timeout: float):
+        super().__init__(f"Collector {name} timed out after {timeout}s")
+        self.name = name
+        self.timeout = timeout
+
+
+class CollectorLimit:
+    """单个采集器的超时和并发限制"""
+
+    def __init__(self, name: str, timeout: float, concurrency: int):
+        self.name = name
+        self.timeout = timeout
+        self.concurrency = concurrency
+        self.in_flight = 0
+        self.calls = 0
+        self.timeouts = 0
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.pool: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # 延迟到事件循环中创建，避免绑定到错误的事件循环
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+
+class BlockingExecutor:
+    """阻塞采集器执行层
+
+    将 psutil / docker-py / pySMART 等同步调用放到有界线程池中执行，
+    每个采集器有独立的超时时间和并发上限。超时的调用继续在线程中运行并占用
+    该采集器的并发名额；Docker 和 SMART 采集器使用各自的线程池，
+    因此一个挂起的 docker.sock 不会占用共享线程池中的线程。
+    """
+
+    def __init__(self, max_workers: Optional[int] = None):
+        if max_workers is None:
+            max_workers = env_number("COLLECTOR_MAX_WORKERS", 8, int)
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="collector")
+        self._limits: Dict[str, CollectorLimit] = {}
+
+    def configure(self, name: str, timeout: Optional[float] = None, concurrency: Optional[int] = None):
+        """设置采集器的超时时间和并发上限"""
+        limit = self._get_limit(name)
+        if timeout is not None:
+            limit.timeout = timeout
+        if concurrency is not None and concurrency != limit.concurrency:
+            limit.concurrency = concurrency
+            limit._semaphore = None
+            if limit.pool is not None:
+                limit.pool.shutdown(wait=False)
+                limit.pool = self._create_pool(limit)
+
+    @staticmethod
+    def _create_pool(limit: CollectorLimit) -> Optional[ThreadPoolExecutor]:
+        if limit.name not in DEDICATED_POOLS:
+            return None
+        return ThreadPoolExecutor(max_workers=max(limit.concurrency, 1), thread_name_prefix=f"collector-{limit.name}")
+
+    def _get_limit(self, name: str) -> CollectorLimit:
+        limit = self._limits.get(name)
+        if limit is None:
+            timeout = env_number(
+                f"COLLECTOR_TIMEOUT_{name.upper()}", DEFAULT_TIMEOUTS.get(name, DEFAULT_TIMEOUT), float
+            )
+            concurrency = env_number(
+                f"COLLECTOR_CONCURRENCY_{name.upper()}", DEFAULT_CONCURRENCY.get(name, DEFAULT_LIMIT), int
+            )
+            limit = CollectorLimit(name, timeout, concurrency)
+            limit.pool = self._create_pool(limit)
+            self._limits[name] = limit
+        return limit
+
+    async def run(self, name: str, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """在线程池中执行阻塞函数，超时或等待并发名额超时时抛出 CollectorTimeoutError"""
+        limit = self._get_limit(name)
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + limit.timeout
+
+        semaphore = limit.semaphore
+        try:
+            await asyncio.wait_for(semaphore.acquire(), limit.timeout)
+        except asyncio.TimeoutError:
+            limit.timeouts += 1
+            logger.warning(f"Collector {name} has {limit.in_flight} calls in flight, giving up")
+            raise CollectorTimeoutError(name, limit.timeout)
+
+        limit.calls += 1
+        limit.in_flight += 1
+        future = loop.run_in_executor(limit.pool or self._pool, functools.partial(func, *args, **kwargs))
+        future.add_done_callback(functools.partial(self._on_done, limit, semaphore))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), max(deadline - loop.time(), 0))
+        except asyncio.TimeoutError:
+            limit.timeouts += 1
+            logger.warning(f"Collector {name} timed out after {limit.timeout}s")
+            raise CollectorTimeoutError(name, limit.timeout)
+
+    @staticmethod
+    def _on_done(limit: CollectorLimit, semaphore: asyncio.Semaphore, future: asyncio.Future):
+        """线程真正结束后才释放并发名额"""
+        limit.in_flight -= 1
+        semaphore.release()
+        if not future.cancelled() and future.exception() is not None:
+            # 超时后才失败的调用没有等待者，这里读取异常避免未处理警告
+            logger.debug(f"Collector {limit.name} failed: {future.exception()}")
+
+    def stats(self) -> Dict[str, Dict]:
+        """获取各采集器的执行状态"""
+        return {
+            name: {
+                "timeout": limit.timeout,
+                "concurrency": limit.concurrency,
+                "in_flight": limit.in_flight,
+                "calls": limit.calls,
+                "timeouts": limit.timeouts,
+                "dedicated_pool": limit.pool is not None,
+            }
+            for name, limit in self._limits.items()
+        }
+
+    def shutdown(self):
+        """关闭线程池"""
+        self._pool.shutdown(wait=False)
+        for limit in self._limits.values():
+            if limit.pool is not None:
+                limit.pool.shutdown(wait=False)
+
+
+# 创建全局执行器实例
+blocking_executor = BlockingExecutor()
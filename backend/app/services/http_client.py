@@ -0,0 +1,117 @@
+import asyncio
+import logging
+from typing import Dict, Optional
+
+import aiohttp
+
+from app.config import env_number
+
+logger = logging.getLogger("nas-monitor.http_client")
+
+
+class HttpClient:
+    """应用共享的 aiohttp 会话
+
+    所有通知提供者共用一个 ClientSession 和连接池：保持长连接、按主机限制连接数、
+    缓存 DNS 解析结果，避免每次发送都重新进行 DNS / TCP / TLS 握手。
+    会话绑定到创建它的事件循环，事件循环变化时自动重建。
+    """
+
+    def __init__(self):
+        self.limit = env_number("HTTP_POOL_LIMIT", 100, int)
+        self.limit_per_host = env_number("HTTP_POOL_LIMIT_PER_HOST", 10, int)
+        self.dns_cache_ttl = env_number("HTTP_DNS_CACHE_TTL", 300, int)
+        self.keepalive_timeout = env_number("HTTP_KEEPALIVE_TIMEOUT", 30.0, float)
+        self.total_timeout = env_number("HTTP_TIMEOUT_TOTAL", 15.0, float)
+        self.connect_timeout = env_number("HTTP_TIMEOUT_CONNECT", 5.0, float)
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._counters = {
+            "requests": 0,
+            "errors": 0,
+            "connections_created": 0,
+            "connections_reused": 0,
+            "dns_cache_hits": 0,
+            "dns_cache_misses": 0,
+        }
+
+    def _trace_config(self) -> aiohttp.TraceConfig:
+        """通过 aiohttp 的 trace 钩子统计请求和连接复用情况"""
+        trace = aiohttp.TraceConfig()
+
+        def counter(name):
+            async def handler(session, context, params):
+                self._counters[name] += 1
+            return handler
+
+        trace.on_request_start.append(counter("requests"))
+        trace.on_request_exception.append(counter("errors"))
+        trace.on_connection_create_end.append(counter("connections_created"))
+        trace.on_connection_reuseconn.append(counter("connections_reused"))
+        trace.on_dns_cache_hit.append(counter("dns_cache_hits"))
+        trace.on_dns_cache_miss.append(counter("dns_cache_misses"))
+        return trace
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """获取共享会话（需在事件循环中调用），调用方不要关闭它"""
+        loop = asyncio.get_running_loop()
+        if self._session is not None and self._loop is not loop:
+            self._discard_session()
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                ttl_dns_cache=self.dns_cache_ttl,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.total_timeout, connect=self.connect_timeout),
+                trace_configs=[self._trace_config()],
+            )
+            self._loop = loop
+            logger.info("Created shared HTTP client session")
+        return self._session
+
+    def _discard_session(self):
+        """事件循环变化时释放旧会话：旧循环仍在运行时在其中关闭，否则分离连接器"""
+        session, loop = self._session, self._loop
+        self._session = None
+        self._loop = None
+        if session is None or session.closed:
+            return
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+        else:
+            # 旧循环已停止，无法等待关闭，分离后连接随旧循环一起释放
+            session.detach()
+        logger.info("Discarded HTTP client session bound to a previous event loop")
+
+    def stats(self) -> Dict:
+        """连接池状态"""
+        result = {
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "dns_cache_ttl": self.dns_cache_ttl,
+            "open": self._session is not None and not self._session.closed,
+            **self._counters,
+        }
+        if result["open"]:
+            connector = self._session.connector
+            # aiohttp 没有公开连接池明细，这里读取内部字段，仅用于调试
+            acquired = getattr(connector, "_acquired", ())
+            idle = getattr(connector, "_conns", {})
+            result["in_use"] = len(acquired)
+            result["idle"] = {f"{key.host}:{key.port}": len(conns) for key, conns in idle.items()}
+        return result
+
+    async def close(self):
+        """关闭共享会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+
+# 创建全局HTTP客户端实例
+http_client = HttpClient()
@@ -0,0 +1,223 @@
+import copy
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+from app.config import env_number
+from app.services import system_service, docker_service, network_service, io_service
+from app.services.executor import blocking_executor, CollectorTimeoutError
+
+logger = logging.getLogger("nas-monitor.metrics_cache")
+
+# 各指标族默认缓存时间（秒），可通过环境变量 METRICS_TTL_<FAMILY> 覆盖
+DEFAULT_TTLS = {
+    "system_status": 10.0,
+    "cpu": 1.0,
+    "memory": 1.0,
+    "disk": 10.0,
+    "smart": 600.0,
+    "network": 1.0,
+    "network_interfaces": 10.0,
+    "disk_io": 1.0,
+    "system_io": 1.0,
+    "containers": 2.0,
+    "docker_stats": 5.0,
+}
+
+
+class MetricEntry:
+    """一次采集结果"""
+
+    __slots__ = ("data", "collected_at", "stale", "_collected_monotonic")
+
+    def __init__(self, data: Any, stale: bool = False):
+        self.data = data
+        self.collected_at = time.time()
+        self.stale = stale
+        self._collected_monotonic = time.monotonic()
+
+    @property
+    def age(self) -> float:
+        """数据年龄（秒）"""
+        return time.monotonic() - self._collected_monotonic
+
+    def as_stale(self) -> "MetricEntry":
+        """复制一份标记为过期的结果（采集超时时返回）"""
+        entry = MetricEntry(self.data, stale=True)
+        entry.collected_at = self.collected_at
+        entry._collected_monotonic = self._collected_monotonic
+        return entry
+
+    def to_dict(self) -> Dict:
+        """转换为带年龄信息的字典"""
+        return {
+            "data": self.data,
+            "collected_at": self.collected_at,
+            "age": round(self.age, 3),
+            "stale": self.stale,
+        }
+
+    def headers(self) -> Dict[str, str]:
+        """用于 HTTP 响应头的数据新鲜度信息"""
+        return {
+            "X-Data-Age": f"{self.age:.3f}",
+            "X-Data-Stale": "true" if self.stale else "false",
+        }
+
+
+class MetricFamily:
+    """指标族：采集函数 + 缓存时间 + 最近一次结果"""
+
+    def __init__(self, name: str, collector: Callable[[], Any], ttl: float):
+        self.name = name
+        self.collector = collector
+        self.ttl = ttl
+        self.entry: Optional[MetricEntry] = None
+        self.lock = threading.Lock()
+        # 异步调用方共享的进行中采集
+        self.pending: Optional[asyncio.Future] = None
+        self.collections = 0
+        self.errors = 0
+        self.last_duration = 0.0
+
+    def is_fresh(self) -> bool:
+        """缓存是否仍在有效期内"""
+        return self.entry is not None and self.entry.age < self.ttl
+
+
+class MetricsCache:
+    """中心化指标快照缓存
+
+    API、WebSocket 推送和告警检测都从这里读取数据。每个指标族在缓存时间内
+    只会被采集一次，并发请求会等待同一次采集，采集开销与客户端数量无关。
+    """
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+
+    def register(self, name: str, collector: Callable[[], Any], ttl: Optional[float] = None):
+        """注册指标族，ttl 为 None 时使用环境变量或默认缓存时间"""
+        if ttl is None:
+            ttl = env_number(f"METRICS_TTL_{name.upper()}", DEFAULT_TTLS.get(name, 1.0), float)
+        self._families[name] = MetricFamily(name, collector, ttl)
+
+    def _get_family(self, name: str) -> MetricFamily:
+        family = self._families.get(name)
+        if family is None:
+            raise KeyError(f"Unknown metric family: {name}")
+        return family
+
+    def _collect(self, family: MetricFamily) -> MetricEntry:
+        """执行采集并更新缓存（调用方需持有 family.lock，或为该指标族唯一进行中的异步采集）"""
+        start = time.monotonic()
+        try:
+            data = family.collector()
+        except Exception as e:
+            family.errors += 1
+            logger.error(f"Error collecting metric family {family.name}: {e}")
+            if family.entry is not None:
+                return family.entry
+            raise
+        finally:
+            family.last_duration = time.monotonic() - start
+        family.collections += 1
+        family.entry = MetricEntry(data)
+        return family.entry
+
+    def get_entry(self, name: str) -> MetricEntry:
+        """获取指标族的最新结果（过期时同步采集），结果由所有调用方共享，只读"""
+        family = self._get_family(name)
+        entry = family.entry
+        if entry is not None and entry.age < family.ttl:
+            return entry
+        with family.lock:
+            # 等待锁期间其他调用方可能已经完成采集
+            if family.is_fresh():
+                return family.entry
+            return self._collect(family)
+
+    def get(self, name: str) -> Any:
+        """获取指标族最新数据的副本，调用方可以修改"""
+        return copy.deepcopy(self.get_entry(name).data)
+
+    async def aget_entry(self, name: str) -> MetricEntry:
+        """异步获取指标族的最新结果
+
+        结果由所有调用方共享，只读（需要修改时使用 aget）。缓存有效时直接返回；否则在有界
+        线程池中采集，不阻塞事件循环。同一指标族同时只有一次采集在线程中执行，其他调用方
+        在事件循环中等待它，不会占用线程等待 family.lock。
+        采集超时时返回上一次的结果并标记 stale，没有历史结果时抛出 CollectorTimeoutError。
+        """
+        family = self._get_family(name)
+        if family.is_fresh():
+            return family.entry
+        pending = family.pending
+        if pending is None or pending.done() or pending.get_loop() is not asyncio.get_running_loop():
+            pending = asyncio.ensure_future(blocking_executor.run(name, self._collect, family))
+            # 所有等待者都被取消时也读取结果，避免未处理异常警告
+            pending.add_done_callback(lambda future: future.cancelled() or future.exception())
+            family.pending = pending
+        try:
+            return await asyncio.shield(pending)
+        except CollectorTimeoutError:
+            if family.entry is not None:
+                return family.entry.as_stale()
+            raise
+
+    async def aget(self, name: str) -> Any:
+        """异步获取指标族最新数据的副本，调用方可以修改"""
+        return copy.deepcopy((await self.aget_entry(name)).data)
+
+    def invalidate(self, name: str):
+        """使指标族缓存失效，下次读取时重新采集"""
+        family = self._families.get(name)
+        if family is not None:
+            family.entry = None
+
+    async def snapshot(self, names: Optional[List[str]] = None) -> Dict[str, Dict]:
+        """获取多个指标族的数据及其年龄"""
+        names = names or list(self._families.keys())
+        for name in names:
+            self._get_family(name)
+        entries = await asyncio.gather(*(self.aget_entry(name) for name in names), return_exceptions=True)
+        result = {}
+        for name, entry in zip(names, entries):
+            if isinstance(entry, Exception):
+                result[name] = {"data": None, "collected_at": None, "age": None, "stale": True, "error": str(entry)}
+            else:
+                result[name] = entry.to_dict()
+        return result
+
+    def stats(self) -> Dict[str, Dict]:
+        """获取各指标族的缓存状态（不触发采集）"""
+        result = {}
+        for name, family in self._families.items():
+            result[name] = {
+                "ttl": family.ttl,
+                "age": round(family.entry.age, 3) if family.entry else None,
+                "collections": family.collections,
+                "errors": family.errors,
+                "last_duration": round(family.last_duration, 4),
+            }
+        return result
+
+
+def _register_default_families(cache: MetricsCache):
+    """注册默认指标族"""
+    cache.register("system_status", system_service.get_system_status)
+    cache.register("cpu", system_service.get_cpu_usage)
+    cache.register("memory", system_service.get_memory_usage)
+    cache.register("disk", system_service.get_disk_usage)
+    cache.register("smart", system_service.get_disk_smart_info)
+    cache.register("network", network_service.get_network_traffic)
+    cache.register("network_interfaces", network_service.get_network_interfaces)
+    cache.register("disk_io", io_service.get_disk_io)
+    cache.register("system_io", io_service.get_system_io)
+    cache.register("containers", docker_service.get_containers)
+    cache.register("docker_stats", docker_service.get_docker_stats)
+
+
+# 创建全局指标缓存实例
+metrics_cache = MetricsCache()
+_register_default_families(metrics_cache)
@@ -1,7 +1,7 @@
 import logging
 logger = logging.getLogger("nas-monitor.feishu")
 import asyncio
-import aiohttp
+from app.services.http_client import http_client
 import logging
 import json
 import time
@@ -42,19 +42,19 @@ class FeishuLongPolling:
                 "app_secret": self.app_secret
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, json=payload) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("code") == 0:
-                            self.access_token = data.get("tenant_access_token")
-                            self.token_expire_time = time.time() + data.get("expire", 3600)
-                            logger.info("获取飞书访问令牌成功")
-                            return self.access_token
-                        else:
-                            logger.error(f"获取飞书访问令牌失败: {data.get('msg')}")
+            session = http_client.get_session()
+            async with session.post(url, json=payload) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get("code") == 0:
+                        self.access_token = data.get("tenant_access_token")
+                        self.token_expire_time = time.time() + data.get("expire", 3600)
+                        logger.info("获取飞书访问令牌成功")
+                        return self.access_token
                     else:
-                        logger.error(f"飞书API响应错误: {response.status}")
+                        logger.error(f"获取飞书访问令牌失败: {data.get('msg')}")
+                else:
+                    logger.error(f"飞书API响应错误: {response.status}")
         except Exception as e:
             logger.error(f"获取飞书访问令牌时发生错误: {str(e)}")
         return None
@@ -71,16 +71,16 @@ class FeishuLongPolling:
                 "Authorization": f"Bearer {access_token}"
             }
             
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("code") == 0:
-                            return data
-                        else:
-                            logger.error(f"获取事件列表失败: {data.get('msg')}")
+            session = http_client.get_session()
+            async with session.get(url, headers=headers) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get("code") == 0:
+                        return data
                     else:
-                        logger.error(f"飞书API响应错误: {response.status}")
+                        logger.error(f"获取事件列表失败: {data.get('msg')}")
+                else:
+                    logger.error(f"飞书API响应错误: {response.status}")
         except Exception as e:
             logger.error(f"获取事件列表时发生错误: {str(e)}")
         return None
@@ -1,6 +1,6 @@
-import aiohttp
 import logging
-from .notification_service import NotificationProvider
+from app.services.http_client import http_client
+from .notification_provider import NotificationProvider
 
 logger = logging.getLogger(__name__)
 
@@ -40,30 +40,30 @@ class FeishuOpenClawProvider(NotificationProvider):
             
             full_message = f"{prefix}{message}"
             
-            async with aiohttp.ClientSession() as session:
-                # 构造OpenClaw API请求
-                payload = {
-                    "chat_id": self.chat_id,
-                    "message": full_message,
-                    "severity": severity
-                }
-                
-                headers = {
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                }
-                
-                # 发送请求到OpenClaw API
-                async with session.post(
-                    f"{self.api_url}/api/feishu/send",
-                    json=payload,
-                    headers=headers
-                ) as response:
-                    if response.status == 200:
-                        return True
-                    else:
-                        logger.error(f"OpenClaw API 响应错误: {response.status}")
-                        return False
+            session = http_client.get_session()
+            # 构造OpenClaw API请求
+            payload = {
+                "chat_id": self.chat_id,
+                "message": full_message,
+                "severity": severity
+            }
+
+            headers = {
+                "Authorization": f"Bearer {self.api_key}",
+                "Content-Type": "application/json"
+            }
+
+            # 发送请求到OpenClaw API
+            async with session.post(
+                f"{self.api_url}/api/feishu/send",
+                json=payload,
+                headers=headers
+            ) as response:
+                if response.status == 200:
+                    return True
+                else:
+                    logger.error(f"OpenClaw API 响应错误: {response.status}")
+                    return False
         except Exception as e:
             logger.error(f"通过OpenClaw发送飞书通知时发生错误: {str(e)}")
             return False
@@ -1,6 +1,7 @@
-import aiohttp
+import hashlib
 import logging
-from .notification_service import NotificationProvider
+from app.services.http_client import http_client
+from .notification_provider import NotificationProvider
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +15,15 @@ class FeishuProvider(NotificationProvider):
         """
         self.webhook_url = webhook_url
     
+    def rate_limits(self):
+        """飞书自定义机器人限制：5 条/秒，100 条/分钟"""
+        # webhook 地址包含密钥，桶名称只使用其摘要
+        key = hashlib.sha1(self.webhook_url.encode()).hexdigest()[:12]
+        return [
+            (f"feishu:{key}:second", 5.0, 5.0),
+            (f"feishu:{key}:minute", 100 / 60, 100.0),
+        ]
+    
     async def send_message(self, message: str, severity: str = "info") -> bool:
         """发送消息到飞书
         
@@ -40,19 +50,19 @@ class FeishuProvider(NotificationProvider):
             
             full_message = f"{prefix}{message}"
             
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "msg_type": "text",
-                    "content": {
-                        "text": full_message
-                    }
+            session = http_client.get_session()
+            payload = {
+                "msg_type": "text",
+                "content": {
+                    "text": full_message
                 }
-                async with session.post(self.webhook_url, json=payload) as response:
-                    if response.status == 200:
-                        return True
-                    else:
-                        logger.error(f"飞书 API 响应错误: {response.status}")
-                        return False
+            }
+            async with session.post(self.webhook_url, json=payload) as response:
+                if response.status == 200:
+                    return True
+                else:
+                    logger.error(f"飞书 API 响应错误: {response.status}")
+                    return False
         except Exception as e:
             logger.error(f"发送飞书通知时发生错误: {str(e)}")
             return False
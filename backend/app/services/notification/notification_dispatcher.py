@@ -0,0 +1,498 @@
+import os
+import json
+import time
+import uuid
+import asyncio
+import logging
+import threading
+from collections import deque
+from typing import Callable, Dict, List, Optional
+from app.config import env_number
+
+from app.services.notification.notification_provider import NotificationProvider
+from app.services.notification.rate_limiter import RateLimiterRegistry
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationJob:
+    """一条待发送到某个渠道的通知"""
+
+    __slots__ = ("id", "channel_id", "message", "severity", "category", "attempts", "enqueued_at", "last_error")
+
+    def __init__(self, channel_id: str, message: str, severity: str, category: Optional[str] = None):
+        self.id = str(uuid.uuid4())
+        self.channel_id = channel_id
+        self.message = message
+        self.severity = severity
+        self.category = category
+        self.attempts = 0
+        self.enqueued_at = time.time()
+        self.last_error: Optional[str] = None
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.id,
+            "channel_id": self.channel_id,
+            "message": self.message,
+            "severity": self.severity,
+            "category": self.category,
+            "attempts": self.attempts,
+            "enqueued_at": self.enqueued_at,
+            "last_error": self.last_error,
+        }
+
+
+class DeadLetterStore:
+    """死信存储：重试耗尽或无法投递的通知
+
+    追加写入 JSONL 文件，内存中保留最近的若干条用于查看和重新投递。
+    """
+
+    def __init__(self, path: str, max_items: int = 500):
+        self.path = path
+        self._items: deque = deque(maxlen=max_items)
+        self._lock = threading.Lock()
+        self.total = 0
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    for line in f:
+                        line = line.strip()
+                        if line:
+                            self._items.append(json.loads(line))
+                            self.total += 1
+            except Exception as e:
+                logger.error(f"加载通知死信时发生错误: {str(e)}")
+
+    def add(self, job: NotificationJob, reason: str):
+        item = job.to_dict()
+        item["reason"] = reason
+        item["failed_at"] = time.time()
+        with self._lock:
+            self._items.append(item)
+            self.total += 1
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(item, ensure_ascii=False) + "\n")
+            except Exception as e:
+                logger.error(f"写入通知死信时发生错误: {str(e)}")
+
+    def list(self) -> List[Dict]:
+        with self._lock:
+            return list(self._items)
+
+    def drain(self) -> List[Dict]:
+        """取出全部死信并清空文件（用于重新投递）"""
+        with self._lock:
+            items = list(self._items)
+            self._items.clear()
+            try:
+                open(self.path, "w").close()
+            except Exception as e:
+                logger.error(f"清空通知死信时发生错误: {str(e)}")
+            return items
+
+
+# 优先级通道，按优先级从高到低排列；未知级别进入 info 通道
+LANES = ("critical", "warning", "info")
+# critical 通道由独立的发送协程处理，不参与汇总，也不排在低优先级通知后面
+PRIORITY_LANES = ("critical",)
+NORMAL_LANES = ("warning", "info")
+
+
+def lane_of(severity: str) -> str:
+    return severity if severity in LANES else "info"
+
+
+class Lane:
+    """一个优先级通道的队列和等待时间（入队到出队）统计"""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.maxsize = maxsize
+        self.jobs: deque = deque()
+        self.enqueued = 0
+        self.dequeued = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def stats(self) -> Dict:
+        return {
+            "depth": len(self.jobs),
+            "enqueued": self.enqueued,
+            "dequeued": self.dequeued,
+            "rejected": self.rejected,
+            "oldest_wait": round(time.time() - self.jobs[0].enqueued_at, 3) if self.jobs else 0.0,
+            "avg_wait": round(self.wait_total / self.dequeued, 3) if self.dequeued else 0.0,
+            "max_wait": round(self.wait_max, 3),
+        }
+
+
+class ChannelQueue:
+    """单个渠道的分级发送队列和统计
+
+    每个级别一个队列（各自限制长度，大量 info 不会挤掉 critical），出队时
+    总是先取高优先级通道中的通知。
+    """
+
+    def __init__(self, channel_id: str, maxsize: int):
+        self.channel_id = channel_id
+        self.lanes: Dict[str, Lane] = {name: Lane(name, maxsize) for name in LANES}
+        self.tasks: List[asyncio.Task] = []
+        # 停止发送协程的原因，协程被取消时正在发送的通知以此转入死信
+        self.cancel_reason: Optional[str] = None
+        self._changed = asyncio.Event()
+        self._unfinished = 0
+        self._finished = asyncio.Event()
+        self._finished.set()
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.dead = 0
+        self.digests = 0
+        self.last_latency = 0.0
+
+    def put_nowait(self, job: NotificationJob):
+        lane = self.lanes[lane_of(job.severity)]
+        if len(lane.jobs) >= lane.maxsize:
+            lane.rejected += 1
+            raise asyncio.QueueFull()
+        lane.jobs.append(job)
+        lane.enqueued += 1
+        self._unfinished += 1
+        self._finished.clear()
+        self._changed.set()
+
+    def get_nowait(self, lanes=LANES) -> Optional[NotificationJob]:
+        """按优先级取出一条通知，没有时返回 None"""
+        for name in lanes:
+            lane = self.lanes[name]
+            if lane.jobs:
+                job = lane.jobs.popleft()
+                wait = time.time() - job.enqueued_at
+                lane.dequeued += 1
+                lane.wait_total += wait
+                lane.wait_max = max(lane.wait_max, wait)
+                return job
+        return None
+
+    async def get(self, lanes=LANES) -> NotificationJob:
+        while True:
+            job = self.get_nowait(lanes)
+            if job is not None:
+                return job
+            self._changed.clear()
+            await self._changed.wait()
+
+    def task_done(self):
+        self._unfinished -= 1
+        if self._unfinished <= 0:
+            self._finished.set()
+
+    async def join(self):
+        await self._finished.wait()
+
+    def qsize(self) -> int:
+        return sum(len(lane.jobs) for lane in self.lanes.values())
+
+    def drain(self) -> List[NotificationJob]:
+        jobs = []
+        for lane in self.lanes.values():
+            jobs.extend(lane.jobs)
+            lane.jobs.clear()
+        return jobs
+
+    def stats(self) -> Dict:
+        return {
+            "queued": self.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retried": self.retried,
+            "dead": self.dead,
+            "digests": self.digests,
+            "last_latency": round(self.last_latency, 3),
+            "lanes": {name: lane.stats() for name, lane in self.lanes.items()},
+        }
+
+
+class NotificationDispatcher:
+    """通知分发器
+
+    每个渠道一个异步队列和一个发送协程，渠道之间互不阻塞；全局信号量限制同时
+    进行的发送数。发送失败按指数退避重试，重试耗尽后写入死信存储。
+    告警创建只需入队，不再等待第三方接口返回。
+
+    渠道启用汇总时，在窗口期内（或达到条数上限前）收集通知，按级别和类型合并为
+    一条汇总消息；发送前按提供者公布的频率限制获取令牌。
+
+    critical 通知走独立的优先通道：由单独的协程发送，不参与汇总，获取令牌时
+    不排队（允许透支，由低优先级通知补回），也不占用全局并发名额，因此不会被
+    积压的 info / warning 通知或它们的重试退避拖延。
+    """
+
+    def __init__(self, get_provider: Callable[[str], Optional[NotificationProvider]], storage_dir: str = "./data",
+                 get_options: Optional[Callable[[str], Dict]] = None):
+        """get_options 根据渠道ID返回汇总设置（batch_enabled / batch_window / batch_max_items）"""
+        self.get_provider = get_provider
+        self.get_options = get_options or (lambda channel_id: {})
+        self.rate_limiters = RateLimiterRegistry()
+        self.queue_size = env_number("NOTIFY_QUEUE_SIZE", 1000, int)
+        self.max_concurrency = env_number("NOTIFY_MAX_CONCURRENCY", 4, int)
+        self.max_retries = env_number("NOTIFY_MAX_RETRIES", 3, int)
+        self.backoff_base = env_number("NOTIFY_RETRY_BACKOFF", 2.0, float)
+        self.backoff_max = env_number("NOTIFY_RETRY_BACKOFF_MAX", 60.0, float)
+        self.send_timeout = env_number("NOTIFY_SEND_TIMEOUT", 15.0, float)
+        os.makedirs(storage_dir, exist_ok=True)
+        self.dead_letters = DeadLetterStore(os.path.join(storage_dir, "notification_dead_letters.jsonl"))
+        self._channels: Dict[str, ChannelQueue] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _ensure_loop(self) -> bool:
+        """绑定到当前事件循环（第一次入队时）"""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return False
+        if self._loop is not loop:
+            # 事件循环变化（例如测试或重启）时丢弃旧队列
+            self._loop = loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._channels = {}
+        return True
+
+    def _get_channel(self, channel_id: str) -> ChannelQueue:
+        channel = self._channels.get(channel_id)
+        if channel is None:
+            channel = ChannelQueue(channel_id, self.queue_size)
+            channel.tasks = [
+                self._loop.create_task(self._priority_worker(channel)),
+                self._loop.create_task(self._worker(channel)),
+            ]
+            self._channels[channel_id] = channel
+        return channel
+
+    def enqueue(self, channel_ids: List[str], message: str, severity: str = "info",
+                category: Optional[str] = None) -> int:
+        """将通知放入各渠道队列并返回入队的渠道数；从其他线程调用时转交给事件循环"""
+        if not self._ensure_loop():
+            if self._loop is None or self._loop.is_closed():
+                logger.error("通知分发器没有可用的事件循环，通知被丢弃")
+                return 0
+            self._loop.call_soon_threadsafe(self.enqueue, channel_ids, message, severity, category)
+            return len(channel_ids)
+
+        queued = 0
+        for channel_id in channel_ids:
+            job = NotificationJob(channel_id, message, severity, category)
+            try:
+                self._get_channel(channel_id).put_nowait(job)
+                queued += 1
+            except asyncio.QueueFull:
+                logger.warning(f"通知渠道 {channel_id} 队列已满，通知转入死信")
+                self._dead_letter(job, "queue_full")
+        return queued
+
+    def _dead_letter(self, job: NotificationJob, reason: str):
+        channel = self._channels.get(job.channel_id)
+        if channel is not None:
+            channel.dead += 1
+        self.dead_letters.add(job, reason)
+
+    def _backoff(self, attempts: int) -> float:
+        return min(self.backoff_base * (2 ** (attempts - 1)), self.backoff_max)
+
+    async def _send(self, provider: NotificationProvider, job: NotificationJob, priority: bool = False) -> bool:
+        if priority:
+            await self.rate_limiters.acquire(provider.rate_limits(), priority=True)
+            return await asyncio.wait_for(provider.send_message(job.message, job.severity), self.send_timeout)
+        # 等待令牌时不占用全局并发名额
+        await self.rate_limiters.acquire(provider.rate_limits())
+        async with self._semaphore:
+            return await asyncio.wait_for(provider.send_message(job.message, job.severity), self.send_timeout)
+
+    async def _priority_worker(self, channel: ChannelQueue):
+        """critical 通道发送协程：逐条立即发送"""
+        while True:
+            job = await channel.get(PRIORITY_LANES)
+            try:
+                await self._deliver(channel, job, priority=True)
+            except asyncio.CancelledError:
+                if channel.cancel_reason:
+                    self.dead_letters.add(job, channel.cancel_reason)
+                raise
+            except Exception as e:
+                logger.error(f"通知渠道 {channel.channel_id} 优先发送协程异常: {str(e)}")
+            finally:
+                channel.task_done()
+
+    async def _worker(self, channel: ChannelQueue):
+        """warning / info 通道发送协程：按优先级顺序发送，失败时在本渠道内退避重试"""
+        while True:
+            jobs: List[NotificationJob] = [await channel.get(NORMAL_LANES)]
+            try:
+                options = self.get_options(channel.channel_id)
+                if options.get("batch_enabled"):
+                    await self._collect_batch(channel, jobs, options)
+                if len(jobs) > 1:
+                    channel.digests += 1
+                    await self._deliver(channel, self._build_digest(jobs))
+                else:
+                    await self._deliver(channel, jobs[0])
+            except asyncio.CancelledError:
+                if channel.cancel_reason:
+                    for job in jobs:
+                        self.dead_letters.add(job, channel.cancel_reason)
+                raise
+            except Exception as e:
+                logger.error(f"通知渠道 {channel.channel_id} 发送协程异常: {str(e)}")
+            finally:
+                for _ in jobs:
+                    channel.task_done()
+
+    async def _collect_batch(self, channel: ChannelQueue, jobs: List[NotificationJob], options: Dict):
+        """从第一条通知起等待 batch_window 秒或收集到 batch_max_items 条"""
+        loop = asyncio.get_running_loop()
+        window = float(options.get("batch_window", 60))
+        max_items = int(options.get("batch_max_items", 20))
+        deadline = loop.time() + window
+        while len(jobs) < max_items:
+            job = channel.get_nowait(NORMAL_LANES)
+            if job is not None:
+                jobs.append(job)
+                continue
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                jobs.append(await asyncio.wait_for(channel.get(NORMAL_LANES), timeout))
+            except asyncio.TimeoutError:
+                break
+
+    @staticmethod
+    def _build_digest(jobs: List[NotificationJob]) -> NotificationJob:
+        """将多条通知合并为一条按级别、类型分组的汇总"""
+        severity_order = {"critical": 0, "warning": 1, "info": 2}
+        groups: Dict[str, Dict[str, List[NotificationJob]]] = {}
+        for job in jobs:
+            groups.setdefault(job.severity, {}).setdefault(job.category or "其他", []).append(job)
+        severities = sorted(groups, key=lambda severity: severity_order.get(severity, len(severity_order)))
+
+        span = int(jobs[-1].enqueued_at - jobs[0].enqueued_at)
+        lines = [f"告警汇总：{len(jobs)} 条通知（{span} 秒内）"]
+        for severity in severities:
+            count = sum(len(items) for items in groups[severity].values())
+            lines.append(f"[{severity}] {count} 条")
+            for category, items in sorted(groups[severity].items(), key=lambda item: -len(item[1])):
+                lines.append(f"  · {category} ×{len(items)}: {items[-1].message}")
+
+        digest = NotificationJob(jobs[0].channel_id, "\n".join(lines), severities[0], "digest")
+        digest.enqueued_at = jobs[0].enqueued_at
+        return digest
+
+    async def _deliver(self, channel: ChannelQueue, job: NotificationJob, priority: bool = False):
+        while True:
+            provider = self.get_provider(job.channel_id)
+            if provider is None:
+                self._dead_letter(job, "channel_unavailable")
+                return
+
+            job.attempts += 1
+            start = time.monotonic()
+            try:
+                success = await self._send(provider, job, priority)
+                if not success:
+                    job.last_error = "provider returned failure"
+            except asyncio.TimeoutError:
+                success = False
+                job.last_error = f"timeout after {self.send_timeout}s"
+            except Exception as e:
+                success = False
+                job.last_error = str(e)
+            channel.last_latency = time.monotonic() - start
+
+            if success:
+                channel.sent += 1
+                logger.info(f"通知已发送到 {job.channel_id}")
+                return
+
+            channel.failed += 1
+            if job.attempts > self.max_retries:
+                logger.error(f"通知发送到 {job.channel_id} 失败 {job.attempts} 次，转入死信: {job.last_error}")
+                self._dead_letter(job, "retries_exhausted")
+                return
+
+            delay = self._backoff(job.attempts)
+            channel.retried += 1
+            logger.warning(f"通知发送到 {job.channel_id} 失败，{delay:.1f}秒后重试: {job.last_error}")
+            await asyncio.sleep(delay)
+
+    async def _close_channel(self, channel: ChannelQueue, reason: str):
+        """取消渠道的发送协程并等待其退出，正在发送和队列中的通知转入死信"""
+        channel.cancel_reason = reason
+        for task in channel.tasks:
+            task.cancel()
+        await asyncio.gather(*channel.tasks, return_exceptions=True)
+        for job in channel.drain():
+            self.dead_letters.add(job, reason)
+
+    async def remove_channel(self, channel_id: str):
+        """渠道被删除时停止其发送协程，等待其退出"""
+        channel = self._channels.pop(channel_id, None)
+        if channel is not None:
+            await self._close_channel(channel, "channel_removed")
+
+    def remove_channel_soon(self, channel_id: str) -> Optional[asyncio.Task]:
+        """在同步代码中移除渠道：立即停止接收新通知，返回等待发送协程退出的任务"""
+        channel = self._channels.pop(channel_id, None)
+        if channel is None:
+            return None
+        return self._loop.create_task(self._close_channel(channel, "channel_removed"))
+
+    def retry_dead_letters(self) -> int:
+        """重新投递全部死信（保留原通知类型）"""
+        items = self.dead_letters.drain()
+        for item in items:
+            self.enqueue([item["channel_id"]], item["message"], item["severity"], item.get("category"))
+        return len(items)
+
+    def lane_stats(self) -> Dict[str, Dict]:
+        """各优先级通道在所有渠道上的汇总：积压数和等待时间"""
+        result = {}
+        for name in LANES:
+            lanes = [channel.lanes[name] for channel in self._channels.values()]
+            dequeued = sum(lane.dequeued for lane in lanes)
+            wait_total = sum(lane.wait_total for lane in lanes)
+            result[name] = {
+                "depth": sum(len(lane.jobs) for lane in lanes),
+                "dequeued": dequeued,
+                "rejected": sum(lane.rejected for lane in lanes),
+                "oldest_wait": max((lane.stats()["oldest_wait"] for lane in lanes), default=0.0),
+                "avg_wait": round(wait_total / dequeued, 3) if dequeued else 0.0,
+                "max_wait": round(max((lane.wait_max for lane in lanes), default=0.0), 3),
+            }
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_retries": self.max_retries,
+            "rate_limits": self.rate_limiters.stats(),
+            "lanes": self.lane_stats(),
+            "channels": {channel_id: channel.stats() for channel_id, channel in self._channels.items()},
+            "dead_letters": self.dead_letters.total,
+        }
+
+    async def shutdown(self, timeout: float = 5.0):
+        """等待队列中的通知发送完成（最多 timeout 秒），然后停止发送协程"""
+        channels = list(self._channels.values())
+        if channels:
+            try:
+                await asyncio.wait_for(asyncio.gather(*(c.join() for c in channels)), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("关闭时仍有未发送的通知")
+        self._channels = {}
+        for channel in channels:
+            await self._close_channel(channel, "shutdown")
@@ -0,0 +1,16 @@
+from abc import ABC, abstractmethod
+from typing import List
+from app.services.notification.rate_limiter import RateLimit
+
+
+class NotificationProvider(ABC):
+    """通知提供者基类"""
+    
+    @abstractmethod
+    async def send_message(self, message: str, severity: str = "info") -> bool:
+        """发送消息"""
+        pass
+    
+    def rate_limits(self) -> List[RateLimit]:
+        """发送前需要获取令牌的限流规则，默认不限流"""
+        return []
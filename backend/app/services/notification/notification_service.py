@@ -1,36 +1,71 @@
 from typing import List, Dict, Optional
-from abc import ABC, abstractmethod
+import asyncio
 import logging
 from app.services.notification.notification_storage import storage
+from app.services.notification.notification_provider import NotificationProvider
 from app.services.notification.telegram_provider import TelegramProvider
 from app.services.notification.feishu_provider import FeishuProvider
 from app.services.notification.feishu_openclaw_provider import FeishuOpenClawProvider
+from app.services.notification.notification_dispatcher import NotificationDispatcher
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-class NotificationProvider(ABC):
-    """通知提供者基类"""
-    
-    @abstractmethod
-    async def send_message(self, message: str, severity: str = "info") -> bool:
-        """发送消息"""
-        pass
-
 class NotificationService:
     """通知服务"""
     
     def __init__(self):
         self.providers: Dict[str, NotificationProvider] = {}
+        # 渠道ID -> 创建提供者时的配置签名，签名不变时保留提供者（及其已验证状态）
+        self._channel_signatures: Dict[str, tuple] = {}
+        # 渠道ID -> 汇总设置，修改时不需要重建提供者
+        self._channel_options: Dict[str, Dict] = {}
+        self._channels_version = None
+        # 按渠道排队异步发送，告警创建只需入队
+        self.dispatcher: Optional[NotificationDispatcher] = NotificationDispatcher(
+            self.get_provider, storage.storage_dir, self.get_channel_options
+        )
         self._load_channels()
     
+    @staticmethod
+    def _channel_signature(channel) -> tuple:
+        return channel.type, tuple(sorted(channel.config.items()))
+    
     def _load_channels(self):
-        """从存储加载通知渠道并创建提供者"""
+        """从存储同步通知渠道，只重建配置发生变化的提供者
+        
+        存储层缓存渠道配置，文件未变化时版本号不变，这里直接返回。
+        """
         channels = storage.get_channels()
+        if storage.channels_version == self._channels_version:
+            return
+        self._channels_version = storage.channels_version
+        
+        current_ids = set()
         for channel in channels:
-            if channel.enabled:
-                self._create_provider(channel)
+            current_ids.add(channel.id)
+            self._sync_channel(channel)
+        for channel_id in [cid for cid in self._channel_signatures if cid not in current_ids]:
+            self.remove_provider(channel_id)
+    
+    def _sync_channel(self, channel):
+        """按渠道当前配置创建、保留或移除提供者"""
+        if not channel.enabled:
+            if channel.id in self._channel_signatures:
+                self.remove_provider(channel.id)
+            return
+        self._channel_options[channel.id] = {
+            "batch_enabled": channel.batch_enabled,
+            "batch_window": channel.batch_window,
+            "batch_max_items": channel.batch_max_items,
+        }
+        signature = self._channel_signature(channel)
+        if self._channel_signatures.get(channel.id) == signature and channel.id in self.providers:
+            return
+        self.providers.pop(channel.id, None)
+        self._channel_signatures[channel.id] = signature
+        self._create_provider(channel)
     
     def _create_provider(self, channel):
         """根据渠道类型创建通知提供者"""
@@ -67,50 +102,70 @@ class NotificationService:
         self.providers[name] = provider
     
     def update_provider(self, channel):
-        """更新通知提供者"""
-        if channel.id in self.providers:
-            del self.providers[channel.id]
-        if channel.enabled:
-            self._create_provider(channel)
+        """更新通知提供者（配置未变化时保留原提供者）"""
+        self._sync_channel(channel)
     
-    def remove_provider(self, channel_id):
-        """移除通知提供者"""
+    def remove_provider(self, channel_id) -> Optional[asyncio.Task]:
+        """移除通知提供者，返回等待该渠道发送协程退出的任务（没有发送队列时为 None）"""
+        self._channel_signatures.pop(channel_id, None)
+        self._channel_options.pop(channel_id, None)
         if channel_id in self.providers:
             del self.providers[channel_id]
             logger.info(f"已移除通知提供者: {channel_id}")
+        if self.dispatcher is not None:
+            return self.dispatcher.remove_channel_soon(channel_id)
+        return None
+    
+    def get_provider(self, channel_id: str) -> Optional[NotificationProvider]:
+        """根据渠道ID获取通知提供者"""
+        return self.providers.get(channel_id)
+    
+    def get_channel_options(self, channel_id: str) -> Dict:
+        """获取渠道的汇总设置"""
+        return self._channel_options.get(channel_id, {})
+    
+    def enqueue_notification(self, message: str, severity: str = "info", providers: List[str] = None,
+                             category: Optional[str] = None) -> int:
+        """将通知放入各渠道的发送队列，立即返回入队的渠道数"""
+        # 渠道配置文件变化时同步提供者
+        self._load_channels()
+        
+        if not providers:
+            providers = list(self.providers.keys())
+        return self.dispatcher.enqueue(providers, message, severity, category)
     
     async def send_notification(self, message: str, severity: str = "info", providers: List[str] = None):
-        """发送通知
+        """直接发送通知并等待各渠道结果（告警通知使用 enqueue_notification 异步发送）
         
         Args:
             message: 通知消息
             severity: 严重程度 (info, warning, critical)
             providers: 指定的通知提供者列表， None 表示使用所有注册的提供者
         """
-        # 重新加载渠道，确保使用最新配置
+        # 渠道配置文件变化时同步提供者
         self._load_channels()
         
         if not providers:
             providers = list(self.providers.keys())
         
-        results = {}
-        for provider_name in providers:
-            if provider_name in self.providers:
-                try:
-                    success = await self.providers[provider_name].send_message(message, severity)
-                    results[provider_name] = success
-                    if success:
-                        logger.info(f"通知已发送到 {provider_name}")
-                    else:
-                        logger.warning(f"通知发送到 {provider_name} 失败")
-                except Exception as e:
-                    logger.error(f"发送通知到 {provider_name} 时发生错误: {str(e)}")
-                    results[provider_name] = False
-            else:
+        async def send_one(provider_name: str) -> bool:
+            if provider_name not in self.providers:
                 logger.warning(f"通知提供者 {provider_name} 未注册")
-                results[provider_name] = False
+                return False
+            try:
+                success = await self.providers[provider_name].send_message(message, severity)
+                if success:
+                    logger.info(f"通知已发送到 {provider_name}")
+                else:
+                    logger.warning(f"通知发送到 {provider_name} 失败")
+                return success
+            except Exception as e:
+                logger.error(f"发送通知到 {provider_name} 时发生错误: {str(e)}")
+                return False
         
-        return results
+        # 各渠道并发发送，慢渠道不会拖慢其他渠道
+        successes = await asyncio.gather(*(send_one(provider_name) for provider_name in providers))
+        return dict(zip(providers, successes))
 
 # 创建全局通知服务实例
 notification_service = NotificationService()
@@ -17,6 +17,13 @@ class NotificationStorage:
         self.channels_file = os.path.join(storage_dir, "notification_channels.json")
         self.preferences_file = os.path.join(storage_dir, "notification_preferences.json")
         
+        # 通知渠道缓存，文件 mtime / 大小变化时才重新读取
+        self._channels_cache: Optional[List[Dict]] = None
+        self._channel_models: List[NotificationChannel] = []
+        self._channels_stat: Optional[tuple] = None
+        # 渠道配置版本号，每次重新加载或写入时递增
+        self.channels_version = 0
+        
         # 确保存储目录存在
         os.makedirs(storage_dir, exist_ok=True)
         
@@ -33,15 +40,33 @@ class NotificationStorage:
             with open(self.preferences_file, 'w', encoding='utf-8') as f:
                 json.dump([], f, ensure_ascii=False, indent=2)
     
+    def _stat_channels(self) -> Optional[tuple]:
+        try:
+            st = os.stat(self.channels_file)
+            return st.st_mtime_ns, st.st_size
+        except FileNotFoundError:
+            return None
+    
+    def _set_channels_cache(self, channels: List[Dict]):
+        self._channels_cache = channels
+        self._channel_models = [NotificationChannel(**channel) for channel in channels]
+        self._channels_stat = self._stat_channels()
+        self.channels_version += 1
+    
     def _load_channels(self) -> List[Dict]:
-        """加载通知渠道"""
-        with open(self.channels_file, 'r', encoding='utf-8') as f:
-            return json.load(f)
+        """加载通知渠道（文件未变化时使用缓存）"""
+        stat = self._stat_channels()
+        if self._channels_cache is None or stat != self._channels_stat:
+            with open(self.channels_file, 'r', encoding='utf-8') as f:
+                self._set_channels_cache(json.load(f))
+        # 返回浅拷贝，调用方修改后需通过 _save_channels 写回
+        return [dict(channel) for channel in self._channels_cache]
     
     def _save_channels(self, channels: List[Dict]):
         """保存通知渠道"""
         with open(self.channels_file, 'w', encoding='utf-8') as f:
-            json.dump(channels, f, ensure_ascii=False, indent=2)
+            json.dump(channels, f, ensure_ascii=False, indent=2, default=str)
+        self._set_channels_cache(json.loads(json.dumps(channels, default=str)))
     
     def _load_preferences(self) -> List[Dict]:
         """加载通知偏好设置"""
@@ -55,8 +80,8 @@ class NotificationStorage:
     
     def get_channels(self) -> List[NotificationChannel]:
         """获取所有通知渠道"""
-        channels_data = self._load_channels()
-        return [NotificationChannel(**channel) for channel in channels_data]
+        self._load_channels()
+        return list(self._channel_models)
     
     def get_channel(self, channel_id: str) -> Optional[NotificationChannel]:
         """根据ID获取通知渠道"""
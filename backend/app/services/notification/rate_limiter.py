@@ -0,0 +1,68 @@
+import time
+import asyncio
+from typing import Dict, List, Tuple
+
+# 限流规则：(桶名称, 每秒补充的令牌数, 桶容量)
+RateLimit = Tuple[str, float, float]
+
+
+class TokenBucket:
+    """令牌桶限流器：每秒补充 rate 个令牌，最多积累 capacity 个（允许的突发数量）"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.waits = 0
+        self.overdrafts = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self, priority: bool = False):
+        """取一个令牌，没有令牌时等待补充；priority 时直接取走（允许透支），透支由之后的普通请求补回"""
+        if priority:
+            self._refill()
+            if self.tokens < 1:
+                self.overdrafts += 1
+            self.tokens -= 1
+            return
+        async with self._lock:
+            self._refill()
+            if self.tokens < 1:
+                self.waits += 1
+            # 等待期间可能被高优先级请求取走令牌，需要重新检查
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+class RateLimiterRegistry:
+    """按名称共享的令牌桶，同一个 Telegram 机器人的多个渠道共用全局桶"""
+
+    def __init__(self):
+        self._buckets: Dict[str, TokenBucket] = {}
+
+    def bucket(self, name: str, rate: float, capacity: float) -> TokenBucket:
+        bucket = self._buckets.get(name)
+        if bucket is None or bucket.rate != rate or bucket.capacity != capacity:
+            bucket = TokenBucket(rate, capacity)
+            self._buckets[name] = bucket
+        return bucket
+
+    async def acquire(self, limits: List[RateLimit], priority: bool = False):
+        """依次获取各个桶的令牌"""
+        for name, rate, capacity in limits:
+            await self.bucket(name, rate, capacity).acquire(priority)
+
+    def stats(self) -> Dict[str, Dict]:
+        return {
+            name: {"rate": bucket.rate, "capacity": bucket.capacity, "tokens": round(bucket.tokens, 2), "waits": bucket.waits,
+                   "overdrafts": bucket.overdrafts}
+            for name, bucket in self._buckets.items()
+        }
@@ -1,9 +1,19 @@
-import aiohttp
+import re
 import logging
-from .notification_service import NotificationProvider
+from app.services.http_client import http_client
+from .notification_provider import NotificationProvider
 
 logger = logging.getLogger(__name__)
 
+# 旧版 Markdown 中的特殊字符，告警消息和汇总中的类型名（如 system/cpu_high）、容器名需要转义
+_MARKDOWN_SPECIAL = re.compile(r"([_*`\[])")
+
+
+def escape_markdown(text: str) -> str:
+    """转义旧版 Markdown 特殊字符，使消息按原文显示"""
+    return _MARKDOWN_SPECIAL.sub(r"\\\1", text)
+
+
 class TelegramProvider(NotificationProvider):
     """Telegram通知提供者"""
     
@@ -19,6 +29,14 @@ class TelegramProvider(NotificationProvider):
         self.get_me_url = f"https://api.telegram.org/bot{token}/getMe"
         self.is_connected = False
     
+    def rate_limits(self):
+        """Telegram 限制：同一机器人全局约 30 条/秒，同一聊天约 1 条/秒"""
+        bot_id = self.token.split(":", 1)[0]
+        return [
+            (f"telegram:{bot_id}", 30.0, 30.0),
+            (f"telegram:{bot_id}:{self.chat_id}", 1.0, 1.0),
+        ]
+    
     async def verify_token(self) -> bool:
         """验证Telegram机器人token
         
@@ -26,20 +44,20 @@ class TelegramProvider(NotificationProvider):
             bool: token是否有效
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(self.get_me_url) as response:
-                    if response.status == 200:
-                        data = await response.json()
-                        if data.get("ok"):
-                            self.is_connected = True
-                            logger.info(f"Telegram机器人验证成功: {data.get('result', {}).get('username')}")
-                            return True
-                        else:
-                            logger.error(f"Telegram机器人验证失败: {data.get('description')}")
-                            return False
+            session = http_client.get_session()
+            async with session.get(self.get_me_url) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    if data.get("ok"):
+                        self.is_connected = True
+                        logger.info(f"Telegram机器人验证成功: {data.get('result', {}).get('username')}")
+                        return True
                     else:
-                        logger.error(f"Telegram API 响应错误: {response.status}")
+                        logger.error(f"Telegram机器人验证失败: {data.get('description')}")
                         return False
+                else:
+                    logger.error(f"Telegram API 响应错误: {response.status}")
+                    return False
         except Exception as e:
             logger.error(f"验证Telegram token时发生错误: {str(e)}")
             return False
@@ -69,20 +87,20 @@ class TelegramProvider(NotificationProvider):
             elif severity == "info":
                 prefix = "ℹ️ 信息: "
             
-            full_message = f"{prefix}{message}"
+            full_message = f"{prefix}{escape_markdown(message)}"
             
-            async with aiohttp.ClientSession() as session:
-                payload = {
-                    "chat_id": self.chat_id,
-                    "text": full_message,
-                    "parse_mode": "Markdown"
-                }
-                async with session.post(self.api_url, json=payload) as response:
-                    if response.status == 200:
-                        return True
-                    else:
-                        logger.error(f"Telegram API 响应错误: {response.status}")
-                        return False
+            session = http_client.get_session()
+            payload = {
+                "chat_id": self.chat_id,
+                "text": full_message,
+                "parse_mode": "Markdown"
+            }
+            async with session.post(self.api_url, json=payload) as response:
+                if response.status == 200:
+                    return True
+                else:
+                    logger.error(f"Telegram API 响应错误: {response.status}")
+                    return False
         except Exception as e:
             logger.error(f"发送Telegram通知时发生错误: {str(e)}")
             return False
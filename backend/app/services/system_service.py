@@ -1,6 +1,6 @@
 import psutil
 import platform
-import time
+import threading
 import logging
 from datetime import datetime, timedelta
 import os
@@ -106,63 +106,142 @@ def get_system_status():
     }
 
 
-def get_cpu_usage():
-    """获取 CPU 使用情况"""
-    total_usage = 0.0
-    per_core_usage = []
-    cpu_count = {"physical": 0, "logical": 0}
-
-    try:
-        if os.path.exists("/proc/stat"):
-            with open("/proc/stat", "r") as f:
-                lines1 = f.readlines()
-            time.sleep(0.1)
-            with open("/proc/stat", "r") as f:
-                lines2 = f.readlines()
-
-            for i, (line1, line2) in enumerate(zip(lines1, lines2)):
-                if line1.startswith("cpu"):
-                    parts1 = list(map(int, line1.split()[1:]))
-                    parts2 = list(map(int, line2.split()[1:]))
-                    total_diff = sum(parts2) - sum(parts1)
-                    idle_diff = parts2[3] - parts1[3]
-                    if total_diff > 0:
-                        usage = 100.0 * (1.0 - idle_diff / total_diff)
-                        if i == 0:
-                            total_usage = usage
-                        else:
-                            per_core_usage.append(usage)
-
-            with open("/proc/cpuinfo", "r") as f:
-                cpuinfo = f.read()
-                cpu_count = {
+class CpuSampler:
+    """CPU 使用率后台采样器
+
+    保存上一次 /proc/stat 快照，每次采样只读取一次 /proc/stat 并与上一次快照求差值，
+    调用方直接读取最近一次的计算结果，无需 sleep 等待。
+    """
+
+    def __init__(self, interval: float = 1.0):
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stop_event = threading.Event()
+        self._prev_snapshot = None
+        self._cpu_count = None
+        self._latest = {
+            "total_usage": 0.0,
+            "per_core_usage": [],
+            "cpu_count": {"physical": 0, "logical": 0},
+        }
+
+    def start(self):
+        """启动后台采样线程（重复调用无副作用）"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name="cpu-sampler", daemon=True)
+            self._thread.start()
+        logger.info("CPU sampler started")
+
+    def stop(self):
+        """停止后台采样线程"""
+        self._stop_event.set()
+
+    def _run(self):
+        """采样循环"""
+        while not self._stop_event.is_set():
+            self.sample()
+            self._stop_event.wait(self.interval)
+
+    def _read_proc_stat(self):
+        """读取 /proc/stat 中的 cpu 行，返回 [(busy+idle 总时间, idle 时间), ...]"""
+        snapshot = []
+        with open("/proc/stat", "r") as f:
+            for line in f:
+                if not line.startswith("cpu"):
+                    break
+                parts = list(map(int, line.split()[1:]))
+                snapshot.append((sum(parts), parts[3]))
+        return snapshot
+
+    def _get_cpu_count(self):
+        """获取 CPU 数量（只在首次调用时读取）"""
+        if self._cpu_count is None:
+            if os.path.exists("/proc/cpuinfo"):
+                with open("/proc/cpuinfo", "r") as f:
+                    cpuinfo = f.read()
+                self._cpu_count = {
                     "physical": len(set(re.findall(r"physical id\s*:\s*(\d+)", cpuinfo))),
                     "logical": len(re.findall(r"processor\s*:\s*(\d+)", cpuinfo)),
                 }
-        else:
-            total_usage = psutil.cpu_percent(interval=0.1)
-            per_core_usage = psutil.cpu_percent(interval=0, percpu=True)
-            cpu_count = {
-                "physical": psutil.cpu_count(logical=False),
-                "logical": psutil.cpu_count(logical=True),
-            }
-    except Exception as e:
-        logger.error(f"Error getting CPU usage: {e}")
+            else:
+                self._cpu_count = {
+                    "physical": psutil.cpu_count(logical=False),
+                    "logical": psutil.cpu_count(logical=True),
+                }
+        return self._cpu_count
+
+    def sample(self):
+        """采样一次并更新最新结果"""
+        total_usage = 0.0
+        per_core_usage = []
+        cpu_count = {"physical": 0, "logical": 0}
+
         try:
-            total_usage = psutil.cpu_percent(interval=0.1)
-            per_core_usage = psutil.cpu_percent(interval=0, percpu=True)
-            cpu_count = {
-                "physical": psutil.cpu_count(logical=False),
-                "logical": psutil.cpu_count(logical=True),
+            if os.path.exists("/proc/stat"):
+                snapshot = self._read_proc_stat()
+                # 首次采样时没有上一次快照，使用开机以来的累计值计算平均使用率
+                prev_snapshot = self._prev_snapshot or [(0, 0)] * len(snapshot)
+                self._prev_snapshot = snapshot
+
+                for i, ((total1, idle1), (total2, idle2)) in enumerate(zip(prev_snapshot, snapshot)):
+                    total_diff = total2 - total1
+                    idle_diff = idle2 - idle1
+                    usage = 100.0 * (1.0 - idle_diff / total_diff) if total_diff > 0 else 0.0
+                    if i == 0:
+                        total_usage = usage
+                    else:
+                        per_core_usage.append(usage)
+            else:
+                # interval=None 时 psutil 同样与上一次调用求差值，不会阻塞
+                total_usage = psutil.cpu_percent(interval=None)
+                per_core_usage = psutil.cpu_percent(interval=None, percpu=True)
+            cpu_count = self._get_cpu_count()
+        except Exception as e:
+            logger.error(f"Error getting CPU usage: {e}")
+            try:
+                total_usage = psutil.cpu_percent(interval=None)
+                per_core_usage = psutil.cpu_percent(interval=None, percpu=True)
+                cpu_count = {
+                    "physical": psutil.cpu_count(logical=False),
+                    "logical": psutil.cpu_count(logical=True),
+                }
+            except Exception as backup_e:
+                logger.error(f"Backup error: {backup_e}")
+
+        result = {
+            "total_usage": total_usage,
+            "per_core_usage": per_core_usage,
+            "cpu_count": cpu_count,
+        }
+        with self._lock:
+            self._latest = result
+        return result
+
+    def get_latest(self):
+        """获取最近一次采样结果"""
+        if self._thread is None:
+            # 首次调用时同步采样一次，保证立即返回有效数据
+            self.sample()
+            self.start()
+        with self._lock:
+            return {
+                "total_usage": self._latest["total_usage"],
+                "per_core_usage": list(self._latest["per_core_usage"]),
+                "cpu_count": dict(self._latest["cpu_count"]),
             }
-        except Exception as backup_e:
-            logger.error(f"Backup error: {backup_e}")
 
-    return {
-        "total_usage": total_usage,
-        "per_core_usage": per_core_usage,
-        "cpu_count": cpu_count,
-    }
+
+# 创建全局 CPU 采样器实例
+cpu_sampler = CpuSampler()
+
+
+def get_cpu_usage():
+    """获取 CPU 使用情况"""
+    return cpu_sampler.get_latest()
 
 
 def get_memory_usage():
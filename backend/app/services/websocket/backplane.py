@@ -0,0 +1,351 @@
+import os
+import json
+import uuid
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Optional, Set
+from urllib.parse import urlparse
+
+logger = logging.getLogger("nas-monitor.websocket")
+
+# 收到其他进程消息时的回调：(频道, 消息内容)
+Handler = Callable[[str, Dict], Awaitable[None]]
+
+
+class Backplane:
+    """进程间广播通道
+
+    每条消息封装为 {"origin", "channel", "payload"} 的 JSON，发给其他所有进程；
+    origin 为本进程的 node_id，收到自己发出的消息时忽略。默认实现只在本进程内，
+    不做任何传输（单进程部署）。
+    """
+
+    name = "local"
+
+    def __init__(self):
+        self.node_id = uuid.uuid4().hex[:12]
+        self._handler: Optional[Handler] = None
+        self.published = 0
+        self.received = 0
+        self.dropped = 0
+
+    async def start(self, handler: Handler):
+        self._handler = handler
+
+    async def publish(self, channel: str, payload: Dict):
+        """发给其他进程（本进程的投递由调用方完成）"""
+
+    async def close(self):
+        pass
+
+    def connected(self) -> bool:
+        return True
+
+    def _encode(self, channel: str, payload: Dict) -> bytes:
+        envelope = {"origin": self.node_id, "channel": channel, "payload": payload}
+        return json.dumps(envelope, ensure_ascii=False, separators=(",", ":"), default=str).encode("utf-8")
+
+    async def _dispatch(self, raw: bytes):
+        try:
+            envelope = json.loads(raw)
+        except ValueError:
+            logger.warning("忽略格式错误的广播消息")
+            return
+        if envelope.get("origin") == self.node_id or self._handler is None:
+            return
+        self.received += 1
+        try:
+            await self._handler(envelope.get("channel"), envelope.get("payload") or {})
+        except Exception as e:
+            logger.error(f"处理广播消息失败: {str(e)}")
+
+    def stats(self) -> Dict:
+        return {
+            "backend": self.name,
+            "node_id": self.node_id,
+            "connected": self.connected(),
+            "published": self.published,
+            "received": self.received,
+            "dropped": self.dropped,
+        }
+
+
+class UnixSocketBackplane(Backplane):
+    """基于 Unix 套接字的本机广播
+
+    一个进程（采集进程）监听套接字作为中心，其他进程连接到它；中心把任一连接发来的
+    消息转发给其他所有连接并在本进程投递。消息按行分隔。连接断开后按退避重连；
+    某个连接的发送缓冲区积压超过上限时丢弃发给它的消息，不阻塞其他进程。
+    """
+
+    name = "unix"
+
+    def __init__(self, path: str, serve: bool, max_buffer: int = 4 * 1024 * 1024):
+        super().__init__()
+        self.path = path
+        self.serve = serve
+        self.max_buffer = max_buffer
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._peers: Set[asyncio.StreamWriter] = set()
+        self._peer_tasks: Set[asyncio.Task] = set()
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        self.reconnects = 0
+
+    async def start(self, handler: Handler):
+        await super().start(handler)
+        if self.serve:
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+            self._server = await asyncio.start_unix_server(self._on_peer, path=self.path, limit=self.max_buffer)
+            logger.info(f"广播通道已在 {self.path} 监听")
+        else:
+            self._task = asyncio.get_running_loop().create_task(self._connect_loop())
+
+    def connected(self) -> bool:
+        return self._server is not None or self._writer is not None
+
+    def _write(self, writer: asyncio.StreamWriter, line: bytes):
+        if writer.is_closing() or writer.transport.get_write_buffer_size() > self.max_buffer:
+            self.dropped += 1
+            return
+        writer.write(line)
+
+    async def _on_peer(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._peers.add(writer)
+        self._peer_tasks.add(asyncio.current_task())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                for peer in list(self._peers):
+                    if peer is not writer:
+                        self._write(peer, line)
+                await self._dispatch(line)
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._peers.discard(writer)
+            self._peer_tasks.discard(asyncio.current_task())
+            writer.close()
+
+    async def _connect_loop(self):
+        delay = 1.0
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path, limit=self.max_buffer)
+                self._writer = writer
+                delay = 1.0
+                logger.info(f"已连接到广播通道 {self.path}")
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    await self._dispatch(line)
+            except asyncio.CancelledError:
+                raise
+            except (OSError, ValueError) as e:
+                logger.debug(f"连接广播通道失败: {e}")
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+                logger.warning(f"与广播通道 {self.path} 的连接已断开，正在重连")
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10.0)
+
+    async def publish(self, channel: str, payload: Dict):
+        line = self._encode(channel, payload) + b"\n"
+        if self.serve:
+            for peer in list(self._peers):
+                self._write(peer, line)
+        elif self._writer is not None:
+            self._write(self._writer, line)
+        else:
+            self.dropped += 1
+            return
+        self.published += 1
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        for peer in list(self._peers):
+            peer.close()
+        # 等待各连接的处理协程读到 EOF 后退出
+        if self._peer_tasks:
+            await asyncio.wait(list(self._peer_tasks), timeout=1.0)
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    def stats(self) -> Dict:
+        result = super().stats()
+        result.update({"path": self.path, "serve": self.serve, "peers": len(self._peers), "reconnects": self.reconnects})
+        return result
+
+
+def _resp_command(*args) -> bytes:
+    """编码 RESP 命令"""
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode("utf-8")
+        parts.append(f"${len(data)}\r\n".encode() + data + b"\r\n")
+    return b"".join(parts)
+
+
+async def _resp_read(reader: asyncio.StreamReader):
+    """读取一个 RESP 回复"""
+    line = await reader.readline()
+    if not line:
+        raise ConnectionError("connection closed")
+    prefix, rest = line[:1], line[1:-2]
+    if prefix == b"+":
+        return rest.decode()
+    if prefix == b"-":
+        raise RuntimeError(rest.decode())
+    if prefix == b":":
+        return int(rest)
+    if prefix == b"$":
+        length = int(rest)
+        if length < 0:
+            return None
+        return (await reader.readexactly(length + 2))[:-2]
+    if prefix == b"*":
+        length = int(rest)
+        if length < 0:
+            return None
+        return [await _resp_read(reader) for _ in range(length)]
+    raise ValueError(f"unexpected RESP reply: {line!r}")
+
+
+class RedisBackplane(Backplane):
+    """基于 Redis PUBLISH / SUBSCRIBE 的广播
+
+    直接使用 RESP 协议，不依赖 redis 库；兼容 Redis 协议的服务（KeyDB、本地替身等）
+    都可以使用。一个连接订阅频道，另一个连接发布消息，断开后按退避重连。
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str, channel: str = "nas-monitor:ws"):
+        super().__init__()
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.channel = channel
+        self._pub: Optional[tuple] = None
+        self._pub_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._subscribed = False
+        self.reconnects = 0
+
+    async def _open(self) -> tuple:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        if self.password:
+            writer.write(_resp_command("AUTH", self.password))
+            await _resp_read(reader)
+        return reader, writer
+
+    async def start(self, handler: Handler):
+        await super().start(handler)
+        self._task = asyncio.get_running_loop().create_task(self._subscribe_loop())
+
+    def connected(self) -> bool:
+        return self._subscribed
+
+    async def _subscribe_loop(self):
+        delay = 1.0
+        while True:
+            writer = None
+            try:
+                reader, writer = await self._open()
+                writer.write(_resp_command("SUBSCRIBE", self.channel))
+                await _resp_read(reader)
+                self._subscribed = True
+                delay = 1.0
+                logger.info(f"已订阅广播通道 {self.host}:{self.port}/{self.channel}")
+                while True:
+                    reply = await _resp_read(reader)
+                    if isinstance(reply, list) and len(reply) == 3 and reply[0] == b"message":
+                        await self._dispatch(reply[2])
+            except asyncio.CancelledError:
+                raise
+            except (OSError, ConnectionError, RuntimeError, ValueError, asyncio.IncompleteReadError) as e:
+                if self._subscribed:
+                    logger.warning(f"广播通道订阅已断开，正在重连: {e}")
+            finally:
+                self._subscribed = False
+                if writer is not None:
+                    writer.close()
+            self.reconnects += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 10.0)
+
+    async def publish(self, channel: str, payload: Dict):
+        data = self._encode(channel, payload)
+        async with self._pub_lock:
+            try:
+                if self._pub is None:
+                    self._pub = await self._open()
+                reader, writer = self._pub
+                writer.write(_resp_command("PUBLISH", self.channel, data))
+                await _resp_read(reader)
+                self.published += 1
+            except (OSError, ConnectionError, RuntimeError, ValueError, asyncio.IncompleteReadError) as e:
+                self.dropped += 1
+                logger.debug(f"发布广播消息失败: {e}")
+                if self._pub is not None:
+                    self._pub[1].close()
+                    self._pub = None
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+        if self._pub is not None:
+            self._pub[1].close()
+            self._pub = None
+
+    def stats(self) -> Dict:
+        result = super().stats()
+        result.update({"host": self.host, "port": self.port, "channel": self.channel, "reconnects": self.reconnects})
+        return result
+
+
+# 进程角色：all 采集并服务 WebSocket 客户端（单进程部署）；collector 只采集并发布；
+# worker 只服务客户端，不采集
+ROLES = ("all", "collector", "worker")
+
+
+def backplane_role() -> str:
+    role = os.getenv("WS_BACKPLANE_ROLE", "all").lower()
+    if role not in ROLES:
+        logger.warning(f"无效的 WS_BACKPLANE_ROLE {role}，使用 all")
+        role = "all"
+    return role
+
+
+def runs_background_jobs() -> bool:
+    """本进程是否运行告警检测、通知发送和保留策略等只能有一份的后台任务（worker 不运行）"""
+    return backplane_role() in ("all", "collector")
+
+
+def create_backplane(role: str) -> Backplane:
+    """根据环境变量 WS_BACKPLANE 创建广播通道（local / unix / redis）"""
+    kind = os.getenv("WS_BACKPLANE", "local").lower()
+    if kind == "unix":
+        path = os.getenv("WS_BACKPLANE_PATH", "/tmp/nas-monitor-ws.sock")
+        # 采集进程监听套接字，worker 连接到它
+        return UnixSocketBackplane(path, serve=role != "worker")
+    if kind == "redis":
+        return RedisBackplane(os.getenv("WS_BACKPLANE_URL", "redis://127.0.0.1:6379/0"))
+    if kind != "local":
+        logger.warning(f"未知的 WS_BACKPLANE {kind}，使用 local")
+    return Backplane()
@@ -0,0 +1,97 @@
+import copy
+import json
+import logging
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+logger = logging.getLogger("nas-monitor.websocket")
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:
+    cbor2 = None
+
+# 用于区分“没有变化”和“变为 null”
+UNCHANGED = object()
+
+
+def _diff(old: Any, new: Any, path: List[str], deleted: List[List[str]]) -> Any:
+    if isinstance(old, dict) and isinstance(new, dict):
+        patch = {}
+        for key, value in new.items():
+            if key not in old:
+                patch[key] = value
+                continue
+            diff = _diff(old[key], value, path + [key], deleted)
+            if diff is not UNCHANGED:
+                patch[key] = diff
+        for key in old:
+            if key not in new:
+                deleted.append(path + [key])
+        return patch if patch else UNCHANGED
+    if old == new and type(old) is type(new):
+        return UNCHANGED
+    return new
+
+
+def merge_diff(old: Any, new: Any) -> Tuple[Any, List[List[str]]]:
+    """计算从 old 到 new 的增量，返回 (补丁, 删除的键路径列表)
+
+    补丁与 JSON Merge Patch（RFC 7386）相同：字典逐键递归比较，列表和其他值发生变化时整体
+    替换；但 None 表示字段变为 null，被删除的字段不写入补丁，而是以键路径单独列出。
+    补丁没有变化时为 UNCHANGED。
+    """
+    deleted: List[List[str]] = []
+    return _diff(old, new, [], deleted), deleted
+
+
+def merge_apply(target: Any, patch: Any, deleted: Optional[List[List[str]]] = None) -> Any:
+    """先删除 deleted 中的键路径，再将补丁应用到 target（客户端的参考实现）"""
+    if deleted:
+        target = copy.deepcopy(target)
+        for path in deleted:
+            parent = target
+            for key in path[:-1]:
+                parent = parent.get(key) if isinstance(parent, dict) else None
+            if isinstance(parent, dict):
+                parent.pop(path[-1], None)
+    if patch is UNCHANGED:
+        return target
+    if not isinstance(patch, dict):
+        return patch
+    result = dict(target) if isinstance(target, dict) else {}
+    for key, value in patch.items():
+        result[key] = merge_apply(result.get(key), value)
+    return result
+
+
+def available_encodings() -> List[str]:
+    """当前环境支持的帧编码"""
+    encodings = ["json"]
+    if msgpack is not None:
+        encodings.append("msgpack")
+    if cbor2 is not None:
+        encodings.append("cbor")
+    return encodings
+
+
+def resolve_encoding(encoding: str) -> str:
+    """客户端请求的编码不可用时退回 JSON"""
+    encoding = (encoding or "json").lower()
+    if encoding in available_encodings():
+        return encoding
+    logger.warning(f"WebSocket encoding {encoding} not available, falling back to json")
+    return "json"
+
+
+def encode(message: Dict, encoding: str = "json") -> Union[str, bytes]:
+    """编码一条消息：json 为文本帧，msgpack / cbor 为二进制帧"""
+    if encoding == "msgpack":
+        return msgpack.packb(message, default=str, use_bin_type=True)
+    if encoding == "cbor":
+        return cbor2.dumps(message, default=lambda encoder, value: encoder.encode(str(value)))
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"), default=str)
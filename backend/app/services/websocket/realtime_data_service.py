@@ -1,79 +1,213 @@
+import time
 import asyncio
 import logging
-from app.services.system_service import get_cpu_usage, get_memory_usage, get_disk_usage
-from app.services.network_service import get_network_stats
-from app.services.io_service import get_io_stats
-from app.services.docker_service import get_containers
-from app.services.websocket.websocket_service import send_realtime_data
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from app.config import env_number
+from app.services.metrics_cache import metrics_cache
+from app.services.websocket.websocket_service import bus, send_realtime_data
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-async def send_system_data():
-    """发送系统数据"""
-    try:
-        cpu_usage = get_cpu_usage()
-        memory_usage = get_memory_usage()
-        disk_usage = get_disk_usage()
-        
-        system_data = {
-            "cpu": cpu_usage,
-            "memory": memory_usage,
-            "disk": disk_usage
+# 各主题默认采集间隔（秒），可通过环境变量 REALTIME_INTERVAL_<TOPIC> 覆盖
+DEFAULT_INTERVALS = {
+    "system": 1.0,
+    "network": 1.0,
+    "io": 1.0,
+    "docker": 2.0,
+}
+
+
+class RealtimeTopic:
+    """一个实时推送主题：采集函数、采集间隔和当前的采集任务"""
+
+    def __init__(self, name: str, collector: Callable[[], Awaitable[Any]], interval: float):
+        self.name = name
+        self.collector = collector
+        self.interval = interval
+        self.next_run: Optional[float] = None
+        self.task: Optional[asyncio.Task] = None
+        self.collections = 0
+        self.idle_ticks = 0
+        self.overruns = 0
+        self.errors = 0
+        self.last_duration = 0.0
+
+    def stats(self) -> Dict:
+        return {
+            "interval": self.interval,
+            "demand_interval": bus.demand_interval(self.name, self.interval),
+            "collections": self.collections,
+            "idle_ticks": self.idle_ticks,
+            "overruns": self.overruns,
+            "errors": self.errors,
+            "last_duration": round(self.last_duration, 4),
+            "running": self.task is not None and not self.task.done(),
         }
-        
-        await send_realtime_data("system", system_data)
-    except Exception as e:
-        logger.error(f"发送系统数据失败: {str(e)}")
 
-async def send_network_data():
-    """发送网络数据"""
-    try:
-        network_stats = get_network_stats()
-        await send_realtime_data("network", network_stats)
-    except Exception as e:
-        logger.error(f"发送网络数据失败: {str(e)}")
 
-async def send_io_data():
-    """发送IO数据"""
-    try:
-        io_stats = get_io_stats()
-        await send_realtime_data("io", io_stats)
-    except Exception as e:
-        logger.error(f"发送IO数据失败: {str(e)}")
+async def collect_system_data() -> Dict:
+    """采集系统数据"""
+    cpu_usage, memory_usage, disk_usage = await asyncio.gather(
+        metrics_cache.aget("cpu"),
+        metrics_cache.aget("memory"),
+        metrics_cache.aget("disk")
+    )
+    return {
+        "cpu": cpu_usage,
+        "memory": memory_usage,
+        "disk": disk_usage
+    }
+
+async def collect_network_data() -> Any:
+    """采集网络数据"""
+    return await metrics_cache.aget("network")
+
+async def collect_io_data() -> Dict:
+    """采集IO数据"""
+    disk_io, system_io = await asyncio.gather(
+        metrics_cache.aget("disk_io"),
+        metrics_cache.aget("system_io")
+    )
+    return {
+        "disk": disk_io,
+        "system": system_io
+    }
+
+async def collect_docker_data() -> Dict:
+    """采集Docker数据"""
+    return {"containers": await metrics_cache.aget("containers")}
+
+
+def _topic_interval(name: str) -> float:
+    return max(env_number(f"REALTIME_INTERVAL_{name.upper()}", DEFAULT_INTERVALS.get(name, 1.0), float), 0.1)
+
 
-async def send_docker_data():
-    """发送Docker数据"""
+# 实时推送主题
+realtime_topics: Dict[str, RealtimeTopic] = {
+    name: RealtimeTopic(name, collector, _topic_interval(name))
+    for name, collector in (
+        ("system", collect_system_data),
+        ("network", collect_network_data),
+        ("io", collect_io_data),
+        ("docker", collect_docker_data),
+    )
+}
+
+
+# 判断主题是否到期时容许的浮点误差（秒）
+SCHEDULE_EPSILON = 1e-6
+
+# 调度器状态
+_scheduler = {"tick": None, "ticks": 0, "lagged_ticks": 0}
+
+
+async def publish_topic(topic: RealtimeTopic, scheduled_at: Optional[float] = None):
+    """采集并推送一个主题，scheduled_at 为所在节拍的计划时间（time.time()）"""
+    start = time.monotonic()
     try:
-        containers = get_containers()
-        await send_realtime_data("docker", {"containers": containers})
+        data = await topic.collector()
+        topic.collections += 1
+        await send_realtime_data(topic.name, data, scheduled_at)
     except Exception as e:
-        logger.error(f"发送Docker数据失败: {str(e)}")
+        topic.errors += 1
+        logger.error(f"发送{topic.name}数据失败: {str(e)}")
+    finally:
+        topic.last_duration = time.monotonic() - start
+
+def schedule_topic(topic: RealtimeTopic, tick_time: float):
+    """在一个调度节拍上判断主题是否到期，到期时在独立任务中采集
+
+    上一次采集还没有完成（超出了一个采集间隔的预算）时跳过本次并记录，不等待它。
+    """
+    interval = bus.demand_interval(topic.name, topic.interval)
+    if interval is None:
+        topic.idle_ticks += 1
+        topic.next_run = None
+        return
+    # 计划时间按间隔等步长推进，间隔不是节拍的整数倍时在到期后的第一个节拍采集，平均间隔不变
+    if topic.next_run is not None and tick_time < topic.next_run - SCHEDULE_EPSILON:
+        return
+    # 按固定间隔推进，不受采集耗时影响；落后超过一个间隔时从当前节拍重新开始
+    if topic.next_run is None or topic.next_run + interval <= tick_time:
+        topic.next_run = tick_time + interval
+    else:
+        topic.next_run += interval
+    if topic.task is not None and not topic.task.done():
+        topic.overruns += 1
+        logger.warning(f"主题 {topic.name} 的上一次采集仍未完成（已超过 {interval} 秒），跳过本次推送")
+        return
+    loop = asyncio.get_running_loop()
+    # 节拍时间换算为墙上时钟，跨进程判断客户端推送是否到期
+    scheduled_at = time.time() - (loop.time() - tick_time)
+    topic.task = loop.create_task(publish_topic(topic, scheduled_at))
 
 async def realtime_data_task():
-    """实时数据推送任务"""
+    """实时数据推送任务：按固定节拍对齐调度各主题，事件循环延迟超过一个节拍时跳过错过的节拍"""
     logger.info("启动实时数据推送任务")
-    
+    loop = asyncio.get_running_loop()
+    tick = min(topic.interval for topic in realtime_topics.values())
+    _scheduler["tick"] = tick
+    start = loop.time()
+    index = 0
+
     while True:
-        try:
-            # 发送系统数据
-            await send_system_data()
-            # 发送网络数据
-            await send_network_data()
-            # 发送IO数据
-            await send_io_data()
-            # 发送Docker数据
-            await send_docker_data()
-        except Exception as e:
-            logger.error(f"实时数据推送任务失败: {str(e)}")
-        
-        # 等待1秒后再次发送
-        await asyncio.sleep(1)
+        tick_time = start + index * tick
+        for topic in realtime_topics.values():
+            try:
+                schedule_topic(topic, tick_time)
+            except Exception as e:
+                logger.error(f"实时数据推送任务失败: {str(e)}")
+        _scheduler["ticks"] += 1
+
+        index += 1
+        now = loop.time()
+        if start + index * tick <= now:
+            missed = int((now - (start + index * tick)) // tick) + 1
+            _scheduler["lagged_ticks"] += missed
+            index += missed
+        await asyncio.sleep(start + index * tick - now)
+
+def snapshot_max_age() -> Dict[str, float]:
+    """订阅时缓存数据被视为新鲜的最长时间：两个采集间隔"""
+    return {name: topic.interval * 2 for name, topic in realtime_topics.items()}
+
+def request_collection(names: List[str]):
+    """订阅时没有可用快照的主题立即采集一次，不等下一个节拍
+
+    本进程不采集（worker）时请求 collector 进程采集。
+    """
+    names = [name for name in names if name in realtime_topics]
+    if not names:
+        return
+    if not bus.collects:
+        bus.announce_demand()
+        bus.publish_soon("collect", {"topics": names})
+        return
+    for name in names:
+        topic = realtime_topics.get(name)
+        if topic is None or (topic.task is not None and not topic.task.done()):
+            continue
+        topic.task = asyncio.get_running_loop().create_task(publish_topic(topic))
+
+async def _on_collect(channel: str, payload: Dict):
+    if bus.collects:
+        request_collection(payload.get("topics", []))
+
+bus.on("collect", _on_collect)
+
+def realtime_stats() -> Dict:
+    """各主题的采集状态"""
+    return {
+        "scheduler": dict(_scheduler),
+        "backplane": bus.stats(),
+        "topics": {name: topic.stats() for name, topic in realtime_topics.items()},
+    }
 
 # 启动实时数据推送任务
-def start_realtime_data_task():
-    """启动实时数据推送任务"""
-    loop = asyncio.get_event_loop()
-    loop.create_task(realtime_data_task())
+def start_realtime_data_task() -> asyncio.Task:
+    """在当前运行的事件循环中启动实时数据推送任务（在应用启动钩子中调用）"""
+    task = asyncio.get_running_loop().create_task(realtime_data_task())
     logger.info("实时数据推送任务已启动")
+    return task
@@ -1,96 +1,519 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from typing import Dict, List, Optional
+from collections import OrderedDict, deque
+from typing import Any, Dict, List, Optional, Set, Union
 import json
 import asyncio
+import time
+import itertools
 import logging
+from app.config import env_number
+from app.services.websocket.frame_codec import UNCHANGED, encode, merge_diff, resolve_encoding
+from app.services.websocket.backplane import Backplane, Handler, backplane_role, create_backplane
 
 # 配置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+
+Frame = Union[str, bytes]
+
+# 每个主题保留最近若干帧的数据，降低推送频率的客户端也能收到相对上次所收帧的增量
+TOPIC_HISTORY = 16
+# 客户端可请求的最长推送间隔（秒）
+MAX_CLIENT_INTERVAL = 3600.0
+# 保留最近消息、订阅时可回放的广播主题
+REPLAY_TOPICS = ("alerts",)
+# 判断帧是否到期时容许的浮点误差（秒）
+DUE_EPSILON = 1e-3
+
+
+class ClientConnection:
+    """单个WebSocket客户端：订阅、协议选项和有界发送队列（同一主题的实时数据只保留最新一帧）"""
+
+    def __init__(self, websocket: WebSocket, client_id: str, max_queue: int):
+        self.websocket = websocket
+        self.client_id = client_id
+        self.max_queue = max_queue
+        self.topics: Set[str] = set()
+        # {"mode": "full" | "delta", "encoding": "json" | "msgpack" | "cbor"}
+        self.options: Dict[str, str] = {"mode": "full", "encoding": "json"}
+        # 各主题最后放入队列的序号，用于判断能否发送增量
+        self.queued_seq: Dict[str, int] = {}
+        # 客户端请求的推送间隔（秒），0 表示跟随主题的采集间隔；intervals 按主题覆盖
+        self.interval = 0.0
+        self.intervals: Dict[str, float] = {}
+        # 各主题下一次推送的计划采集时间，按请求的间隔等步长推进
+        self.next_due: Dict[str, float] = {}
+        # key: 主题（可合并）或递增序号（不可合并），value: (帧, 帧类型, 主题)
+        self._outbox: "OrderedDict[Any, tuple]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self._counter = itertools.count()
+        self.task: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+
+    def has_pending(self, topic: str) -> bool:
+        return topic in self._outbox
+
+    def interval_for(self, topic: str) -> float:
+        return self.intervals.get(topic, self.interval)
+
+    def is_due(self, topic: str, at: float) -> bool:
+        """按客户端请求的间隔判断计划在 at 时刻采集的帧是否推送"""
+        due = self.next_due.get(topic)
+        return not self.interval_for(topic) or due is None or at >= due - DUE_EPSILON
+
+    def mark_delivered(self, topic: str, at: float):
+        """推送后按请求的间隔推进下一次推送时间；间隔不是采集间隔的整数倍时平均间隔仍与请求一致"""
+        interval = self.interval_for(topic)
+        due = self.next_due.get(topic)
+        if not interval:
+            self.next_due.pop(topic, None)
+        elif due is None or due + interval <= at:
+            self.next_due[topic] = at + interval
+        else:
+            self.next_due[topic] = due + interval
+
+    def enqueue(self, frame: Frame, kind: str = "other", topic: Optional[str] = None):
+        """放入发送队列，不等待发送；指定 topic 时与队列中同一主题未发送的帧合并（保留原来的位置）"""
+        if topic is not None and topic in self._outbox:
+            self._outbox[topic] = (frame, kind, topic)
+            self.coalesced += 1
+        else:
+            if len(self._outbox) >= self.max_queue:
+                _, (_, _, dropped_topic) = self._outbox.popitem(last=False)
+                self.dropped += 1
+                if dropped_topic is not None:
+                    # 漏掉一帧，下一帧需要发送完整数据
+                    self.queued_seq.pop(dropped_topic, None)
+            key = topic if topic is not None else next(self._counter)
+            self._outbox[key] = (frame, kind, topic)
+        self._ready.set()
+
+    async def run(self, bytes_sent: Dict[str, int], send_timeout: float):
+        """发送协程：按顺序取出帧并发送，发送失败或超时时抛出异常"""
+        while True:
+            if not self._outbox:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            _, (frame, kind, _) = self._outbox.popitem(last=False)
+            if isinstance(frame, bytes):
+                await asyncio.wait_for(self.websocket.send_bytes(frame), send_timeout)
+            else:
+                await asyncio.wait_for(self.websocket.send_text(frame), send_timeout)
+            self.sent += 1
+            bytes_sent[kind] += len(frame)
+
+    def stats(self) -> Dict:
+        return {
+            "topics": sorted(self.topics),
+            "options": dict(self.options),
+            "interval": self.interval,
+            "intervals": dict(self.intervals),
+            "queued": len(self._outbox),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+        }
+
+
 class ConnectionManager:
-    """WebSocket连接管理器"""
-    
+    """WebSocket连接管理器
+
+    维护 主题 -> 订阅客户端 的索引，每次广播只遍历订阅者；每条消息按编码只序列化
+    一次，放入各客户端的发送队列后立即返回，由各客户端的发送协程并发写出。
+    """
+
     def __init__(self):
-        # 存储活动的WebSocket连接
-        # key: client_id, value: WebSocket
-        self.active_connections: Dict[str, WebSocket] = {}
-        # 存储客户端订阅的主题
-        # key: client_id, value: List[str]
-        self.subscriptions: Dict[str, List[str]] = {}
-    
-    async def connect(self, websocket: WebSocket, client_id: str):
+        # 活动的客户端
+        # key: client_id, value: ClientConnection
+        self.clients: Dict[str, ClientConnection] = {}
+        # 主题订阅索引
+        # key: topic, value: Set[client_id]
+        self.topic_subscribers: Dict[str, Set[str]] = {}
+        # 各主题最后发布的序号、时间和最近几帧的数据（最后一帧即订阅时推送的快照）
+        # key: topic, value: {"seq": int, "timestamp": float, "published_at": float, "history": deque[(seq, data)]}
+        self.topic_state: Dict[str, Dict] = {}
+        # 可回放主题最近的广播消息
+        # key: topic, value: deque[Dict]
+        self.recent_messages: Dict[str, deque] = {}
+        # 按帧类型统计发送的字节数
+        self.bytes_sent: Dict[str, int] = {"full": 0, "delta": 0, "other": 0}
+        self.client_queue_size = env_number("WS_CLIENT_QUEUE_SIZE", 100, int)
+        self.send_timeout = env_number("WS_SEND_TIMEOUT", 10.0, float)
+        self.replay_size = env_number("WS_ALERT_HISTORY", 50, int)
+
+    async def connect(self, websocket: WebSocket, client_id: str, mode: str = "full",
+                      encoding: str = "json") -> ClientConnection:
         """接受WebSocket连接"""
         await websocket.accept()
-        self.active_connections[client_id] = websocket
-        self.subscriptions[client_id] = []
+        if client_id in self.clients:
+            # 同一 client_id 重新连接时替换旧连接
+            self.disconnect(client_id)
+        client = ClientConnection(websocket, client_id, self.client_queue_size)
+        self.clients[client_id] = client
+        self.configure(client_id, mode, encoding)
+        client.task = asyncio.get_running_loop().create_task(self._sender(client))
         logger.info(f"客户端 {client_id} 已连接")
-    
-    def disconnect(self, client_id: str):
-        """断开WebSocket连接"""
-        if client_id in self.active_connections:
-            del self.active_connections[client_id]
-            del self.subscriptions[client_id]
-            logger.info(f"客户端 {client_id} 已断开连接")
-    
+        return client
+
+    async def _sender(self, client: ClientConnection):
+        try:
+            await client.run(self.bytes_sent, self.send_timeout)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 发送失败或超时（慢客户端），关闭连接，客户端可以重连
+            logger.warning(f"向客户端 {client.client_id} 发送消息失败，关闭连接: {str(e) or type(e).__name__}")
+            try:
+                await client.websocket.close(code=1013)
+            except Exception:
+                pass
+            self.disconnect(client.client_id, client)
+
+    @staticmethod
+    def _parse_interval(value) -> float:
+        try:
+            return min(max(float(value), 0.0), MAX_CLIENT_INTERVAL)
+        except (TypeError, ValueError):
+            return 0.0
+
+    def configure(self, client_id: str, mode: Optional[str] = None, encoding: Optional[str] = None,
+                  interval: Optional[float] = None, intervals: Optional[Dict[str, float]] = None) -> Dict:
+        """设置客户端的推送模式（full / delta）、帧编码（json / msgpack / cbor）和推送间隔（0 表示跟随采集间隔）"""
+        client = self.clients.get(client_id)
+        if client is None:
+            return {}
+        if mode is not None or encoding is not None:
+            if mode is not None:
+                client.options["mode"] = "delta" if mode == "delta" else "full"
+            if encoding is not None:
+                client.options["encoding"] = resolve_encoding(encoding)
+            # 切换模式或编码后从完整快照重新开始
+            client.queued_seq = {}
+        if interval is not None:
+            client.interval = self._parse_interval(interval)
+        if isinstance(intervals, dict):
+            for topic, value in intervals.items():
+                if value is None:
+                    client.intervals.pop(topic, None)
+                else:
+                    client.intervals[topic] = self._parse_interval(value)
+        return {**client.options, "interval": client.interval, "intervals": dict(client.intervals)}
+
+    def disconnect(self, client_id: str, client: Optional[ClientConnection] = None):
+        """断开WebSocket连接；指定 client 时只有当前登记的连接是它才移除，避免误删同一 client_id 的新连接"""
+        current = self.clients.get(client_id)
+        if current is None or (client is not None and current is not client):
+            return
+        del self.clients[client_id]
+        for topic in current.topics:
+            subscribers = self.topic_subscribers.get(topic)
+            if subscribers is not None:
+                subscribers.discard(client_id)
+                if not subscribers:
+                    del self.topic_subscribers[topic]
+        if current.task is not None and current.task is not asyncio.current_task():
+            current.task.cancel()
+        logger.info(f"客户端 {client_id} 已断开连接")
+
+    def send_control(self, client_id: str, message: Dict):
+        """发送控制消息（始终为 JSON 文本帧），与数据帧共用发送队列以保证顺序"""
+        client = self.clients.get(client_id)
+        if client is not None:
+            client.enqueue(encode(message, "json"))
+
     async def send_personal_message(self, message: Dict, client_id: str):
         """向特定客户端发送消息"""
-        if client_id in self.active_connections:
+        client = self.clients.get(client_id)
+        if client is None:
+            return False
+        try:
+            client.enqueue(encode(message, client.options["encoding"]))
+            return True
+        except Exception as e:
+            logger.error(f"向客户端 {client_id} 发送消息失败: {str(e)}")
+            return False
+
+    def _subscribers(self, topic: Optional[str]) -> List[ClientConnection]:
+        if topic is None:
+            return list(self.clients.values())
+        return [self.clients[client_id] for client_id in self.topic_subscribers.get(topic, ())
+                if client_id in self.clients]
+
+    def has_subscribers(self, topic: str) -> bool:
+        return bool(self.topic_subscribers.get(topic))
+
+    def demand_interval(self, topic: str, base_interval: float) -> Optional[float]:
+        """主题实际需要的采集间隔
+
+        没有订阅者时返回 None（无需采集）；否则为主题默认间隔和订阅者请求的最短间隔中
+        较大的一个，所有订阅者都降低频率时采集也随之降低。
+        """
+        clients = self._subscribers(topic)
+        if not clients:
+            return None
+        return max(base_interval, min(client.interval_for(topic) for client in clients))
+
+    async def broadcast(self, message: Dict, topic: str = None):
+        """广播消息给所有订阅了特定主题的客户端（topic 为 None 时发给所有客户端）"""
+        if topic in REPLAY_TOPICS and self.replay_size > 0:
+            self.recent_messages.setdefault(topic, deque(maxlen=self.replay_size)).append(message)
+        # 每种编码只序列化一次
+        frames: Dict[str, Frame] = {}
+        for client in self._subscribers(topic):
+            encoding = client.options["encoding"]
             try:
-                await self.active_connections[client_id].send_json(message)
-                return True
+                if encoding not in frames:
+                    frames[encoding] = encode(message, encoding)
             except Exception as e:
-                logger.error(f"向客户端 {client_id} 发送消息失败: {str(e)}")
-                return False
-        return False
-    
-    async def broadcast(self, message: Dict, topic: str = None):
-        """广播消息给所有订阅了特定主题的客户端"""
-        disconnected_clients = []
-        
-        for client_id, websocket in self.active_connections.items():
-            # 如果指定了主题，只发送给订阅了该主题的客户端
-            if topic and topic not in self.subscriptions.get(client_id, []):
+                logger.error(f"编码广播消息失败: {str(e)}")
+                return
+            client.enqueue(frames[encoding])
+
+    async def publish(self, topic: str, data: Dict, at: Optional[float] = None):
+        """发布主题的实时数据：full 模式发送完整数据，delta 模式发送相对客户端上次所收帧的 JSON Merge Patch"""
+        state = self.topic_state.setdefault(topic, {"seq": 0, "history": deque(maxlen=TOPIC_HISTORY)})
+        previous = dict(state["history"])
+        seq = state["seq"] + 1
+        timestamp = asyncio.get_event_loop().time()
+        now = time.monotonic()
+        # 按计划采集时间判断客户端是否到期，不受采集耗时的抖动影响
+        at = time.time() if at is None else at
+        state["seq"] = seq
+        state["timestamp"] = timestamp
+        state["published_at"] = now
+        state["history"].append((seq, data))
+
+        patches: Dict[int, tuple] = {}
+        frames: Dict[tuple, Frame] = {}
+        for client in self._subscribers(topic):
+            if not client.is_due(topic, at):
                 continue
-            
+            # 队列中还有未发送的帧时，合并后的帧必须是完整数据
+            base = client.queued_seq.get(topic)
+            delta = client.options["mode"] == "delta" and not client.has_pending(topic) and base in previous
+            kind = "delta" if delta else "full"
+            key = (kind, base if delta else None, client.options["encoding"])
             try:
-                await websocket.send_json(message)
+                if key not in frames:
+                    if delta:
+                        if base not in patches:
+                            patches[base] = merge_diff(previous[base], data)
+                        patch, deleted = patches[base]
+                        message = {"type": "realtime_delta", "topic": topic, "patch": {} if patch is UNCHANGED else patch,
+                                   "deleted": deleted, "seq": seq, "base": base, "timestamp": timestamp}
+                    else:
+                        message = {"type": "realtime_data", "topic": topic, "data": data, "seq": seq, "timestamp": timestamp}
+                    frames[key] = encode(message, client.options["encoding"])
             except Exception as e:
-                logger.error(f"向客户端 {client_id} 广播消息失败: {str(e)}")
-                disconnected_clients.append(client_id)
-        
-        # 清理断开的连接
-        for client_id in disconnected_clients:
-            self.disconnect(client_id)
-    
+                logger.error(f"编码 {topic} 数据失败: {str(e)}")
+                return
+            client.queued_seq[topic] = seq
+            client.mark_delivered(topic, at)
+            client.enqueue(frames[key], kind, topic)
+
+    def send_snapshot(self, client_id: str, topics: List[str], max_age: Optional[Dict[str, float]] = None) -> List[str]:
+        """把主题最后发布的数据作为完整快照立即发给刚订阅的客户端
+
+        快照帧与普通 realtime_data 帧相同，另带 cached=true 和 age（秒）；之后的增量基于它。
+        返回没有缓存或缓存已超过 max_age、需要立即采集的主题。
+        """
+        client = self.clients.get(client_id)
+        if client is None:
+            return []
+        max_age = max_age or {}
+        now = time.monotonic()
+        missing = []
+        for topic in topics:
+            state = self.topic_state.get(topic)
+            if topic not in client.topics or not state or not state["history"]:
+                missing.append(topic)
+                continue
+            seq, data = state["history"][-1]
+            age = now - state["published_at"]
+            if topic in max_age and age > max_age[topic]:
+                missing.append(topic)
+            message = {"type": "realtime_data", "topic": topic, "data": data, "seq": seq,
+                       "timestamp": state["timestamp"], "cached": True, "age": round(age, 3)}
+            try:
+                frame = encode(message, client.options["encoding"])
+            except Exception as e:
+                logger.error(f"编码 {topic} 快照失败: {str(e)}")
+                continue
+            client.queued_seq[topic] = seq
+            client.mark_delivered(topic, time.time())
+            client.enqueue(frame, "full", topic)
+        return missing
+
+    def replay(self, client_id: str, topic: str, count: int) -> int:
+        """向客户端回放主题最近的 count 条广播消息（带 replay=true），返回回放条数"""
+        client = self.clients.get(client_id)
+        messages = self.recent_messages.get(topic)
+        if client is None or not messages or count <= 0 or topic not in client.topics:
+            return 0
+        replayed = list(messages)[-count:]
+        for message in replayed:
+            try:
+                client.enqueue(encode({**message, "replay": True}, client.options["encoding"]))
+            except Exception as e:
+                logger.error(f"回放 {topic} 消息失败: {str(e)}")
+        return len(replayed)
+
     def subscribe(self, client_id: str, topics: List[str]):
         """订阅主题"""
-        if client_id in self.subscriptions:
+        client = self.clients.get(client_id)
+        if client is not None:
             for topic in topics:
-                if topic not in self.subscriptions[client_id]:
-                    self.subscriptions[client_id].append(topic)
+                client.topics.add(topic)
+                self.topic_subscribers.setdefault(topic, set()).add(client_id)
+                # 重新订阅时从完整快照开始
+                client.queued_seq.pop(topic, None)
+                client.next_due.pop(topic, None)
             logger.info(f"客户端 {client_id} 已订阅主题: {topics}")
-    
+
     def unsubscribe(self, client_id: str, topics: List[str]):
         """取消订阅主题"""
-        if client_id in self.subscriptions:
+        client = self.clients.get(client_id)
+        if client is not None:
             for topic in topics:
-                if topic in self.subscriptions[client_id]:
-                    self.subscriptions[client_id].remove(topic)
+                client.topics.discard(topic)
+                subscribers = self.topic_subscribers.get(topic)
+                if subscribers is not None:
+                    subscribers.discard(client_id)
+                    if not subscribers:
+                        del self.topic_subscribers[topic]
             logger.info(f"客户端 {client_id} 已取消订阅主题: {topics}")
 
+    def stats(self) -> Dict:
+        """连接和流量统计"""
+        return {
+            "connections": len(self.clients),
+            "modes": {mode: sum(1 for c in self.clients.values() if c.options["mode"] == mode) for mode in ("full", "delta")},
+            "bytes_sent": dict(self.bytes_sent),
+            "topics": {topic: {"seq": state["seq"], "subscribers": len(self.topic_subscribers.get(topic, ()))}
+                       for topic, state in self.topic_state.items()},
+            "clients": {client_id: client.stats() for client_id, client in self.clients.items()},
+        }
+
+class BroadcastBus:
+    """通过 backplane 把实时数据、广播消息和跨进程请求分发到本进程和其他进程"""
+
+    def __init__(self, backplane: Backplane, role: str):
+        self.backplane = backplane
+        self.role = role
+        self.demand_period = env_number("WS_DEMAND_PERIOD", 2.0, float)
+        # 其他进程上报的订阅需求
+        # key: node_id, value: (过期时间, {topic: interval})
+        self.remote_demand: Dict[str, tuple] = {}
+        # 频道：realtime、broadcast、demand（worker 上报的订阅需求），其他频道（collect、detect、
+        # alarm_storage）由各服务用 on() 注册，只在 collector（或 all）进程中处理
+        self._handlers: Dict[str, Handler] = {
+            "realtime": self._on_realtime,
+            "broadcast": self._on_broadcast,
+            "demand": self._on_demand,
+        }
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def collects(self) -> bool:
+        """本进程是否运行采集任务"""
+        return self.role != "worker"
+
+    def on(self, channel: str, handler: Handler):
+        """注册频道处理函数（本进程和其他进程发布的消息都会调用）"""
+        self._handlers[channel] = handler
+
+    async def start(self):
+        await self.backplane.start(self._dispatch)
+        if self.role == "worker" and self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._announce_loop())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        await self.backplane.close()
+
+    async def _dispatch(self, channel: str, payload: Dict):
+        handler = self._handlers.get(channel)
+        if handler is not None:
+            await handler(channel, payload)
+
+    async def publish(self, channel: str, payload: Dict):
+        """投递给本进程并发布给其他进程"""
+        await self._dispatch(channel, payload)
+        await self.backplane.publish(channel, payload)
+
+    def publish_soon(self, channel: str, payload: Dict):
+        """在同步代码中发布（不等待）"""
+        asyncio.get_running_loop().create_task(self.publish(channel, payload))
+
+    async def _on_realtime(self, channel: str, payload: Dict):
+        await manager.publish(payload["topic"], payload["data"], payload.get("at"))
+
+    async def _on_broadcast(self, channel: str, payload: Dict):
+        await manager.broadcast(payload["message"], payload.get("topic"))
+
+    async def _on_demand(self, channel: str, payload: Dict):
+        if payload.get("node") == self.backplane.node_id:
+            return
+        self.remote_demand[payload["node"]] = (time.monotonic() + payload.get("ttl", 10.0), payload.get("topics", {}))
+
+    def local_demand(self) -> Dict[str, float]:
+        """本进程各主题订阅者请求的最短推送间隔"""
+        return {topic: manager.demand_interval(topic, 0.0) for topic in list(manager.topic_subscribers)
+                if manager.has_subscribers(topic)}
+
+    def announce_demand(self):
+        """立即上报本进程的订阅需求"""
+        self.publish_soon("demand", {
+            "node": self.backplane.node_id,
+            "topics": self.local_demand(),
+            "ttl": self.demand_period * 3,
+        })
+
+    async def _announce_loop(self):
+        while True:
+            try:
+                self.announce_demand()
+            except Exception as e:
+                logger.error(f"上报订阅需求失败: {str(e)}")
+            await asyncio.sleep(self.demand_period)
+
+    def demand_interval(self, topic: str, base_interval: float) -> Optional[float]:
+        """合并本进程和其他进程的订阅需求，返回主题需要的采集间隔（无人订阅时为 None）"""
+        intervals = []
+        local = manager.demand_interval(topic, base_interval)
+        if local is not None:
+            intervals.append(local)
+        now = time.monotonic()
+        for node, (expires_at, topics) in list(self.remote_demand.items()):
+            if expires_at < now:
+                del self.remote_demand[node]
+            elif topic in topics:
+                intervals.append(max(base_interval, topics[topic]))
+        return min(intervals) if intervals else None
+
+    def stats(self) -> Dict:
+        return {
+            "role": self.role,
+            **self.backplane.stats(),
+            "remote_nodes": len(self.remote_demand),
+        }
+
 # 创建全局连接管理器实例
 manager = ConnectionManager()
 
-async def send_realtime_data(topic: str, data: Dict):
-    """发送实时数据"""
-    message = {
-        "type": "realtime_data",
-        "topic": topic,
-        "data": data,
-        "timestamp": asyncio.get_event_loop().time()
-    }
-    await manager.broadcast(message, topic)
+# 创建全局广播总线实例
+_role = backplane_role()
+bus = BroadcastBus(create_backplane(_role), _role)
+
+async def send_realtime_data(topic: str, data: Dict, at: Optional[float] = None):
+    """发送实时数据，at 为计划采集时间（time.time()）"""
+    await bus.publish("realtime", {"topic": topic, "data": data, "at": time.time() if at is None else at})
 
 async def send_alert_notification(alert_data: Dict):
     """发送告警通知"""
@@ -99,7 +522,7 @@ async def send_alert_notification(alert_data: Dict):
         "data": alert_data,
         "timestamp": asyncio.get_event_loop().time()
     }
-    await manager.broadcast(message, "alerts")
+    await bus.publish("broadcast", {"topic": "alerts", "message": message})
 
 async def send_log_notification(log_data: Dict):
     """发送日志通知"""
@@ -108,4 +531,4 @@ async def send_log_notification(log_data: Dict):
         "data": log_data,
         "timestamp": asyncio.get_event_loop().time()
     }
-    await manager.broadcast(message, "logs")
+    await bus.publish("broadcast", {"topic": "logs", "message": message})
@@ -1,3 +1,4 @@
+import asyncio
 import logging
 import os
 from fastapi import FastAPI, Depends
@@ -14,6 +15,11 @@ import app.services.notification.feishu_openclaw_provider
 # 导入并初始化WebSocket服务
 import app.services.websocket.websocket_service
 from app.services.websocket.realtime_data_service import start_realtime_data_task
+from app.services.websocket.websocket_service import bus as websocket_bus
+from app.services.alarm.alarm_detector import alarm_detector
+from app.services.alarm.alarm_storage import storage as alarm_storage
+from app.services.notification.notification_service import notification_service
+from app.services.http_client import http_client
 
 # 配置日志
 log_level = os.getenv("LOG_LEVEL", "INFO").upper()
@@ -26,9 +32,6 @@ logger = logging.getLogger("nas-monitor")
 
 app = FastAPI(title="运维监控中心 API", version="2.0.0")
 
-# 启动实时数据推送任务
-start_realtime_data_task()
-
 # 配置 CORS（从环境变量读取允许的域名，默认仅允许本地）
 cors_origins = os.getenv("CORS_ORIGINS", "http://localhost,http://localhost:3003,http://127.0.0.1").split(",")
 app.add_middleware(
@@ -54,6 +57,26 @@ app.include_router(notification, prefix="/api/notification", tags=["notification
 # 注册WebSocket路由
 app.include_router(websocket, tags=["websocket"])
 
+@app.on_event("startup")
+async def on_startup():
+    # 连接WebSocket广播通道（多进程部署时接收 collector 发布的数据）
+    await websocket_bus.start()
+    # 采集和告警只在一个进程中运行，多 worker 部署时由独立的 collector 进程负责（见 realtime_collector.py）
+    if websocket_bus.collects:
+        # 启动实时数据推送任务
+        start_realtime_data_task()
+        # 订阅Docker容器事件，容器退出/OOM/健康检查失败时实时告警
+        alarm_detector.start_event_mode(asyncio.get_running_loop())
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    # 等待队列中的通知发送完成
+    await notification_service.dispatcher.shutdown()
+    await http_client.close()
+    await websocket_bus.close()
+    # 将告警记录和访问IP的追加日志合并为快照
+    alarm_storage.close()
+
 @app.get("/")
 async def root():
     return {"message": "运维监控中心 API is running"}
@@ -64,4 +87,6 @@ async def health_check():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8017)
+    # WebSocket 协商 permessage-deflate 压缩（需要 websockets 库）
+    ws_deflate = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() in ("1", "true", "yes")
+    uvicorn.run(app, host="0.0.0.0", port=8017, ws_per_message_deflate=ws_deflate)
@@ -0,0 +1,60 @@
+"""实时数据采集进程
+
+多 worker 部署时单独运行，只采集一次并通过 backplane 发布给各 web worker；告警检测、
+Docker 事件告警、通知发送和告警保留策略也只在这个进程中运行，worker 不会重复告警：
+
+    WS_BACKPLANE=unix WS_BACKPLANE_ROLE=collector python realtime_collector.py
+    WS_BACKPLANE=unix WS_BACKPLANE_ROLE=worker uvicorn main:app --workers 4 --port 8017
+"""
+import asyncio
+import logging
+import os
+
+# 导入并初始化定时任务服务（告警检测、保留策略）
+from app.services.alarm.scheduler_service import alarm_scheduler
+# 导入并初始化通知服务
+import app.services.notification.telegram_provider
+import app.services.notification.feishu_provider
+import app.services.notification.feishu_openclaw_provider
+from app.services.notification.notification_service import notification_service
+from app.services.alarm.alarm_detector import alarm_detector
+from app.services.alarm.alarm_storage import storage as alarm_storage
+# 初始化默认告警配置
+import app.api.alarm.alarm
+from app.services.http_client import http_client
+from app.services.websocket.websocket_service import bus
+from app.services.websocket.realtime_data_service import realtime_data_task
+
+log_level = os.getenv("LOG_LEVEL", "INFO").upper()
+logging.basicConfig(
+    level=getattr(logging, log_level, logging.INFO),
+    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S",
+)
+logger = logging.getLogger("nas-monitor.collector")
+
+
+async def main():
+    if not bus.collects:
+        logger.error("WS_BACKPLANE_ROLE=worker 的进程不采集数据，请使用 collector 或 all")
+        return
+    await bus.start()
+    # 订阅Docker容器事件，容器退出/OOM/健康检查失败时实时告警
+    alarm_detector.start_event_mode(asyncio.get_running_loop())
+    try:
+        await realtime_data_task()
+    finally:
+        alarm_scheduler.shutdown()
+        # 等待队列中的通知发送完成
+        await notification_service.dispatcher.shutdown()
+        await http_client.close()
+        await bus.close()
+        # 将告警记录和访问IP的追加日志合并为快照
+        alarm_storage.close()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
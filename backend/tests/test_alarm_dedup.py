@@ -0,0 +1,36 @@
+from datetime import datetime
+
+from app.models.alarm.alarm_models import AlarmRecord
+from app.services.alarm.alarm_archive import RetentionPolicy
+from app.services.alarm.alarm_storage import AlarmStorage
+
+
+def _disk_alarm(mountpoint: str) -> AlarmRecord:
+    return AlarmRecord(alarm_type="system", sub_type="disk_low", severity="warning",
+                       message=f"磁盘空间不足: {mountpoint}", details={"instance": mountpoint})
+
+
+def test_open_alarm_is_per_instance(tmp_path):
+    storage = AlarmStorage(str(tmp_path))
+    storage.create_alarm_record(_disk_alarm("/data"))
+    assert storage.has_open_alarm("system", "disk_low", "/data")
+    assert not storage.has_open_alarm("system", "disk_low", "/")
+    assert not storage.has_open_alarm("system", "disk_low")
+
+
+def test_resolved_alarm_is_not_open(tmp_path):
+    storage = AlarmStorage(str(tmp_path))
+    record = storage.create_alarm_record(_disk_alarm("/data"))
+    storage.update_alarm_record(record.id, {"resolved_at": datetime.now()})
+    assert not storage.has_open_alarm("system", "disk_low", "/data")
+
+
+def test_open_alarm_in_warm_tier_is_per_instance(tmp_path):
+    storage = AlarmStorage(str(tmp_path), retention=RetentionPolicy(hot_max_records=1))
+    storage.create_alarm_record(_disk_alarm("/data"))
+    storage.create_alarm_record(_disk_alarm("/backup"))
+    storage.enforce_retention()
+    assert storage.warm.count() == 1
+    assert storage.has_open_alarm("system", "disk_low", "/data")
+    assert storage.has_open_alarm("system", "disk_low", "/backup")
+    assert not storage.has_open_alarm("system", "disk_low", "/")
@@ -0,0 +1,85 @@
+import json
+import os
+
+from app.models.alarm.alarm_models import AlarmRecord
+from app.services.alarm.alarm_journal import AppendOnlyJournal, atomic_write_json
+from app.services.alarm.alarm_storage import AlarmStorage
+
+
+def _record(message: str) -> AlarmRecord:
+    return AlarmRecord(alarm_type="system", sub_type="cpu_high", severity="warning", message=message)
+
+
+def test_replay_in_order_and_counts_entries(tmp_path):
+    journal = AppendOnlyJournal(str(tmp_path / "test.journal"))
+    journal.append("put", "a", {"v": 1})
+    journal.append("put", "b", {"v": 2})
+    journal.append("delete", "a")
+    journal.close()
+
+    replayed = AppendOnlyJournal(journal.path)
+    entries = list(replayed.replay())
+    assert [(e["op"], e["key"]) for e in entries] == [("put", "a"), ("put", "b"), ("delete", "a")]
+    assert replayed.entries == 3
+
+
+def test_replay_skips_torn_line(tmp_path):
+    path = tmp_path / "test.journal"
+    path.write_text('{"op":"put","key":"a","data":{"v":1}}\n{"op":"put","ke')
+    entries = list(AppendOnlyJournal(str(path)).replay())
+    assert [e["key"] for e in entries] == ["a"]
+
+
+def test_replay_missing_file(tmp_path):
+    assert list(AppendOnlyJournal(str(tmp_path / "missing.journal")).replay()) == []
+
+
+def test_reset_empties_journal(tmp_path):
+    journal = AppendOnlyJournal(str(tmp_path / "test.journal"))
+    journal.append("put", "a", {"v": 1})
+    journal.reset()
+    assert journal.entries == 0
+    assert os.path.getsize(journal.path) == 0
+    journal.append("put", "b", {"v": 2})
+    journal.close()
+    assert [e["key"] for e in AppendOnlyJournal(journal.path).replay()] == ["b"]
+
+
+def test_atomic_write_json(tmp_path):
+    path = str(tmp_path / "data.json")
+    atomic_write_json(path, [1, 2])
+    atomic_write_json(path, {"a": 1})
+    with open(path) as f:
+        assert json.load(f) == {"a": 1}
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_storage_recovers_from_journal_without_compaction(tmp_path):
+    storage = AlarmStorage(str(tmp_path), compact_entries=1000)
+    kept = storage.create_alarm_record(_record("kept"))
+    updated = storage.create_alarm_record(_record("updated"))
+    storage.update_alarm_record(updated.id, {"status": "processed"})
+    # 模拟进程崩溃：不压缩，只关闭文件
+    storage.records_journal.close()
+    assert storage.records_journal.entries == 3
+    assert not os.path.exists(storage.records_file)
+
+    reloaded = AlarmStorage(str(tmp_path), compact_entries=1000)
+    assert reloaded.get_alarm_record(kept.id).message == "kept"
+    assert reloaded.get_alarm_record(updated.id).status == "processed"
+    # 启动时已把重放的日志合并进快照
+    assert reloaded.records_journal.entries == 0
+    with open(reloaded.records_file) as f:
+        assert {item["id"] for item in json.load(f)} == {kept.id, updated.id}
+
+
+def test_storage_compacts_when_journal_is_full(tmp_path):
+    storage = AlarmStorage(str(tmp_path), compact_entries=3)
+    records = [storage.create_alarm_record(_record(f"r{i}")) for i in range(3)]
+    # 第三条写入后达到阈值，自动压缩为快照
+    assert storage.records_journal.entries == 0
+    assert os.path.exists(storage.records_file)
+    storage.close()
+
+    reloaded = AlarmStorage(str(tmp_path))
+    assert {r.id for r in reloaded.get_alarm_records(limit=10)} == {r.id for r in records}
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.api.alarm.alarm import _project_record
+from app.models.alarm.alarm_models import AlarmRecord
+from app.services.alarm.alarm_archive import RetentionPolicy
+from app.services.alarm.alarm_storage import AlarmStorage
+
+BASE = datetime(2026, 1, 1, 12, 0, 0)
+
+
+def _fill(storage: AlarmStorage, count: int):
+    records = []
+    for i in range(count):
+        records.append(storage.create_alarm_record(AlarmRecord(
+            alarm_type="system" if i % 2 else "docker",
+            sub_type="cpu_high" if i % 2 else "container_exited",
+            severity="critical" if i % 3 == 0 else "warning",
+            message=f"alarm {i}",
+            timestamp=BASE + timedelta(minutes=i),
+            details={"value": i, "original_alerts": [i]},
+        )))
+    return records
+
+
+def _pages(storage: AlarmStorage, limit: int, **filters):
+    cursor, pages = None, []
+    while True:
+        records, cursor = storage.query_alarm_records(limit=limit, cursor=cursor, **filters)
+        pages.append([record.message for record in records])
+        if cursor is None:
+            return pages
+
+
+def test_cursor_pages_cover_all_records_newest_first(tmp_path):
+    storage = AlarmStorage(str(tmp_path))
+    _fill(storage, 10)
+    pages = _pages(storage, 4, severities=["critical", "warning"])
+    assert [len(page) for page in pages] == [4, 4, 2]
+    assert sum(pages, []) == [f"alarm {i}" for i in range(9, -1, -1)]
+
+
+def test_cursor_is_stable_when_new_records_arrive(tmp_path):
+    storage = AlarmStorage(str(tmp_path))
+    _fill(storage, 6)
+    first, cursor = storage.query_alarm_records(limit=2, alarm_type="system")
+    storage.create_alarm_record(AlarmRecord(alarm_type="system", sub_type="cpu_high", severity="warning",
+                                            message="newer", timestamp=BASE + timedelta(hours=1)))
+    second, cursor = storage.query_alarm_records(limit=2, cursor=cursor, alarm_type="system")
+    assert [r.message for r in first] == ["alarm 5", "alarm 3"]
+    assert [r.message for r in second] == ["alarm 1"]
+    assert cursor is None
+
+
+def test_filters(tmp_path):
+    storage = AlarmStorage(str(tmp_path))
+    _fill(storage, 10)
+    records, _ = storage.query_alarm_records(limit=100, severities=["critical"], alarm_type="docker")
+    assert [r.message for r in records] == ["alarm 6", "alarm 0"]
+    records, _ = storage.query_alarm_records(limit=100, since=BASE + timedelta(minutes=7), text="ALARM")
+    assert [r.message for r in records] == ["alarm 9", "alarm 8", "alarm 7"]
+
+
+def test_cursor_continues_into_warm_tier(tmp_path):
+    storage = AlarmStorage(str(tmp_path), retention=RetentionPolicy(hot_max_records=3, warm_max_age_days=36500))
+    _fill(storage, 8)
+    storage.enforce_retention(now=BASE)
+    assert len(storage.record_index) == 3
+    pages = _pages(storage, 3, severities=["critical", "warning"])
+    assert sum(pages, []) == [f"alarm {i}" for i in range(7, -1, -1)]
+
+
+def test_invalid_cursor(tmp_path):
+    storage = AlarmStorage(str(tmp_path))
+    with pytest.raises(ValueError):
+        storage.query_alarm_records(limit=10, cursor="not-a-cursor")
+
+
+def test_cursor_round_trip():
+    key = (BASE.timestamp(), "abc")
+    assert AlarmStorage.decode_cursor(AlarmStorage.encode_cursor(key)) == key
+
+
+def test_projection_fields_always_include_id():
+    record = AlarmRecord(alarm_type="system", sub_type="cpu_high", severity="warning", message="m")
+    assert _project_record(record, ["message"], []) == {"id": record.id, "message": "m"}
+
+
+def test_projection_excludes_nested_details():
+    record = AlarmRecord(alarm_type="system", sub_type="cpu_high", severity="warning", message="m",
+                         details={"value": 1, "original_alerts": [1, 2]})
+    projected = _project_record(record, [], ["details.original_alerts", "processed_by"])
+    assert projected["details"] == {"value": 1}
+    assert "processed_by" not in projected
+    assert _project_record(record, [], ["details", "details.value"]).get("details") is None
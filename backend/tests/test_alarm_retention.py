@@ -0,0 +1,69 @@
+from datetime import datetime, timedelta
+
+from app.models.alarm.alarm_models import AlarmRecord
+from app.services.alarm.alarm_archive import RetentionPolicy
+from app.services.alarm.alarm_storage import AlarmStorage
+
+NOW = datetime(2026, 6, 1, 12, 0, 0)
+
+
+def _storage(tmp_path, **policy) -> AlarmStorage:
+    return AlarmStorage(str(tmp_path), retention=RetentionPolicy(**policy))
+
+
+def _add(storage: AlarmStorage, days_ago: float, message: str) -> AlarmRecord:
+    return storage.create_alarm_record(AlarmRecord(
+        alarm_type="system", sub_type="cpu_high", severity="warning", message=message,
+        timestamp=NOW - timedelta(days=days_ago),
+    ))
+
+
+def test_records_move_hot_to_warm_to_cold(tmp_path):
+    storage = _storage(tmp_path, hot_max_records=100, hot_max_age_days=7, warm_max_age_days=30, cold_max_age_days=0)
+    recent = _add(storage, 1, "recent")
+    warm = _add(storage, 10, "warm")
+    cold = _add(storage, 40, "cold")
+
+    result = storage.enforce_retention(now=NOW)
+    assert result == {"to_warm": 2, "to_cold": 1, "dropped": 0}
+    stats = storage.retention_stats()
+    assert (stats["hot"], stats["warm"], stats["cold"]) == (1, 1, 1)
+    assert recent.id in storage.alarm_records
+    assert storage.warm.get(warm.id).message == "warm"
+    assert storage.cold.get(cold.id).message == "cold"
+    # 查询跨越三层，仍按时间倒序
+    assert [r.message for r in storage.get_alarm_records(limit=10)] == ["recent", "warm", "cold"]
+    assert storage.get_alarm_record(cold.id).message == "cold"
+
+
+def test_hot_tier_record_limit(tmp_path):
+    storage = _storage(tmp_path, hot_max_records=2, hot_max_age_days=365, warm_max_age_days=365)
+    records = [_add(storage, 5 - i, f"r{i}") for i in range(5)]
+    storage.enforce_retention(now=NOW)
+    assert len(storage.record_index) == 2
+    assert set(storage.alarm_records) == {records[3].id, records[4].id}
+    assert storage.warm.count() == 3
+
+
+def test_retention_is_idempotent_and_survives_restart(tmp_path):
+    storage = _storage(tmp_path, hot_max_records=100, hot_max_age_days=7, warm_max_age_days=30)
+    _add(storage, 1, "recent")
+    _add(storage, 10, "warm")
+    _add(storage, 40, "cold")
+    storage.enforce_retention(now=NOW)
+    assert storage.enforce_retention(now=NOW) == {"to_warm": 0, "to_cold": 0, "dropped": 0}
+    storage.close()
+
+    reloaded = _storage(tmp_path, hot_max_records=100, hot_max_age_days=36500, warm_max_age_days=36500)
+    assert [r.message for r in reloaded.get_alarm_records(limit=10)] == ["recent", "warm", "cold"]
+    assert reloaded.statistics.total == 3
+
+
+def test_cold_partitions_dropped_after_max_age(tmp_path):
+    storage = _storage(tmp_path, hot_max_records=100, hot_max_age_days=1, warm_max_age_days=1, cold_max_age_days=30)
+    _add(storage, 2, "kept")
+    _add(storage, 60, "dropped")
+    assert storage.enforce_retention(now=NOW) == {"to_warm": 2, "to_cold": 2, "dropped": 1}
+    assert storage.cold.count() == 1
+    assert [r.message for r in storage.get_alarm_records(limit=10)] == ["kept"]
+    assert storage.statistics.total == 1
@@ -0,0 +1,81 @@
+import os
+from datetime import datetime
+
+from app.models.alarm.alarm_models import AlarmConfig, AlarmRecord
+from app.services.alarm import alarm_storage as alarm_storage_module
+from app.services.alarm.alarm_storage import AlarmStorage
+
+
+def _alarm(sub_type: str = "cpu_high") -> AlarmRecord:
+    return AlarmRecord(alarm_type="system", sub_type=sub_type, severity="warning", message="CPU使用率过高")
+
+
+def _file_sizes(tmp_path):
+    return {name: os.path.getsize(tmp_path / name) for name in os.listdir(tmp_path)
+            if os.path.isfile(tmp_path / name)}
+
+
+def test_worker_tails_collector_journal(tmp_path):
+    collector = AlarmStorage(str(tmp_path), writer=True)
+    worker = AlarmStorage(str(tmp_path), writer=False)
+    record = collector.create_alarm_record(_alarm())
+    assert worker.get_alarm_record(record.id) is not None
+    assert worker.statistics.summary()["total"] == 1
+
+    collector.update_alarm_record(record.id, {"status": "processed", "processed_at": datetime.now()})
+    assert worker.get_alarm_record(record.id).status == "processed"
+    assert worker.statistics.summary()["total"] == 1
+
+
+def test_worker_never_compacts(tmp_path):
+    collector = AlarmStorage(str(tmp_path), writer=True)
+    worker = AlarmStorage(str(tmp_path), writer=False)
+    collector.create_alarm_record(_alarm())
+    before = _file_sizes(tmp_path)
+    worker.compact()
+    worker.close()
+    assert _file_sizes(tmp_path) == before
+    assert collector.records_journal.entries == 1
+
+
+def test_worker_reloads_after_collector_compacts(tmp_path):
+    collector = AlarmStorage(str(tmp_path), writer=True)
+    worker = AlarmStorage(str(tmp_path), writer=False)
+    first = collector.create_alarm_record(_alarm())
+    assert worker.get_alarm_record(first.id) is not None
+    collector.compact()
+    second = collector.create_alarm_record(_alarm("memory_high"))
+    records = worker.get_alarm_records()
+    assert {r.id for r in records} == {first.id, second.id}
+    assert worker.statistics.summary()["total"] == 2
+
+    collector.close()
+    restarted = AlarmStorage(str(tmp_path), writer=True)
+    assert restarted.get_alarm_record(second.id) is not None
+
+
+def test_worker_forwards_writes_to_collector(tmp_path, monkeypatch):
+    collector = AlarmStorage(str(tmp_path), writer=True)
+    worker = AlarmStorage(str(tmp_path), writer=False)
+    record = collector.create_alarm_record(_alarm())
+    forwarded = []
+    monkeypatch.setattr(alarm_storage_module.bus, "publish_soon",
+                        lambda channel, payload: forwarded.append((channel, payload)))
+
+    config = worker.create_alarm_config(AlarmConfig(alarm_type="system", sub_type="cpu_high", threshold=90.0))
+    worker.update_alarm_record(record.id, {"status": "ignored", "processed_at": datetime.now()})
+    # worker 自己不写文件
+    assert collector.get_alarm_config(config.id) is None
+    assert collector.records_journal.entries == 1
+    assert [payload["op"] for _, payload in forwarded] == ["put_config", "update_record"]
+    assert all(channel == "alarm_storage" for channel, _ in forwarded)
+
+    for _, payload in forwarded:
+        collector.apply_change(payload["op"], payload["data"])
+    assert collector.get_alarm_config(config.id).threshold == 90.0
+    assert collector.get_alarm_record(record.id).status == "ignored"
+    assert isinstance(collector.get_alarm_record(record.id).processed_at, datetime)
+
+    other = AlarmStorage(str(tmp_path), writer=False)
+    assert other.get_alarm_config(config.id) is not None
+    assert worker.get_alarm_record(record.id).status == "ignored"
@@ -0,0 +1,193 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.websocket.backplane import (
+    Backplane, RedisBackplane, UnixSocketBackplane, _resp_command, _resp_read,
+)
+from app.services.websocket.websocket_service import BroadcastBus
+
+
+class Recorder:
+    """记录收到的广播消息"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def __call__(self, channel, payload):
+        self.messages.append((channel, payload))
+
+
+async def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        if time.monotonic() > deadline:
+            raise AssertionError("condition not met in time")
+        await asyncio.sleep(0.01)
+
+
+def test_dispatch_ignores_own_and_malformed_messages():
+    backplane = Backplane()
+    recorder = Recorder()
+
+    async def run():
+        await backplane.start(recorder)
+        await backplane._dispatch(backplane._encode("realtime", {"n": 1}))
+        await backplane._dispatch(b"not json")
+        other = Backplane()
+        await backplane._dispatch(other._encode("realtime", {"n": 2}))
+
+    asyncio.run(run())
+    assert recorder.messages == [("realtime", {"n": 2})]
+    assert backplane.received == 1
+
+
+def test_unix_hub_fans_out_to_other_peers(tmp_path):
+    path = str(tmp_path / "ws.sock")
+    hub, first, second = UnixSocketBackplane(path, serve=True), UnixSocketBackplane(path, serve=False), \
+        UnixSocketBackplane(path, serve=False)
+    received = {name: Recorder() for name in ("hub", "first", "second")}
+
+    async def run():
+        await hub.start(received["hub"])
+        await first.start(received["first"])
+        await second.start(received["second"])
+        await wait_for(lambda: len(hub._peers) == 2 and first.connected() and second.connected())
+
+        await first.publish("demand", {"from": "first"})
+        await wait_for(lambda: received["hub"].messages and received["second"].messages)
+        await hub.publish("realtime", {"from": "hub"})
+        await wait_for(lambda: len(received["first"].messages) == 1 and len(received["second"].messages) == 2)
+        await asyncio.sleep(0.05)
+        for backplane in (first, second, hub):
+            await backplane.close()
+
+    asyncio.run(run())
+    assert received["hub"].messages == [("demand", {"from": "first"})]
+    assert received["second"].messages == [("demand", {"from": "first"}), ("realtime", {"from": "hub"})]
+    # 发送方不会收到自己的消息
+    assert received["first"].messages == [("realtime", {"from": "hub"})]
+
+
+def test_unix_client_drops_messages_while_disconnected(tmp_path):
+    client = UnixSocketBackplane(str(tmp_path / "missing.sock"), serve=False)
+
+    async def run():
+        await client.start(Recorder())
+        await client.publish("realtime", {})
+        await client.close()
+
+    asyncio.run(run())
+    assert client.dropped == 1
+    assert client.published == 0
+
+
+def read_reply(data: bytes):
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return await _resp_read(reader)
+
+    return asyncio.run(run())
+
+
+def test_resp_command_encoding():
+    assert _resp_command("PUBLISH", "ch", b"x\r\ny") == b"*3\r\n$7\r\nPUBLISH\r\n$2\r\nch\r\n$4\r\nx\r\ny\r\n"
+
+
+@pytest.mark.parametrize("data,expected", [
+    (b"+OK\r\n", "OK"),
+    (b":3\r\n", 3),
+    (b"$5\r\nhello\r\n", b"hello"),
+    (b"$4\r\na\r\nb\r\n", b"a\r\nb"),
+    (b"$-1\r\n", None),
+    (b"*-1\r\n", None),
+    (b"*3\r\n$7\r\nmessage\r\n$2\r\nch\r\n$2\r\n{}\r\n", [b"message", b"ch", b"{}"]),
+])
+def test_resp_read_replies(data, expected):
+    assert read_reply(data) == expected
+
+
+def test_resp_read_errors():
+    with pytest.raises(RuntimeError):
+        read_reply(b"-ERR wrong\r\n")
+    with pytest.raises(ConnectionError):
+        read_reply(b"")
+    with pytest.raises(ValueError):
+        read_reply(b"?what\r\n")
+
+
+class FakeRedis:
+    """只支持 SUBSCRIBE / PUBLISH 的 RESP 服务"""
+
+    def __init__(self):
+        self.subscribers = {}
+        self.server = None
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._client, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def _client(self, reader, writer):
+        try:
+            while True:
+                command = await _resp_read(reader)
+                name = command[0].upper()
+                if name == b"SUBSCRIBE":
+                    self.subscribers.setdefault(command[1], []).append(writer)
+                    writer.write(b"*3\r\n$9\r\nsubscribe\r\n" + _resp_command(command[1])[4:] + b":1\r\n")
+                elif name == b"PUBLISH":
+                    targets = self.subscribers.get(command[1], [])
+                    for target in targets:
+                        target.write(b"*3\r\n$7\r\nmessage\r\n" + _resp_command(command[1], command[2])[4:])
+                    writer.write(f":{len(targets)}\r\n".encode())
+        except (ConnectionError, asyncio.IncompleteReadError):
+            writer.close()
+
+    async def close(self):
+        self.server.close()
+
+
+def test_redis_backplane_round_trip():
+    redis = FakeRedis()
+    received = Recorder()
+
+    async def run():
+        port = await redis.start()
+        sender = RedisBackplane(f"redis://127.0.0.1:{port}/0")
+        receiver = RedisBackplane(f"redis://127.0.0.1:{port}/0")
+        await sender.start(Recorder())
+        await receiver.start(received)
+        await wait_for(lambda: sender.connected() and receiver.connected())
+        await sender.publish("broadcast", {"message": "磁盘"})
+        await wait_for(lambda: received.messages)
+        await sender.close()
+        await receiver.close()
+        await redis.close()
+        return sender
+
+    sender = asyncio.run(run())
+    assert received.messages == [("broadcast", {"message": "磁盘"})]
+    assert sender.published == 1
+
+
+def test_remote_demand_expires(monkeypatch):
+    bus = BroadcastBus(Backplane(), "collector")
+
+    async def run():
+        await bus._on_demand("demand", {"node": "worker-1", "topics": {"system": 5.0}, "ttl": 6.0})
+        # 本进程自己的上报被忽略
+        await bus._on_demand("demand", {"node": bus.backplane.node_id, "topics": {"io": 1.0}, "ttl": 6.0})
+
+    asyncio.run(run())
+    assert bus.demand_interval("system", 1.0) == 5.0
+    # 请求的间隔不低于主题默认间隔
+    assert bus.demand_interval("system", 10.0) == 10.0
+    assert bus.demand_interval("io", 1.0) is None
+
+    monotonic = time.monotonic
+    monkeypatch.setattr(time, "monotonic", lambda: monotonic() + 7.0)
+    assert bus.demand_interval("system", 1.0) is None
+    assert bus.remote_demand == {}
@@ -0,0 +1,68 @@
+import asyncio
+
+from app.services.websocket.websocket_service import ClientConnection
+
+
+class FakeWebSocket:
+    """记录发送帧的 WebSocket"""
+
+    def __init__(self):
+        self.frames = []
+
+    async def send_text(self, frame):
+        self.frames.append(frame)
+
+    async def send_bytes(self, frame):
+        self.frames.append(frame)
+
+
+def test_same_topic_frames_are_coalesced_in_place():
+    client = ClientConnection(FakeWebSocket(), "c1", max_queue=10)
+    client.enqueue("sys-1", "realtime", "system")
+    client.enqueue("alarm", "alarm")
+    client.enqueue("sys-2", "realtime", "system")
+
+    assert client.has_pending("system")
+    assert client.coalesced == 1
+    # 合并后的帧保留原来的位置，排在告警之前
+    assert [frame for frame, _, _ in client._outbox.values()] == ["sys-2", "alarm"]
+
+
+def test_untopiced_frames_are_never_coalesced():
+    client = ClientConnection(FakeWebSocket(), "c1", max_queue=10)
+    client.enqueue("a1", "alarm")
+    client.enqueue("a2", "alarm")
+    assert len(client._outbox) == 2
+    assert client.coalesced == 0
+
+
+def test_full_queue_drops_oldest_and_resets_delta_base():
+    client = ClientConnection(FakeWebSocket(), "c1", max_queue=2)
+    client.queued_seq["system"] = 7
+    client.enqueue("sys", "realtime", "system")
+    client.enqueue("a1", "alarm")
+    client.enqueue("a2", "alarm")
+
+    assert client.dropped == 1
+    assert not client.has_pending("system")
+    # 丢弃了 system 的帧，下一帧必须发送完整数据
+    assert "system" not in client.queued_seq
+    assert [frame for frame, _, _ in client._outbox.values()] == ["a1", "a2"]
+
+
+def test_run_sends_in_order_and_counts_bytes():
+    websocket = FakeWebSocket()
+    client = ClientConnection(websocket, "c1", max_queue=10)
+    bytes_sent = {"realtime": 0, "alarm": 0}
+
+    async def run():
+        client.enqueue("sys", "realtime", "system")
+        client.enqueue(b"\x01\x02", "alarm")
+        task = asyncio.get_running_loop().create_task(client.run(bytes_sent, send_timeout=1.0))
+        await asyncio.sleep(0.05)
+        task.cancel()
+
+    asyncio.run(run())
+    assert websocket.frames == ["sys", b"\x01\x02"]
+    assert client.sent == 2
+    assert bytes_sent == {"realtime": 3, "alarm": 2}
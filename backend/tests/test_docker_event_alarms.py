@@ -0,0 +1,83 @@
+import asyncio
+
+from app.services.alarm.alarm_detector import AlarmDetector
+
+
+def _attrs(container_id: str, exit_code: int = 1) -> dict:
+    return {
+        "Id": container_id,
+        "Name": f"/{container_id}",
+        "Image": "sha256:abc",
+        "Created": "2024-01-01T00:00:00Z",
+        "State": {"Status": "exited", "ExitCode": exit_code, "OOMKilled": False},
+        "NetworkSettings": {"Ports": {}},
+        "Config": {"Cmd": ["run"]},
+        "RestartCount": 0,
+    }
+
+
+def _event(container_id: str, action: str) -> dict:
+    return {"Type": "container", "Action": action, "Actor": {"ID": container_id}}
+
+
+def _run_events(events, before=None):
+    """依次把事件交给 _on_docker_event，返回创建的告警 sub_type"""
+    created = []
+
+    async def run():
+        detector = AlarmDetector()
+        detector._loop = asyncio.get_running_loop()
+
+        async def create(sub_type, message, details):
+            created.append(sub_type)
+
+        detector._create_docker_alarm = create
+        if before is not None:
+            before(detector)
+        for action, event, attrs in events:
+            detector._on_docker_event(action, event, attrs)
+        # run_coroutine_threadsafe 提交的协程在下一轮事件循环中执行
+        for _ in range(3):
+            await asyncio.sleep(0)
+
+    asyncio.run(run())
+    return created
+
+
+def test_die_after_kill_is_not_alarmed():
+    assert _run_events([
+        ("kill", _event("web", "kill"), None),
+        ("die", _event("web", "die"), _attrs("web", exit_code=137)),
+    ]) == []
+
+
+def test_die_without_kill_is_alarmed():
+    assert _run_events([("die", _event("web", "die"), _attrs("web"))]) == ["container_exited"]
+
+
+def test_die_after_kill_grace_period_is_alarmed():
+    def expire(detector):
+        detector.kill_grace_period = 0
+
+    assert _run_events([
+        ("kill", _event("web", "kill"), None),
+        ("die", _event("web", "die"), _attrs("web")),
+    ], before=expire) == ["container_exited"]
+
+
+def test_kill_only_suppresses_same_container():
+    assert _run_events([
+        ("kill", _event("db", "kill"), None),
+        ("die", _event("web", "die"), _attrs("web")),
+    ]) == ["container_exited"]
+
+
+def test_oom_is_alarmed():
+    assert _run_events([("oom", _event("web", "oom"), _attrs("web"))]) == ["container_oom"]
+
+
+def test_health_status_unhealthy_is_alarmed():
+    assert _run_events([
+        ("health_status", _event("web", "health_status: healthy"), _attrs("web")),
+        ("health_status", _event("web", "health_status: unhealthy"), _attrs("web")),
+    ]) == ["container_unhealthy"]
@@ -0,0 +1,121 @@
+from app.services import docker_service
+from app.services.docker_service import ContainerInventory
+
+
+class FakeAPI:
+    """内存中的 Docker API，记录各接口的调用次数"""
+
+    def __init__(self):
+        self.containers_attrs = {}
+        self.image_tags = {}
+        self.calls = {"containers": 0, "inspect_container": 0, "inspect_image": 0}
+
+    def add(self, container_id: str, status: str = "running", image: str = "sha256:web"):
+        self.containers_attrs[container_id] = {
+            "Id": container_id,
+            "Name": f"/{container_id}",
+            "Image": image,
+            "Created": "2024-01-01T00:00:00Z",
+            "State": {"Status": status, "ExitCode": 0},
+            "NetworkSettings": {"Ports": {}},
+            "Config": {"Cmd": ["run"]},
+        }
+
+    def containers(self, all=False):
+        self.calls["containers"] += 1
+        return [{"Id": container_id} for container_id in self.containers_attrs]
+
+    def inspect_container(self, container_id):
+        self.calls["inspect_container"] += 1
+        return self.containers_attrs[container_id]
+
+    def inspect_image(self, image_id):
+        self.calls["inspect_image"] += 1
+        return {"RepoTags": [self.image_tags.get(image_id, "web:1.0")]}
+
+
+class FakeClient:
+    def __init__(self):
+        self.api = FakeAPI()
+        self.events_to_send = []
+        self.inventory = None
+
+    def events(self, **kwargs):
+        def generate():
+            for event in self.events_to_send:
+                yield event
+            # 事件发完后停止订阅线程，_run 返回
+            self.inventory.stop()
+        return generate()
+
+
+def _container_event(container_id: str, action: str) -> dict:
+    return {"Type": "container", "Action": action, "Actor": {"ID": container_id}}
+
+
+def _names(inventory: ContainerInventory):
+    return {c["name"]: c["status"] for c in inventory.list()}
+
+
+def test_resync_then_events_update_single_containers(monkeypatch):
+    client = FakeClient()
+    client.api.add("web")
+    client.api.add("db", status="exited")
+    inventory = ContainerInventory()
+    client.inventory = inventory
+    seen = []
+    inventory.add_listener(lambda action, event, attrs: seen.append((action, attrs is not None)))
+
+    def play_events():
+        # 全量同步之后才开始推送事件
+        assert _names(inventory) == {"web": "running", "db": "exited"}
+        client.api.containers_attrs["db"]["State"]["Status"] = "running"
+        client.api.add("cache")
+        del client.api.containers_attrs["web"]
+        return [
+            _container_event("db", "start"),
+            _container_event("cache", "create"),
+            _container_event("web", "destroy"),
+            _container_event("db", "exec_start: sh"),
+        ]
+
+    original_resync = inventory._resync
+
+    def resync(c):
+        original_resync(c)
+        client.events_to_send = play_events()
+
+    monkeypatch.setattr(inventory, "_resync", resync)
+    monkeypatch.setattr(docker_service, "_get_client", lambda: client)
+    inventory._run()
+
+    assert _names(inventory) == {"db": "running", "cache": "running"}
+    assert inventory.resyncs == 1
+    assert inventory.events_received == 4
+    # 全量同步查询 2 个容器，事件只查询发生变化的 db 和 cache，exec 事件不查询
+    assert client.api.calls["containers"] == 1
+    assert client.api.calls["inspect_container"] == 4
+    assert seen == [("start", True), ("create", True), ("destroy", False)]
+    assert not inventory.is_live()
+
+
+def test_image_tags_cached_until_image_event():
+    client = FakeClient()
+    inventory = ContainerInventory()
+    assert inventory.image_tag("sha256:web", client) == "web:1.0"
+    client.api.image_tags["sha256:web"] = "web:2.0"
+    assert inventory.image_tag("sha256:web", client) == "web:1.0"
+    assert client.api.calls["inspect_image"] == 1
+
+    # 与镜像标签无关的镜像事件不清空缓存
+    inventory._handle_event(client, {"Type": "image", "Action": "push", "Actor": {"ID": "sha256:web"}})
+    assert inventory.image_tag("sha256:web", client) == "web:1.0"
+
+    inventory._handle_event(client, {"Type": "image", "Action": "tag", "Actor": {"ID": "sha256:web"}})
+    assert inventory.image_tag("sha256:web", client) == "web:2.0"
+    assert client.api.calls["inspect_image"] == 2
+
+
+def test_image_tag_without_client_returns_image_id():
+    inventory = ContainerInventory()
+    assert inventory.image_tag("sha256:unknown") == "sha256:unknown"
@@ -0,0 +1,100 @@
+import threading
+import time
+
+from app.services.docker_service import ContainerStatsStreamer
+
+
+def _raw_stats(usage: int) -> dict:
+    return {"cpu_stats": {"cpu_usage": {"total_usage": usage}}, "memory_stats": {"usage": 1, "limit": 2}}
+
+
+class FakeStream:
+    """每 10ms 产生一个样本，直到被关闭"""
+
+    def __init__(self):
+        self.closed = threading.Event()
+
+    def __iter__(self):
+        usage = 0
+        while not self.closed.is_set():
+            usage += 1
+            yield _raw_stats(usage)
+            time.sleep(0.01)
+
+    def close(self):
+        self.closed.set()
+
+
+class FakeAPI:
+    def __init__(self):
+        self.streams = {}
+
+    def stats(self, container_id, stream=False, decode=False):
+        if not stream:
+            return _raw_stats(0)
+        self.streams[container_id] = FakeStream()
+        return self.streams[container_id]
+
+
+class FakeClient:
+    def __init__(self):
+        self.api = FakeAPI()
+
+
+def _wait(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def _stream_threads():
+    return {t.name for t in threading.enumerate() if t.name.startswith("docker-stats-")}
+
+
+def _streamer(client, **kwargs) -> ContainerStatsStreamer:
+    streamer = ContainerStatsStreamer(**kwargs)
+    streamer._client_manager.get_client = lambda: client
+    return streamer
+
+
+def test_streams_follow_running_containers():
+    client = FakeClient()
+    streamer = _streamer(client)
+    streamer.sync([{"id": "a", "name": "web"}, {"id": "b", "name": "db"}])
+    assert streamer.stats()["streams"] == 2
+    assert _wait(lambda: streamer.latest("a") is not None and streamer.latest("b") is not None)
+    assert streamer.latest("a")["name"] == "web"
+
+    # db 不再运行：停止订阅、丢弃样本，线程退出并关闭流
+    streamer.sync([{"id": "a", "name": "web"}])
+    assert streamer.stats()["streams"] == 1
+    assert streamer.latest("b") is None
+    assert _wait(lambda: "docker-stats-db" not in _stream_threads())
+    assert client.api.streams["b"].closed.is_set()
+
+    # 容器退出事件立即停止订阅，不等下一次 sync
+    streamer.on_container_event("die", {"Actor": {"ID": "a"}}, None)
+    assert streamer.stats()["streams"] == 0
+    assert _wait(lambda: "docker-stats-web" not in _stream_threads())
+    assert streamer.latest("a") is None
+
+
+def test_sync_skips_when_client_unavailable():
+    streamer = _streamer(None)
+    streamer.sync([{"id": "a", "name": "web"}])
+    assert streamer.stats()["streams"] == 0
+
+
+def test_streams_capped_at_max_streams():
+    client = FakeClient()
+    streamer = _streamer(client, max_streams=1)
+    containers = [{"id": "a", "name": "web"}, {"id": "b", "name": "db"}]
+    streamer.sync(containers)
+    assert streamer.stats()["streams"] == 1
+    # 超出上限的容器使用一次性查询
+    assert set(streamer.fetch(client, containers[1:])) == {"b"}
+    streamer.sync([])
+    assert _wait(lambda: not _stream_threads())
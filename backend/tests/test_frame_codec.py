@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from app.services.websocket.frame_codec import UNCHANGED, encode, merge_apply, merge_diff
+
+
+CASES = [
+    ({"cpu": 10, "mem": {"used": 1, "free": 2}}, {"cpu": 12, "mem": {"used": 1, "free": 2}}),
+    ({"a": 1, "b": 2}, {"a": 1, "b": None}),
+    ({"a": None}, {"a": 0}),
+    ({"mem": {"used": 1, "swap": {"total": 4}}}, {"mem": {"used": 1}}),
+    ({"disks": [1, 2, 3]}, {"disks": [1, 2]}),
+    ({"x": 1.0}, {"x": 1}),
+    ({"x": 5}, {"x": {"nested": True}}),
+    ({"x": {"nested": True}}, {"x": 5}),
+    ({}, {"new": {"deep": [1]}}),
+]
+
+
+@pytest.mark.parametrize("old,new", CASES)
+def test_round_trip(old, new):
+    patch, deleted = merge_diff(old, new)
+    assert merge_apply(old, patch, deleted) == new
+
+
+def test_unchanged_is_distinct_from_null():
+    patch, deleted = merge_diff({"a": 1, "b": {"c": 2}}, {"a": 1, "b": {"c": 2}})
+    assert patch is UNCHANGED
+    assert deleted == []
+
+    patch, deleted = merge_diff({"a": 1}, {"a": None})
+    assert patch == {"a": None}
+    assert deleted == []
+
+
+def test_deleted_keys_are_listed_by_path():
+    old = {"mem": {"used": 1, "swap": 2}, "gone": 1}
+    patch, deleted = merge_diff(old, {"mem": {"used": 1}})
+    assert patch is UNCHANGED
+    assert sorted(deleted) == [["gone"], ["mem", "swap"]]
+    assert merge_apply(old, patch, deleted) == {"mem": {"used": 1}}
+    # 应用时不修改原对象
+    assert old == {"mem": {"used": 1, "swap": 2}, "gone": 1}
+
+
+def test_lists_are_replaced_whole():
+    patch, _ = merge_diff({"containers": [{"id": "a", "cpu": 1}]}, {"containers": [{"id": "a", "cpu": 2}]})
+    assert patch == {"containers": [{"id": "a", "cpu": 2}]}
+
+
+def test_patch_survives_json_encoding():
+    old = {"a": 1, "b": {"c": 2, "d": 3}}
+    new = {"a": None, "b": {"c": 2}}
+    patch, deleted = merge_diff(old, new)
+    message = json.loads(encode({"patch": patch, "deleted": deleted}))
+    assert merge_apply(old, message["patch"], message["deleted"]) == new
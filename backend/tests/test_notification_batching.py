@@ -0,0 +1,172 @@
+import asyncio
+import time
+
+from app.services.notification.notification_dispatcher import NotificationDispatcher, NotificationJob
+from app.services.notification.rate_limiter import RateLimiterRegistry, TokenBucket
+
+
+class RecordingProvider:
+    """记录发送内容的通知提供者"""
+
+    def __init__(self, limits=None):
+        self.sent = []
+        self.limits = limits or []
+
+    def rate_limits(self):
+        return self.limits
+
+    async def send_message(self, message, severity):
+        self.sent.append((message, severity))
+        return True
+
+
+def test_token_bucket_allows_burst_then_waits():
+    async def run():
+        bucket = TokenBucket(rate=20, capacity=3)
+        start = time.monotonic()
+        for _ in range(3):
+            await bucket.acquire()
+        burst = time.monotonic() - start
+        await bucket.acquire()
+        return burst, time.monotonic() - start, bucket.waits
+
+    burst, total, waits = asyncio.run(run())
+    assert burst < 0.02
+    # 第 4 个令牌需要等待约 1/20 秒
+    assert total >= 0.04
+    assert waits == 1
+
+
+def test_token_bucket_priority_overdraft_is_paid_back():
+    async def run():
+        bucket = TokenBucket(rate=20, capacity=1)
+        await bucket.acquire(priority=True)
+        await bucket.acquire(priority=True)
+        overdrawn = bucket.tokens
+        start = time.monotonic()
+        await bucket.acquire()
+        return overdrawn, time.monotonic() - start, bucket.overdrafts
+
+    overdrawn, waited, overdrafts = asyncio.run(run())
+    assert overdrawn < 0
+    assert overdrafts == 1
+    # 普通请求补回透支的令牌：约 2/20 秒
+    assert waited >= 0.08
+
+
+def test_registry_shares_bucket_by_name():
+    registry = RateLimiterRegistry()
+    assert registry.bucket("telegram:bot", 1, 30) is registry.bucket("telegram:bot", 1, 30)
+    assert registry.bucket("telegram:bot", 1, 30) is not registry.bucket("telegram:bot", 2, 30)
+
+
+def test_build_digest_groups_by_severity_and_category():
+    jobs = [
+        NotificationJob("c", "cpu 1", "info", "system/cpu_high"),
+        NotificationJob("c", "disk", "warning", "system/disk_low"),
+        NotificationJob("c", "cpu 2", "info", "system/cpu_high"),
+        NotificationJob("c", "other", "info"),
+    ]
+    digest = NotificationDispatcher._build_digest(jobs)
+    lines = digest.message.split("\n")
+    assert digest.severity == "warning"
+    assert digest.category == "digest"
+    assert lines[0].startswith("告警汇总：4 条通知")
+    assert lines[1] == "[warning] 1 条"
+    assert lines[3] == "[info] 3 条"
+    # 同类通知合并，显示最新一条
+    assert lines[4] == "  · system/cpu_high ×2: cpu 2"
+    assert lines[5] == "  · 其他 ×1: other"
+
+
+def test_dispatcher_sends_one_digest_per_window(tmp_path):
+    provider = RecordingProvider()
+    options = {"batch_enabled": True, "batch_window": 0.2, "batch_max_items": 10}
+
+    async def run():
+        dispatcher = NotificationDispatcher(lambda channel_id: provider, str(tmp_path), lambda channel_id: options)
+        for i in range(3):
+            dispatcher.enqueue(["c"], f"cpu {i}", "info", "system/cpu_high")
+        await asyncio.sleep(0.4)
+        await dispatcher.shutdown()
+        return dispatcher.stats()
+
+    stats = asyncio.run(run())
+    assert len(provider.sent) == 1
+    assert "system/cpu_high ×3: cpu 2" in provider.sent[0][0]
+    assert stats["channels"] == {}
+
+
+def test_dispatcher_batch_max_items_flushes_early(tmp_path):
+    provider = RecordingProvider()
+    options = {"batch_enabled": True, "batch_window": 10, "batch_max_items": 2}
+
+    async def run():
+        dispatcher = NotificationDispatcher(lambda channel_id: provider, str(tmp_path), lambda channel_id: options)
+        for i in range(4):
+            dispatcher.enqueue(["c"], f"m{i}", "warning", "docker/container_exited")
+        await asyncio.sleep(0.1)
+        await dispatcher.shutdown()
+
+    asyncio.run(run())
+    assert len(provider.sent) == 2
+    assert all("×2" in message for message, _ in provider.sent)
+
+
+def test_dispatcher_critical_bypasses_batching(tmp_path):
+    provider = RecordingProvider()
+    options = {"batch_enabled": True, "batch_window": 10, "batch_max_items": 10}
+
+    async def run():
+        dispatcher = NotificationDispatcher(lambda channel_id: provider, str(tmp_path), lambda channel_id: options)
+        dispatcher.enqueue(["c"], "info", "info")
+        dispatcher.enqueue(["c"], "down", "critical")
+        await asyncio.sleep(0.1)
+        sent = list(provider.sent)
+        await dispatcher.shutdown(timeout=0.1)
+        return sent
+
+    assert asyncio.run(run()) == [("down", "critical")]
+
+
+class FakeResponse:
+    status = 200
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class FakeSession:
+    """记录请求内容的 HTTP 会话"""
+
+    def __init__(self):
+        self.payloads = []
+
+    def post(self, url, json=None):
+        self.payloads.append(json)
+        return FakeResponse()
+
+
+def test_telegram_escapes_markdown_in_digest(monkeypatch):
+    from app.services.http_client import http_client
+    from app.services.notification.telegram_provider import TelegramProvider
+
+    session = FakeSession()
+    monkeypatch.setattr(http_client, "get_session", lambda: session)
+    provider = TelegramProvider("1:token", "42")
+    provider.is_connected = True
+    digest = NotificationDispatcher._build_digest([
+        NotificationJob("c", "cpu_high on nas", "info", "system/cpu_high"),
+        NotificationJob("c", "web exited", "warning", "docker/container_exited"),
+    ])
+
+    assert asyncio.run(provider.send_message(digest.message, digest.severity))
+    text = session.payloads[0]["text"]
+    assert session.payloads[0]["parse_mode"] == "Markdown"
+    assert "system/cpu\\_high ×1: cpu\\_high on nas" in text
+    assert "docker/container\\_exited" in text
+    # 所有下划线都已转义，不会被解析为斜体
+    assert "_" not in text.replace("\\_", "")
@@ -0,0 +1,72 @@
+import json
+
+from app.models.notification.notification_models import NotificationChannel
+from app.services.notification import notification_service as notification_service_module
+from app.services.notification.notification_service import NotificationService
+from app.services.notification.notification_storage import NotificationStorage
+
+
+def _service(tmp_path, monkeypatch):
+    storage = NotificationStorage(str(tmp_path))
+    monkeypatch.setattr(notification_service_module, "storage", storage)
+    return storage, NotificationService()
+
+
+def _feishu(webhook_url: str = "https://example.com/hook/a") -> NotificationChannel:
+    return NotificationChannel(id="feishu-1", name="飞书", type="feishu", config={"webhook_url": webhook_url})
+
+
+def test_provider_kept_when_signature_unchanged(tmp_path, monkeypatch):
+    storage, service = _service(tmp_path, monkeypatch)
+    storage.create_channel(_feishu())
+    service._load_channels()
+    provider = service.get_provider("feishu-1")
+    assert provider is not None
+
+    storage.update_channel("feishu-1", {"name": "运维群", "batch_enabled": True})
+    service._load_channels()
+    assert service.get_provider("feishu-1") is provider
+    assert service.get_channel_options("feishu-1")["batch_enabled"] is True
+
+
+def test_provider_rebuilt_when_config_changes(tmp_path, monkeypatch):
+    storage, service = _service(tmp_path, monkeypatch)
+    storage.create_channel(_feishu())
+    service._load_channels()
+    provider = service.get_provider("feishu-1")
+
+    storage.update_channel("feishu-1", {"config": {"webhook_url": "https://example.com/hook/b"}})
+    service._load_channels()
+    rebuilt = service.get_provider("feishu-1")
+    assert rebuilt is not provider
+    assert rebuilt.webhook_url == "https://example.com/hook/b"
+
+
+def test_file_edit_outside_api_is_picked_up(tmp_path, monkeypatch):
+    storage, service = _service(tmp_path, monkeypatch)
+    storage.create_channel(_feishu())
+    service._load_channels()
+    version = storage.channels_version
+
+    with open(storage.channels_file, "r", encoding="utf-8") as f:
+        channels = json.load(f)
+    channels[0]["config"]["webhook_url"] = "https://example.com/hook/edited-by-hand"
+    with open(storage.channels_file, "w", encoding="utf-8") as f:
+        json.dump(channels, f)
+    service._load_channels()
+    assert storage.channels_version > version
+    assert service.get_provider("feishu-1").webhook_url.endswith("edited-by-hand")
+
+
+def test_disabled_and_deleted_channels_lose_provider(tmp_path, monkeypatch):
+    storage, service = _service(tmp_path, monkeypatch)
+    storage.create_channel(_feishu())
+    storage.create_channel(NotificationChannel(id="feishu-2", name="备用", type="feishu",
+                                               config={"webhook_url": "https://example.com/hook/c"}))
+    service._load_channels()
+    assert set(service.providers) == {"feishu-1", "feishu-2"}
+
+    storage.update_channel("feishu-1", {"enabled": False})
+    storage.delete_channel("feishu-2")
+    service._load_channels()
+    assert service.providers == {}
@@ -0,0 +1,153 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.websocket import realtime_data_service as service
+from app.services.websocket.realtime_data_service import RealtimeTopic, schedule_topic
+from app.services.websocket.websocket_service import ClientConnection, manager
+
+
+class FakeWebSocket:
+    async def send_text(self, frame):
+        pass
+
+    async def send_bytes(self, frame):
+        pass
+
+
+@pytest.fixture
+def subscribe():
+    """向全局连接管理器登记按给定间隔订阅的客户端，测试结束后移除"""
+    added = []
+
+    def add(topic, interval):
+        client_id = f"test-{len(added)}"
+        manager.clients[client_id] = ClientConnection(FakeWebSocket(), client_id, 10)
+        manager.subscribe(client_id, [topic])
+        manager.configure(client_id, interval=interval)
+        added.append(client_id)
+        return manager.clients[client_id]
+
+    yield add
+    for client_id in added:
+        manager.disconnect(client_id)
+    manager.topic_state.clear()
+
+
+def simulate(topic, clients, ticks, tick=1.0):
+    """在 ticks 个节拍上运行调度，返回采集和各客户端收到帧的节拍时间"""
+    collected, received = [], [[] for _ in clients]
+
+    async def run():
+        for index in range(ticks):
+            tick_time = index * tick
+            before = topic.collections
+            schedule_topic(topic, tick_time)
+            if topic.task is not None:
+                await topic.task
+            if topic.collections > before:
+                collected.append(tick_time)
+            for client, times in zip(clients, received):
+                if client.has_pending(topic.name):
+                    times.append(tick_time)
+                    client._outbox.clear()
+
+    asyncio.run(run())
+    return collected, received
+
+
+async def _collect():
+    return {"value": 1}
+
+
+def test_interval_between_ticks_keeps_average_rate(subscribe):
+    topic = RealtimeTopic("test_topic", _collect, 1.0)
+    client = subscribe("test_topic", 1.5)
+    collected, (received,) = simulate(topic, [client], 13)
+    # 1.5 秒的间隔在 1 秒节拍上交替相隔 2、1 秒，平均 1.5 秒
+    assert collected == [0, 2, 3, 5, 6, 8, 9, 11, 12]
+    assert received == collected
+
+
+def test_slower_client_gets_its_own_interval(subscribe):
+    topic = RealtimeTopic("test_topic", _collect, 1.0)
+    fast = subscribe("test_topic", 1.5)
+    slow = subscribe("test_topic", 3.0)
+    collected, (fast_times, slow_times) = simulate(topic, [fast, slow], 13)
+    assert fast_times == collected
+    assert slow_times == [0, 3, 6, 9, 12]
+
+
+def test_next_run_advances_by_interval_not_by_collection_time(subscribe):
+    topic = RealtimeTopic("test_topic", _collect, 2.0)
+    subscribe("test_topic", 0)
+    collected, _ = simulate(topic, [], 9)
+    assert collected == [0, 2, 4, 6, 8]
+    assert topic.next_run == 10
+
+
+def test_no_subscribers_means_idle(subscribe):
+    topic = RealtimeTopic("test_topic", _collect, 1.0)
+    collected, _ = simulate(topic, [], 3)
+    assert collected == []
+    assert topic.idle_ticks == 3
+    assert topic.next_run is None
+
+
+def test_overrun_skips_tick_while_previous_collection_runs(subscribe):
+    release = None
+
+    async def slow_collect():
+        await release.wait()
+        return {}
+
+    topic = RealtimeTopic("test_topic", slow_collect, 1.0)
+    subscribe("test_topic", 0)
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        schedule_topic(topic, 0)
+        first = topic.task
+        schedule_topic(topic, 1)
+        schedule_topic(topic, 2)
+        assert topic.task is first
+        release.set()
+        await first
+        schedule_topic(topic, 3)
+        await topic.task
+
+    asyncio.run(run())
+    assert topic.overruns == 2
+    assert topic.collections == 2
+    assert topic.next_run == 4
+
+
+def test_realtime_task_skips_lagged_ticks(subscribe, monkeypatch):
+    calls = []
+
+    async def blocking_collect():
+        calls.append(time.monotonic())
+        if len(calls) == 2:
+            # 阻塞事件循环，错过约 5 个节拍
+            time.sleep(0.25)
+        return {}
+
+    topic = RealtimeTopic("test_topic", blocking_collect, 0.05)
+    subscribe("test_topic", 0)
+    monkeypatch.setattr(service, "realtime_topics", {"test_topic": topic})
+    monkeypatch.setattr(service, "_scheduler", {"tick": None, "ticks": 0, "lagged_ticks": 0})
+
+    async def run():
+        task = asyncio.get_running_loop().create_task(service.realtime_data_task())
+        await asyncio.sleep(0.5)
+        task.cancel()
+
+    asyncio.run(run())
+    stats = service._scheduler
+    assert stats["tick"] == 0.05
+    assert stats["lagged_ticks"] >= 3
+    # 错过的节拍不补跑：执行的节拍加上跳过的节拍约等于经过的节拍数
+    assert stats["ticks"] + stats["lagged_ticks"] <= 12
+    assert stats["ticks"] < 10
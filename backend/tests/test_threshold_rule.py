@@ -0,0 +1,84 @@
+from app.services.alarm.metric_buffer import MetricRingBuffer
+from app.services.alarm.threshold_rule import ThresholdRule
+
+
+def test_fires_only_after_duration():
+    rule = ThresholdRule(threshold=80, duration=30)
+    assert rule.update(90, 0) is None
+    assert rule.state == ThresholdRule.PENDING
+    assert rule.update(95, 29) is None
+    assert rule.update(91, 30) == "firing"
+    assert rule.state == ThresholdRule.FIRING
+    # 持续超限时不重复触发
+    assert rule.update(99, 60) is None
+
+
+def test_dip_below_threshold_restarts_pending():
+    rule = ThresholdRule(threshold=80, duration=30)
+    rule.update(90, 0)
+    assert rule.update(70, 10) is None
+    assert rule.state == ThresholdRule.OK
+    rule.update(90, 20)
+    assert rule.update(90, 45) is None
+    assert rule.update(90, 50) == "firing"
+
+
+def test_zero_duration_fires_immediately():
+    rule = ThresholdRule(threshold=80, duration=0)
+    assert rule.update(81, 0) == "firing"
+
+
+def test_hysteresis_keeps_firing_between_thresholds():
+    rule = ThresholdRule(threshold=80, duration=0, clear_threshold=70)
+    assert rule.update(85, 0) == "firing"
+    # 回落到两个阈值之间时保持 firing
+    assert rule.update(75, 1) is None
+    assert rule.state == ThresholdRule.FIRING
+    assert rule.update(82, 2) is None
+    assert rule.update(70, 3) == "resolved"
+    assert rule.state == ThresholdRule.OK
+
+
+def test_hysteresis_band_does_not_reset_pending():
+    rule = ThresholdRule(threshold=80, duration=30, clear_threshold=70)
+    rule.update(85, 0)
+    rule.update(75, 15)
+    assert rule.state == ThresholdRule.PENDING
+    assert rule.update(85, 30) == "firing"
+
+
+def test_clear_threshold_above_threshold_is_capped():
+    rule = ThresholdRule(threshold=80, duration=0, clear_threshold=90)
+    assert rule.clear_threshold == 80
+    rule.update(85, 0)
+    assert rule.update(80, 1) == "resolved"
+
+
+def test_configure_keeps_state():
+    rule = ThresholdRule(threshold=80, duration=0)
+    rule.update(85, 0)
+    rule.configure(threshold=90, duration=10, clear_threshold=60)
+    assert rule.state == ThresholdRule.FIRING
+    assert rule.update(70, 1) is None
+    assert rule.update(60, 2) == "resolved"
+
+
+def test_pending_samples_cover_the_pending_period():
+    rule = ThresholdRule(threshold=80, duration=20, history_size=4)
+    rule.update(50, 0)
+    for t in (10, 20, 30):
+        rule.update(90, t)
+    assert rule.state == ThresholdRule.FIRING
+    assert rule.pending_samples() == [(10, 90), (20, 90), (30, 90)]
+
+
+def test_ring_buffer_overwrites_oldest_and_windows_by_time():
+    buffer = MetricRingBuffer(3)
+    for t in range(5):
+        buffer.append(t, t * 10)
+    assert len(buffer) == 3
+    assert buffer.latest() == (4, 40)
+    assert buffer.window(1, now=4) == [(3, 30), (4, 40)]
+    # 回拨的时间戳按上一条处理
+    buffer.append(2, 50)
+    assert buffer.latest() == (4, 50)